@@ -0,0 +1,438 @@
+"""Benchmark the hot paths of mutwo.zimmermann_generators.
+
+Each benchmark is run for a grid of parameters. For each grid point the
+wall time (best of several runs) and the peak memory (measured with
+'tracemalloc' in a separate run) are written to a JSON file.
+
+Run all benchmarks:
+
+    python3 benchmarks/run_benchmarks.py --output results.json
+
+Only run a small grid (e.g. to test the script):
+
+    python3 benchmarks/run_benchmarks.py --quick --output results.json
+
+Compare with the results of a previous release and exit with status 1
+if any benchmark became more than 20% slower:
+
+    python3 benchmarks/run_benchmarks.py --compare old.json --threshold 1.2
+"""
+
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import typing
+
+# Benchmark the code of this repository (and not an installed release),
+# also if the package isn't installed.
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_PATH)
+
+from mutwo import zimmermann_generators
+from mutwo import zimmermann_version
+
+PRIME_NUMBER_TO_MAXIMUM_EXPONENT_DICT_TUPLE = (
+    {3: 1, 5: 1},
+    {3: 2, 5: 1},
+    {3: 1, 5: 1, 7: 1},
+    {3: 2, 5: 1, 7: 1},
+    {3: 2, 5: 1, 7: 1, 11: 1},
+)
+ALLOWED_OCTAVE_SEQUENCE_TUPLE = ((-1, 0), (-2, -1, 0, 1))
+RESOLVE_LIMIT_TUPLE = (1, 2, 3)
+EUCLIDEAN_INTERLOCKING_SEQUENCE_COUNT_TUPLE = (2, 10, 100, 1000)
+EUCLIDEAN_INTERLOCKING_SEQUENCE_LENGTH_TUPLE = (10, 100, 1000)
+
+# Each statement is run in a new interpreter. 'pass' measures the
+# startup time of the interpreter itself.
+IMPORT_STATEMENT_TUPLE = (
+    "pass",
+    "import mutwo.zimmermann_generators",
+    "from mutwo.zimmermann_generators import get_title",
+    "from mutwo.zimmermann_generators import euclidean_interlocking",
+    "from mutwo.zimmermann_generators import PitchBasedContextFreeGrammar",
+)
+
+QUICK_PRIME_NUMBER_TO_MAXIMUM_EXPONENT_DICT_TUPLE = ({3: 1, 5: 1},)
+QUICK_ALLOWED_OCTAVE_SEQUENCE_TUPLE = ((-1, 0),)
+QUICK_RESOLVE_LIMIT_TUPLE = (2,)
+QUICK_EUCLIDEAN_INTERLOCKING_SEQUENCE_COUNT_TUPLE = (10,)
+QUICK_EUCLIDEAN_INTERLOCKING_SEQUENCE_LENGTH_TUPLE = (10,)
+
+# Constraints which are shared by all grammars of the benchmarks
+MAXIMUM_CENT_DEVIATION = 2400
+MINIMAL_BARLOW_HARMONICITY_NON_TERMINAL = 0.06
+MINIMAL_BARLOW_HARMONICITY_TERMINAL = 0.03
+
+
+class Benchmark(typing.NamedTuple):
+    name: str
+    parameter_dict: dict[str, typing.Any]
+    # Prepare everything which shouldn't be measured and return
+    # the function which should be measured.
+    prepare: typing.Callable[[], typing.Callable[[], typing.Any]]
+    # Return the peak memory in bytes. If 'None' the peak memory of
+    # the measured function is traced in the current process.
+    get_peak_memory: typing.Optional[typing.Callable[[], int]] = None
+
+
+def _get_constraint_dict(
+    prime_number_to_maximum_exponent_dict: dict[int, int],
+    allowed_octave_sequence: tuple[int, ...],
+) -> dict[str, typing.Any]:
+    return dict(
+        minimal_barlow_harmonicity_non_terminal=MINIMAL_BARLOW_HARMONICITY_NON_TERMINAL,
+        minimal_barlow_harmonicity_terminal=MINIMAL_BARLOW_HARMONICITY_TERMINAL,
+        prime_number_to_maximum_exponent_dict=prime_number_to_maximum_exponent_dict,
+        allowed_octave_sequence=allowed_octave_sequence,
+        maximum_cent_deviation=MAXIMUM_CENT_DEVIATION,
+    )
+
+
+def _get_parameter_dict(
+    prime_number_to_maximum_exponent_dict: dict[int, int],
+    allowed_octave_sequence: tuple[int, ...],
+    **parameter,
+) -> dict[str, typing.Any]:
+    # JSON objects can't have integer keys
+    return dict(
+        prime_number_to_maximum_exponent=sorted(
+            prime_number_to_maximum_exponent_dict.items()
+        ),
+        allowed_octave_sequence=list(allowed_octave_sequence),
+        **parameter,
+    )
+
+
+def _get_start(
+    pitch_based_context_free_grammar: zimmermann_generators.PitchBasedContextFreeGrammar,
+) -> zimmermann_generators.JustIntonationPitchNonTerminal:
+    # Use the non-terminal with most rules, so that the benchmark
+    # doesn't depend on the order of the non-terminals.
+    return max(
+        pitch_based_context_free_grammar.non_terminal_tuple,
+        key=lambda non_terminal: (
+            len(
+                pitch_based_context_free_grammar.get_context_free_grammar_rule_tuple(
+                    non_terminal
+                )
+            ),
+            non_terminal.frequency,
+        ),
+    )
+
+
+def get_benchmark_tuple(quick: bool) -> tuple[Benchmark, ...]:
+    if quick:
+        prime_number_to_maximum_exponent_dict_tuple = (
+            QUICK_PRIME_NUMBER_TO_MAXIMUM_EXPONENT_DICT_TUPLE
+        )
+        allowed_octave_sequence_tuple = QUICK_ALLOWED_OCTAVE_SEQUENCE_TUPLE
+        resolve_limit_tuple = QUICK_RESOLVE_LIMIT_TUPLE
+        sequence_count_tuple = QUICK_EUCLIDEAN_INTERLOCKING_SEQUENCE_COUNT_TUPLE
+        sequence_length_tuple = QUICK_EUCLIDEAN_INTERLOCKING_SEQUENCE_LENGTH_TUPLE
+    else:
+        prime_number_to_maximum_exponent_dict_tuple = (
+            PRIME_NUMBER_TO_MAXIMUM_EXPONENT_DICT_TUPLE
+        )
+        allowed_octave_sequence_tuple = ALLOWED_OCTAVE_SEQUENCE_TUPLE
+        resolve_limit_tuple = RESOLVE_LIMIT_TUPLE
+        sequence_count_tuple = EUCLIDEAN_INTERLOCKING_SEQUENCE_COUNT_TUPLE
+        sequence_length_tuple = EUCLIDEAN_INTERLOCKING_SEQUENCE_LENGTH_TUPLE
+
+    benchmark_list = []
+    environment = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(
+            filter(bool, (REPOSITORY_PATH, os.environ.get("PYTHONPATH")))
+        ),
+    )
+    for import_statement in IMPORT_STATEMENT_TUPLE:
+
+        def prepare_import(import_statement=import_statement):
+            return lambda: subprocess.run(
+                (sys.executable, "-c", import_statement), check=True, env=environment
+            )
+
+        # The import happens in another process: its memory is traced
+        # there.
+        def get_import_peak_memory(import_statement=import_statement):
+            return int(
+                subprocess.run(
+                    (
+                        sys.executable,
+                        "-c",
+                        "import tracemalloc\n"
+                        "tracemalloc.start()\n"
+                        f"{import_statement}\n"
+                        "print(tracemalloc.get_traced_memory()[1])",
+                    ),
+                    check=True,
+                    env=environment,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                ).stdout
+            )
+
+        benchmark_list.append(
+            Benchmark(
+                "import",
+                dict(statement=import_statement),
+                prepare_import,
+                get_import_peak_memory,
+            )
+        )
+
+    for (
+        prime_number_to_maximum_exponent_dict,
+        allowed_octave_sequence,
+    ) in itertools.product(
+        prime_number_to_maximum_exponent_dict_tuple, allowed_octave_sequence_tuple
+    ):
+        constraint_dict = _get_constraint_dict(
+            prime_number_to_maximum_exponent_dict, allowed_octave_sequence
+        )
+        parameter_dict = _get_parameter_dict(
+            prime_number_to_maximum_exponent_dict, allowed_octave_sequence
+        )
+
+        def prepare_get_terminal_tuple_and_non_terminal_tuple(
+            constraint_dict=constraint_dict,
+        ):
+            return lambda: (
+                zimmermann_generators.PitchBasedContextFreeGrammar._get_terminal_tuple_and_non_terminal_tuple(
+                    add_unison=False, **constraint_dict
+                )
+            )
+
+        def prepare_from_constraints(constraint_dict=constraint_dict):
+            return lambda: (
+                zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                    **constraint_dict
+                )
+            )
+
+        benchmark_list.extend(
+            (
+                Benchmark(
+                    "_get_terminal_tuple_and_non_terminal_tuple",
+                    parameter_dict,
+                    prepare_get_terminal_tuple_and_non_terminal_tuple,
+                ),
+                Benchmark("from_constraints", parameter_dict, prepare_from_constraints),
+            )
+        )
+
+        for limit in resolve_limit_tuple:
+
+            def prepare_resolve(constraint_dict=constraint_dict, limit=limit):
+                pitch_based_context_free_grammar = (
+                    zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                        **constraint_dict
+                    )
+                )
+                start = _get_start(pitch_based_context_free_grammar)
+
+                def resolve():
+                    # Don't measure the cache of the previous run
+                    pitch_based_context_free_grammar.status_cache.clear()
+                    return pitch_based_context_free_grammar.resolve(start, limit)
+
+                return resolve
+
+            benchmark_list.append(
+                Benchmark(
+                    "resolve",
+                    _get_parameter_dict(
+                        prime_number_to_maximum_exponent_dict,
+                        allowed_octave_sequence,
+                        limit=limit,
+                    ),
+                    prepare_resolve,
+                )
+            )
+
+    for sequence_count, sequence_length in itertools.product(
+        sequence_count_tuple, sequence_length_tuple
+    ):
+
+        def prepare_euclidean_interlocking(
+            sequence_count=sequence_count, sequence_length=sequence_length
+        ):
+            # Sequences of different lengths, so that the distribution
+            # isn't trivial.
+            sequence_tuple = tuple(
+                (sequence_index,) * (sequence_length + (sequence_index % 7))
+                for sequence_index in range(sequence_count)
+            )
+            return lambda: zimmermann_generators.euclidean_interlocking(*sequence_tuple)
+
+        benchmark_list.append(
+            Benchmark(
+                "euclidean_interlocking",
+                dict(sequence_count=sequence_count, sequence_length=sequence_length),
+                prepare_euclidean_interlocking,
+            )
+        )
+
+    return tuple(benchmark_list)
+
+
+def measure(
+    benchmark: Benchmark, repetition_count: int, maximum_duration: float
+) -> dict[str, typing.Any]:
+    function = benchmark.prepare()
+
+    duration_list = []
+    for _ in range(repetition_count):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        duration_list.append(time.perf_counter() - start)
+        # Don't repeat slow benchmarks too often
+        if sum(duration_list) > maximum_duration:
+            break
+
+    gc.collect()
+    if benchmark.get_peak_memory is None:
+        tracemalloc.start()
+        try:
+            function()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    else:
+        peak_memory = benchmark.get_peak_memory()
+
+    return dict(
+        name=benchmark.name,
+        parameter=benchmark.parameter_dict,
+        minimal_duration=min(duration_list),
+        mean_duration=sum(duration_list) / len(duration_list),
+        repetition_count=len(duration_list),
+        peak_memory=peak_memory,
+    )
+
+
+def get_result_key(result: dict[str, typing.Any]) -> str:
+    return json.dumps((result["name"], result["parameter"]), sort_keys=True)
+
+
+def compare(
+    result_list: list[dict[str, typing.Any]],
+    previous_result_list: list[dict[str, typing.Any]],
+    threshold: float,
+) -> list[str]:
+    """Return a description of each benchmark which became slower or bigger."""
+
+    key_to_previous_result = {
+        get_result_key(previous_result): previous_result
+        for previous_result in previous_result_list
+    }
+    regression_list = []
+    for result in result_list:
+        try:
+            previous_result = key_to_previous_result[get_result_key(result)]
+        except KeyError:
+            continue
+        for key in ("minimal_duration", "peak_memory"):
+            if previous_result[key] and (
+                result[key] / previous_result[key] > threshold
+            ):
+                regression_list.append(
+                    f"{result['name']} {result['parameter']}: {key} "
+                    f"{previous_result[key]:.6g} -> {result[key]:.6g}"
+                )
+    return regression_list
+
+
+def main(argument_list: typing.Optional[list[str]] = None) -> int:
+    argument_parser = argparse.ArgumentParser(
+        description="Benchmark mutwo.zimmermann_generators"
+    )
+    argument_parser.add_argument(
+        "--output", default="benchmark_results.json", help="path of the JSON results"
+    )
+    argument_parser.add_argument(
+        "--quick", action="store_true", help="only run a small parameter grid"
+    )
+    argument_parser.add_argument(
+        "--filter", default="", help="only run benchmarks whose name contains this"
+    )
+    argument_parser.add_argument("--repetition-count", type=int, default=5)
+    argument_parser.add_argument(
+        "--maximum-duration",
+        type=float,
+        default=10,
+        help="stop repeating a benchmark after this many seconds",
+    )
+    argument_parser.add_argument(
+        "--compare", help="path of previous JSON results to compare with"
+    )
+    argument_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="ratio to the previous results which counts as a regression",
+    )
+    argument_namespace = argument_parser.parse_args(argument_list)
+
+    # Benchmarks shouldn't load grammars from a persistent cache
+    os.environ.pop(
+        zimmermann_generators.configurations.GRAMMAR_CACHE_DIRECTORY_ENVIRONMENT_VARIABLE_NAME,
+        None,
+    )
+
+    result_list = []
+    for benchmark in get_benchmark_tuple(argument_namespace.quick):
+        if argument_namespace.filter not in benchmark.name:
+            continue
+        result = measure(
+            benchmark,
+            argument_namespace.repetition_count,
+            argument_namespace.maximum_duration,
+        )
+        print(
+            f"{result['name']:<45} {json.dumps(result['parameter'])}: "
+            f"{result['minimal_duration']:.6f}s, "
+            f"{result['peak_memory'] / 1024 ** 2:.2f} MiB",
+            flush=True,
+        )
+        result_list.append(result)
+
+    with open(argument_namespace.output, "w") as output_file:
+        json.dump(
+            dict(
+                version=zimmermann_version.VERSION,
+                python_version=platform.python_version(),
+                platform=platform.platform(),
+                date=datetime.datetime.now().isoformat(),
+                result_list=result_list,
+            ),
+            output_file,
+            indent=4,
+        )
+
+    if argument_namespace.compare:
+        with open(argument_namespace.compare) as previous_file:
+            previous_result_list = json.load(previous_file)["result_list"]
+        regression_list = compare(
+            result_list, previous_result_list, argument_namespace.threshold
+        )
+        for regression in regression_list:
+            print(f"REGRESSION: {regression}")
+        if regression_list:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,7 +23,7 @@ in
       sha256 = "sha256-ml3kIVHLiWo6GbipEFFOx/s+bMDVNqibgN1wZgpRECI=";
     };
     propagatedBuildInputs = [ 
-      python39Packages.sympy
+      python39Packages.numpy
       mutwo-core
       mutwo-common
       mutwo-music
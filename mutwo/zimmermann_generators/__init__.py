@@ -5,17 +5,69 @@ titles: Create the titles of compositions. After each
         has to be done, to ensure to avoid duplication
         of titles.
 
+caches: Avoid repeated calculations of expensive results.
+
+derivations: Keep resolved grammars with less memory.
+
+profiles: Find out where the time of a resolution goes.
+
+prunings: Cut branches of a resolution which can't lead to wanted derivations.
+
 """
 
+import importlib
+import typing
+
+from . import configurations
 from . import constants
 
-from .extended_chomsky import *
-from .interlockings import *
-from .titles import *
+# Submodules are only imported when one of their objects is used for the
+# first time: some of them need heavy dependencies (e.g. 'treelib' or
+# 'mutwo.common_generators') which would otherwise slow down the import
+# of 'mutwo.zimmermann_generators' also for users which only need titles
+# or interlockings. Keep in sync with the '__all__' of each submodule
+# (the tests compare them).
+_SUBMODULE_NAME_TO_OBJECT_NAME_TUPLE = {
+    "caches": ("GrammarCache", "StatusCache"),
+    "derivations": ("CompactDerivationTree", "DerivationGraph"),
+    "extended_chomsky": (
+        "PitchBasedContextFreeGrammar",
+        "JustIntonationPitchTerminal",
+        "JustIntonationPitchNonTerminal",
+    ),
+    "interlockings": (
+        "euclidean_interlocking",
+        "iter_euclidean_interlocking",
+        "get_euclidean_interlocking_pattern",
+        "euclidean_interlocking_array",
+    ),
+    "profiles": ("ResolveProfile",),
+    "prunings": ("ResolvePruning",),
+    "titles": ("golden_number", "get_title"),
+}
+
+_OBJECT_NAME_TO_SUBMODULE_NAME = {
+    object_name: submodule_name
+    for submodule_name, object_name_tuple in _SUBMODULE_NAME_TO_OBJECT_NAME_TUPLE.items()
+    for object_name in object_name_tuple
+}
+
+__all__ = tuple(_OBJECT_NAME_TO_SUBMODULE_NAME)
+
 
-from mutwo import core_utilities
+def __getattr__(name: str) -> typing.Any:
+    try:
+        submodule_name = _OBJECT_NAME_TO_SUBMODULE_NAME[name]
+    except KeyError:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    submodule = importlib.import_module(f"{__name__}.{submodule_name}")
+    # Force flat structure
+    globals().pop(submodule_name, None)
+    object_ = getattr(submodule, name)
+    # Next time '__getattr__' isn't called anymore
+    globals()[name] = object_
+    return object_
 
-__all__ = core_utilities.get_all(extended_chomsky, interlockings, titles)
 
-# Force flat structure
-del core_utilities, extended_chomsky, interlockings, titles
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,386 @@
+"""Caches to avoid repeated calculations of expensive results"""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+import os
+import typing
+import zipfile
+
+import numpy as np
+
+from mutwo import common_generators
+from mutwo import zimmermann_generators
+from mutwo import zimmermann_version
+from mutwo.zimmermann_generators import derivations
+
+__all__ = ("GrammarCache", "StatusCache")
+
+
+class GrammarCache(object):
+    """Persistent on-disk cache for grammars created from constraints.
+
+    :param directory: The directory where the cached grammars are saved.
+        It is created if it doesn't exist yet.
+    :type directory: str
+    :param maximum_size: The maximum size of all cached grammars in bytes.
+        If a new grammar is saved and the cache grows beyond this size,
+        the least recently used grammars are removed. If set to ``None``
+        the value of
+        :const:`mutwo.zimmermann_generators.configurations.DEFAULT_GRAMMAR_CACHE_MAXIMUM_SIZE`
+        is used. Default to ``None``.
+    :type maximum_size: typing.Optional[int]
+
+    Each grammar is saved as a compressed ``numpy`` archive with the
+    exponents of all symbols and the symbol indices of all rules. The
+    file name is a stable hash of the constraints and the package version.
+    Several processes can use the same cache directory: new files are
+    written to a temporary file and then atomically renamed.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> grammar = zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+    >>>     cache_directory=".grammar-cache"
+    >>> )
+    >>> # Second call loads grammar from disk
+    >>> grammar = zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+    >>>     cache_directory=".grammar-cache"
+    >>> )
+    """
+
+    _suffix = ".npz"
+
+    def __init__(self, directory: str, maximum_size: typing.Optional[int] = None):
+        if maximum_size is None:
+            maximum_size = (
+                zimmermann_generators.configurations.DEFAULT_GRAMMAR_CACHE_MAXIMUM_SIZE
+            )
+        self.directory = directory
+        self.maximum_size = maximum_size
+
+    @staticmethod
+    def get_key(*argument: typing.Any) -> str:
+        """Get stable key of the arguments which create a grammar.
+
+        :param argument: Any JSON serializable object.
+
+        The key is equal for equal arguments, also across different
+        processes and python sessions. It also depends on the version
+        of ``mutwo.zimmermann``, so that an update of the package
+        doesn't load outdated grammars.
+        """
+
+        return hashlib.sha256(
+            json.dumps(
+                (zimmermann_version.VERSION,) + argument, sort_keys=True
+            ).encode()
+        ).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self._suffix}")
+
+    def _get_path_tuple(self) -> tuple[str, ...]:
+        try:
+            file_name_list = os.listdir(self.directory)
+        except FileNotFoundError:
+            return tuple([])
+        return tuple(
+            os.path.join(self.directory, file_name)
+            for file_name in file_name_list
+            if file_name.endswith(self._suffix)
+        )
+
+    def load(self, key: str) -> typing.Optional[
+        tuple[
+            tuple[zimmermann_generators.JustIntonationPitchNonTerminal, ...],
+            tuple[zimmermann_generators.JustIntonationPitchTerminal, ...],
+            tuple[common_generators.ContextFreeGrammarRule, ...],
+        ]
+    ]:
+        """Load non-terminals, terminals and rules of a cached grammar.
+
+        :param key: The key of the grammar (see :meth:`get_key`).
+        :type key: str
+        :return: ``None`` if no grammar has been saved with the given key.
+        """
+
+        path = self._get_path(key)
+        try:
+            with np.load(path) as npz_file:
+                exponent_array = npz_file["exponent_array"]
+                non_terminal_count = int(npz_file["non_terminal_count"])
+                rule_array = npz_file["rule_array"]
+        # The file may not exist or may just have been removed by the
+        # eviction of another process.
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        # Mark grammar as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        symbol_list = []
+        for index, exponent_list in enumerate(exponent_array.tolist()):
+            symbol_class = (
+                zimmermann_generators.JustIntonationPitchNonTerminal
+                if index < non_terminal_count
+                else zimmermann_generators.JustIntonationPitchTerminal
+            )
+            symbol_list.append(symbol_class(exponent_list))
+        rule_tuple = tuple(
+            common_generators.ContextFreeGrammarRule(
+                symbol_list[left_side_index],
+                tuple(symbol_list[index] for index in right_side_index_list),
+            )
+            for left_side_index, *right_side_index_list in rule_array.tolist()
+        )
+        return (
+            tuple(symbol_list[:non_terminal_count]),
+            tuple(symbol_list[non_terminal_count:]),
+            rule_tuple,
+        )
+
+    def save(
+        self,
+        key: str,
+        non_terminal_tuple: tuple[
+            zimmermann_generators.JustIntonationPitchNonTerminal, ...
+        ],
+        terminal_tuple: tuple[zimmermann_generators.JustIntonationPitchTerminal, ...],
+        rule_sequence: typing.Sequence[common_generators.ContextFreeGrammarRule],
+    ):
+        """Save non-terminals, terminals and rules of a grammar.
+
+        :param key: The key of the grammar (see :meth:`get_key`).
+        :type key: str
+        :param non_terminal_tuple: All non-terminals of the grammar.
+        :param terminal_tuple: All terminals of the grammar.
+        :param rule_sequence: All rules of the grammar. Each symbol of each
+            rule needs to be part of the non-terminals or terminals.
+        """
+
+        symbol_tuple = non_terminal_tuple + terminal_tuple
+        symbol_key_to_index_dict = {}
+        for index, symbol in enumerate(symbol_tuple):
+            symbol_key_to_index_dict.setdefault(
+                (
+                    isinstance(symbol, common_generators.NonTerminal),
+                    symbol.exponent_tuple,
+                ),
+                index,
+            )
+        exponent_array = np.zeros(
+            (
+                len(symbol_tuple),
+                max((len(symbol.exponent_tuple) for symbol in symbol_tuple), default=0),
+            ),
+            dtype=np.int16,
+        )
+        for index, symbol in enumerate(symbol_tuple):
+            exponent_array[index, : len(symbol.exponent_tuple)] = symbol.exponent_tuple
+        rule_array = np.array(
+            [
+                [
+                    symbol_key_to_index_dict[
+                        (
+                            isinstance(symbol, common_generators.NonTerminal),
+                            symbol.exponent_tuple,
+                        )
+                    ]
+                    for symbol in (rule.left_side,) + tuple(rule.right_side)
+                ]
+                for rule in rule_sequence
+            ],
+            dtype=np.int32,
+        )
+        # Grammars from constraints only have binary rules
+        if not rule_sequence:
+            rule_array = rule_array.reshape(0, 3)
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Other processes never see partially written files and the
+        # file gets the permissions of the umask, so that the cache
+        # directory can be shared between users.
+        with derivations._open_atomically(self._get_path(key)) as temporary_file:
+            np.savez_compressed(
+                temporary_file,
+                exponent_array=exponent_array,
+                non_terminal_count=np.array(len(non_terminal_tuple)),
+                rule_array=rule_array,
+            )
+        self._evict()
+
+    def _evict(self):
+        # Remove least recently used files until the cache is small enough.
+        path_and_stat_list = []
+        for path in self._get_path_tuple():
+            try:
+                path_and_stat_list.append((path, os.stat(path)))
+            except OSError:
+                pass
+        size = sum(stat.st_size for _, stat in path_and_stat_list)
+        for path, stat in sorted(
+            path_and_stat_list, key=lambda path_and_stat: path_and_stat[1].st_mtime
+        ):
+            if size <= self.maximum_size:
+                break
+            try:
+                os.remove(path)
+            # Maybe another process already removed the file
+            except OSError:
+                pass
+            size -= stat.st_size
+
+    def clear(self):
+        """Remove all cached grammars."""
+
+        for path in self._get_path_tuple():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class StatusCache(object):
+    """Bounded in-memory cache for the validity of derivations.
+
+    :param maximum_entry_count: The maximum number of cached derivations.
+        If a new derivation is added to a full cache, the least recently
+        used derivation is removed. If set to ``None`` the value of
+        :const:`mutwo.zimmermann_generators.configurations.DEFAULT_STATUS_CACHE_MAXIMUM_ENTRY_COUNT`
+        is used. Default to ``None``.
+    :type maximum_entry_count: typing.Optional[int]
+
+    :class:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar` uses
+    this cache to remember which symbol sequences pass its pitch
+    repetition filter. Each sequence is represented by one integer
+    which packs the indices of its symbols. Because the indices
+    depend on the symbols of the grammar, one cache can only be shared
+    between grammars with the same symbols (for instance grammars which
+    are created with the same constraints). If a grammar with different
+    symbols tries to use the cache, a :class:`ValueError` is raised.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> status_cache = zimmermann_generators.StatusCache(maximum_entry_count=10000)
+    >>> grammar = zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+    >>>     status_cache=status_cache
+    >>> )
+    >>> tree = grammar.resolve(
+    >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"), limit=3
+    >>> )
+    >>> status_cache.hit_count, status_cache.miss_count
+    (2, 47)
+    """
+
+    def __init__(self, maximum_entry_count: typing.Optional[int] = None):
+        if maximum_entry_count is None:
+            maximum_entry_count = (
+                zimmermann_generators.configurations.DEFAULT_STATUS_CACHE_MAXIMUM_ENTRY_COUNT
+            )
+        if maximum_entry_count < 1:
+            raise ValueError(
+                f"Found illegal maximum entry count '{maximum_entry_count}'. "
+                "The cache needs to be able to keep at least one entry."
+            )
+        self._maximum_entry_count = maximum_entry_count
+        self._key_to_status = collections.OrderedDict()
+        self._symbol_signature = None
+        self._reset_counter()
+
+    def __len__(self) -> int:
+        return len(self._key_to_status)
+
+    def _reset_counter(self):
+        self._hit_count = 0
+        self._miss_count = 0
+        self._eviction_count = 0
+
+    @property
+    def maximum_entry_count(self) -> int:
+        """The maximum number of cached derivations."""
+
+        return self._maximum_entry_count
+
+    @property
+    def hit_count(self) -> int:
+        """How often a status has been found in the cache."""
+
+        return self._hit_count
+
+    @property
+    def miss_count(self) -> int:
+        """How often a status hasn't been found in the cache."""
+
+        return self._miss_count
+
+    @property
+    def eviction_count(self) -> int:
+        """How often a status has been removed to keep the cache small."""
+
+        return self._eviction_count
+
+    def register_symbol_signature(self, symbol_signature: tuple):
+        """Bind the cache to the symbols of a grammar.
+
+        :param symbol_signature: Any hashable object which describes how
+            the symbols of the grammar are mapped to the integers of
+            the keys.
+        :type symbol_signature: tuple
+
+        The first registered signature is kept. If a different
+        signature is registered afterwards, a :class:`ValueError`
+        is raised, because the keys of both grammars would have
+        different meanings.
+        """
+
+        if self._symbol_signature is None:
+            self._symbol_signature = symbol_signature
+        elif self._symbol_signature != symbol_signature:
+            raise ValueError(
+                "Can't share status cache between grammars with different symbols."
+            )
+
+    def get(self, key: int) -> typing.Optional[bool]:
+        """Get status of a derivation.
+
+        :param key: The packed symbol indices of the derivation.
+        :type key: int
+        :return: ``None`` if the status of the derivation isn't cached.
+        """
+
+        try:
+            status = self._key_to_status[key]
+        except KeyError:
+            self._miss_count += 1
+            return None
+        self._key_to_status.move_to_end(key)
+        self._hit_count += 1
+        return status
+
+    def set(self, key: int, status: bool):
+        """Cache status of a derivation.
+
+        :param key: The packed symbol indices of the derivation.
+        :type key: int
+        :param status: ``True`` if the derivation is valid.
+        :type status: bool
+        """
+
+        self._key_to_status[key] = status
+        self._key_to_status.move_to_end(key)
+        if len(self._key_to_status) > self._maximum_entry_count:
+            self._key_to_status.popitem(last=False)
+            self._eviction_count += 1
+
+    def clear(self):
+        """Remove all cached derivations and reset all counters."""
+
+        self._key_to_status.clear()
+        self._reset_counter()
@@ -0,0 +1,37 @@
+"""Configure the default behaviour of :mod:`mutwo.zimmermann_generators`"""
+
+GRAMMAR_CACHE_DIRECTORY_ENVIRONMENT_VARIABLE_NAME = (
+    "MUTWO_ZIMMERMANN_GRAMMAR_CACHE_DIRECTORY"
+)
+"""Name of the environment variable which can define the directory
+of the persistent grammar cache. If the variable is set,
+:meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints`
+loads grammars from this directory and saves new grammars to it."""
+
+DEFAULT_GRAMMAR_CACHE_MAXIMUM_SIZE = 256 * 1024**2
+"""Default maximum size of all files in a
+:class:`mutwo.zimmermann_generators.GrammarCache` in bytes."""
+
+DEFAULT_STATUS_CACHE_MAXIMUM_ENTRY_COUNT = 2**20
+"""Default maximum number of derivations in a
+:class:`mutwo.zimmermann_generators.StatusCache`."""
+
+EUCLIDEAN_INTERLOCKING_CACHE_MAXIMUM_SIZE = 64 * 1024**2
+"""Maximum size in bytes of all cached patterns (and positions) of
+:func:`mutwo.zimmermann_generators.get_euclidean_interlocking_pattern`
+and :func:`mutwo.zimmermann_generators.euclidean_interlocking_array`."""
+
+RATIO_STRING_CACHE_SIZE = 4096
+"""How many ratio strings of pitches are cached to create the tags of
+the nodes of resolved trees. The value is read when
+:mod:`mutwo.zimmermann_generators` is imported."""
+
+DEFAULT_COUNT_DERIVATIONS_MAXIMUM_NODE_COUNT = 10**7
+"""Default number of nodes after which
+:meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.count_derivations`
+stops to count the derivations which pass the filter."""
+
+DEFAULT_ASYNC_RESOLVE_INTERVAL = 0.01
+"""Default number of seconds which
+:meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.resolve_async`
+resolves before it gives control back to the event loop."""
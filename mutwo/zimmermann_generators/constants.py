@@ -21,3 +21,10 @@ GOLDEN_NUMBER_TO_COMPOSITION_COUNTER_DICT = {
 }
 """Mapping of golden number to the number of realized compositions in the given year.
 """
+
+FLOATING_POINT_TOLERANCE = 1e-9
+"""Values which are closer than this tolerance to a border are calculated
+again with exact arithmetic.
+
+This is used when pitches are calculated with floating point arrays in
+:class:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar`."""
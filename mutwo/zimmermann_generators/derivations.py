@@ -0,0 +1,911 @@
+"""Compact containers for resolved grammars"""
+
+from __future__ import annotations
+
+import array
+import bisect
+import contextlib
+import json
+import mmap
+import os
+import secrets
+import struct
+import sys
+import typing
+
+import treelib
+
+from mutwo import common_generators
+from mutwo import zimmermann_generators
+
+__all__ = ("CompactDerivationTree", "DerivationGraph")
+
+
+Symbol = typing.Union[common_generators.Terminal, common_generators.NonTerminal]
+# Arrays of trees which have been loaded from a file are read-only
+# memory views of the file.
+IntegerArray = typing.Union[array.array, memoryview]
+
+
+@contextlib.contextmanager
+def _open_atomically(path: str) -> typing.Iterator[typing.BinaryIO]:
+    # Write to a temporary file in the same directory and rename it to
+    # 'path' afterwards: in this way other processes never see partially
+    # written files. Unlike 'tempfile.mkstemp' (which only allows the
+    # owner to read the file) the file is created with the same
+    # permissions as files which are created with 'open': the kernel
+    # applies the umask of the process, so it never needs to be changed.
+    directory, file_name = os.path.split(os.path.abspath(path))
+    temporary_path = os.path.join(directory, f".{file_name}.{secrets.token_hex(8)}.tmp")
+    file_descriptor = os.open(
+        temporary_path,
+        os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+        0o666,
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            yield temporary_file
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
+
+
+class CompactDerivationTree(object):
+    """Memory efficient alternative to the :class:`treelib.Tree` of a resolution.
+
+    :param symbol_tuple: All symbols which can appear in a derivation.
+        Symbols are referred to by their index in this tuple.
+    :type symbol_tuple: tuple[Symbol, ...]
+    :param rule_right_side_tuple: The right side of each rule as a tuple
+        of symbol indices. Rules are referred to by their index in this
+        tuple.
+    :type rule_right_side_tuple: tuple[tuple[int, ...], ...]
+    :param root_symbol_index_tuple: The symbol indices of the data of
+        the root.
+    :type root_symbol_index_tuple: tuple[int, ...]
+
+    Instead of saving the data of each node, the tree only saves for
+    each node the index of its parent, the index of the applied rule,
+    the position in the data of the parent where the rule has been
+    applied and the depth of the node. The data of a node is only
+    calculated if it is asked for. In this way each node only needs 20
+    bytes (8 bytes for the parent index and 4 bytes for each of the
+    other integers).
+
+    Nodes are referred to by their index. Nodes are added in
+    breadth-first order (the same order as the nodes of
+    :meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.resolve`),
+    therefore the children of each node have consecutive indices.
+
+    Usually a tree isn't created directly, but with
+    :meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.resolve_compact`.
+    Trees can be written to a flat binary file with :meth:`save` and
+    read again with :meth:`load`, which maps the file into memory.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> pitch_based_context_free_grammar = (
+    >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+    >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+    >>>         maximum_cent_deviation=550,
+    >>>     )
+    >>> )
+    >>> compact_derivation_tree = pitch_based_context_free_grammar.resolve_compact(
+    >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"), limit=2
+    >>> )
+    >>> compact_derivation_tree.leaf_index_tuple
+    (3, 4)
+    >>> compact_derivation_tree.get_data(3)
+    (JustIntonationPitchTerminal('16/15'), JustIntonationPitchNonTerminal('5/4'), JustIntonationPitchTerminal('15/16'))
+    """
+
+    # Binary file format: the magic bytes, the size of the JSON header
+    # (little-endian unsigned 64 bit integer), the JSON header and the raw
+    # arrays. Each array starts at a multiple of '_ALIGNMENT', so that
+    # it can be used directly from the mapped file.
+    _MAGIC = b"MUTWOCDT"
+    _FORMAT_VERSION = 1
+    _ALIGNMENT = 64
+    _HEADER_SIZE_FORMAT = "<Q"
+
+    def __init__(
+        self,
+        symbol_tuple: tuple[Symbol, ...],
+        rule_right_side_tuple: tuple[tuple[int, ...], ...],
+        root_symbol_index_tuple: tuple[int, ...],
+    ):
+        self._symbol_tuple = tuple(symbol_tuple)
+        self._rule_right_side_tuple = tuple(
+            tuple(right_side) for right_side in rule_right_side_tuple
+        )
+        self._root_symbol_index_tuple = tuple(root_symbol_index_tuple)
+        self._parent_array = array.array("q", (-1,))
+        self._rule_array = array.array("i", (-1,))
+        self._position_array = array.array("i", (-1,))
+        self._depth_array = array.array("i", (0,))
+        self._is_read_only = False
+
+    def __len__(self) -> int:
+        return len(self._parent_array)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(range(len(self)))
+
+    @property
+    def symbol_tuple(self) -> tuple[Symbol, ...]:
+        """All symbols which can appear in a derivation."""
+
+        return self._symbol_tuple
+
+    @property
+    def rule_right_side_tuple(self) -> tuple[tuple[int, ...], ...]:
+        """The symbol indices of the right side of each rule."""
+
+        return self._rule_right_side_tuple
+
+    @property
+    def parent_array(self) -> IntegerArray:
+        """The index of the parent of each node (-1 for the root)."""
+
+        return self._parent_array
+
+    @property
+    def rule_array(self) -> IntegerArray:
+        """The index of the rule which created each node (-1 for the root)."""
+
+        return self._rule_array
+
+    @property
+    def position_array(self) -> IntegerArray:
+        """The position in the parent data where the rule has been applied."""
+
+        return self._position_array
+
+    @property
+    def depth_array(self) -> IntegerArray:
+        """The depth of each node (0 for the root)."""
+
+        return self._depth_array
+
+    @property
+    def is_read_only(self) -> bool:
+        """``True`` if the tree has been loaded from a file with :meth:`load`."""
+
+        return self._is_read_only
+
+    @property
+    def leaf_index_tuple(self) -> tuple[int, ...]:
+        """The indices of all nodes without children."""
+
+        has_child_bytearray = bytearray(len(self))
+        for parent_index in self._parent_array[1:]:
+            has_child_bytearray[parent_index] = 1
+        return tuple(
+            node_index
+            for node_index, has_child in enumerate(has_child_bytearray)
+            if not has_child
+        )
+
+    def add_node(self, parent_index: int, rule_index: int, position: int) -> int:
+        """Add a new node to the tree.
+
+        :param parent_index: The index of the parent of the new node.
+            Because the nodes are ordered breadth-first, this must not
+            be smaller than the parent index of the previously added
+            node.
+        :type parent_index: int
+        :param rule_index: The index of the rule which has been applied.
+        :type rule_index: int
+        :param position: The position in the data of the parent where
+            the rule has been applied.
+        :type position: int
+        :return: The index of the new node.
+        """
+
+        if self._is_read_only:
+            raise ValueError("Can't add nodes to a read-only tree.")
+        if parent_index < self._parent_array[-1] or parent_index >= len(self):
+            raise ValueError(
+                f"Found illegal parent index '{parent_index}'. Nodes "
+                "need to be added in breadth-first order."
+            )
+        self._parent_array.append(parent_index)
+        self._rule_array.append(rule_index)
+        self._position_array.append(position)
+        self._depth_array.append(self._depth_array[parent_index] + 1)
+        return len(self) - 1
+
+    def depth(self, node_index: typing.Optional[int] = None) -> int:
+        """Get the depth of a node or of the whole tree.
+
+        :param node_index: The index of the node. If ``None`` the
+            maximum depth of all nodes is returned. Default to ``None``.
+        :type node_index: typing.Optional[int]
+        """
+
+        if node_index is None:
+            # Nodes are ordered breadth-first
+            return self._depth_array[-1]
+        return self._depth_array[node_index]
+
+    def get_parent_index(self, node_index: int) -> typing.Optional[int]:
+        """Get the index of the parent of a node (``None`` for the root)."""
+
+        parent_index = self._parent_array[node_index]
+        return None if parent_index < 0 else parent_index
+
+    def get_children_index_range(self, node_index: int) -> range:
+        """Get the indices of all children of a node.
+
+        :param node_index: The index of the node.
+        :type node_index: int
+        """
+
+        # The parent indices of breadth-first ordered nodes are sorted.
+        return range(
+            bisect.bisect_left(self._parent_array, node_index, 1),
+            bisect.bisect_right(self._parent_array, node_index, 1),
+        )
+
+    def get_path(self, node_index: int) -> tuple[int, ...]:
+        """Get the indices of all nodes from the root to a node.
+
+        :param node_index: The index of the last node of the path.
+        :type node_index: int
+        """
+
+        if node_index < 0 or node_index >= len(self):
+            raise IndexError(f"Node index '{node_index}' is out of range.")
+        node_index_list = []
+        while node_index >= 0:
+            node_index_list.append(node_index)
+            node_index = self._parent_array[node_index]
+        return tuple(reversed(node_index_list))
+
+    def _expand(
+        self, symbol_index_tuple: tuple[int, ...], node_index: int
+    ) -> tuple[int, ...]:
+        position = self._position_array[node_index]
+        return (
+            symbol_index_tuple[:position]
+            + self._rule_right_side_tuple[self._rule_array[node_index]]
+            + symbol_index_tuple[position + 1 :]
+        )
+
+    def get_symbol_index_tuple(self, node_index: int) -> tuple[int, ...]:
+        """Get the data of a node as symbol indices.
+
+        :param node_index: The index of the node.
+        :type node_index: int
+        """
+
+        path = self.get_path(node_index)
+        symbol_index_tuple = self._root_symbol_index_tuple
+        for path_node_index in path[1:]:
+            symbol_index_tuple = self._expand(symbol_index_tuple, path_node_index)
+        return symbol_index_tuple
+
+    def get_data(self, node_index: int) -> tuple[Symbol, ...]:
+        """Get the data of a node.
+
+        :param node_index: The index of the node.
+        :type node_index: int
+
+        The data is equal to the data of the respective node of a
+        :class:`treelib.Tree`.
+        """
+
+        symbol_tuple = self._symbol_tuple
+        return tuple(
+            symbol_tuple[symbol_index]
+            for symbol_index in self.get_symbol_index_tuple(node_index)
+        )
+
+    def _iter_symbol_index_tuple(self) -> typing.Iterator[tuple[int, ...]]:
+        # Only keep the data of the current and the previous level, so
+        # that the data of each node is only calculated once.
+        previous_level_start, previous_level_list = 0, []
+        level_start, level_list = 0, [self._root_symbol_index_tuple]
+        yield self._root_symbol_index_tuple
+        for node_index in range(1, len(self)):
+            if self._depth_array[node_index] != self._depth_array[node_index - 1]:
+                previous_level_start, previous_level_list = level_start, level_list
+                level_start, level_list = node_index, []
+            symbol_index_tuple = self._expand(
+                previous_level_list[
+                    self._parent_array[node_index] - previous_level_start
+                ],
+                node_index,
+            )
+            level_list.append(symbol_index_tuple)
+            yield symbol_index_tuple
+
+    def iter_data(self) -> typing.Iterator[tuple[Symbol, ...]]:
+        """Iterate over the data of all nodes in breadth-first order."""
+
+        symbol_tuple = self._symbol_tuple
+        for symbol_index_tuple in self._iter_symbol_index_tuple():
+            yield tuple(
+                symbol_tuple[symbol_index] for symbol_index in symbol_index_tuple
+            )
+
+    def to_tree(
+        self,
+        data_to_tag: typing.Optional[typing.Callable[[tuple[Symbol, ...]], str]] = None,
+    ) -> treelib.Tree:
+        """Convert to :class:`treelib.Tree` (e.g. to call its ``show`` method).
+
+        :param data_to_tag: Function which creates the tag of a node from
+            its data. If ``None`` the symbols are written as ratios
+            (in the same way as
+            :class:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar`
+            does). Default to ``None``.
+        :type data_to_tag: typing.Optional[typing.Callable[[tuple[Symbol, ...]], str]]
+
+        The identifier of each node of the new tree is its index.
+        """
+
+        symbol_tuple = self._symbol_tuple
+        symbol_tag_tuple = tuple(
+            f"{symbol.numerator}/{symbol.denominator}" for symbol in symbol_tuple
+        )
+        tree = treelib.Tree()
+        for node_index, symbol_index_tuple in enumerate(
+            self._iter_symbol_index_tuple()
+        ):
+            data = tuple(
+                symbol_tuple[symbol_index] for symbol_index in symbol_index_tuple
+            )
+            if data_to_tag is None:
+                tag = "({})".format(
+                    " ".join(
+                        symbol_tag_tuple[symbol_index]
+                        for symbol_index in symbol_index_tuple
+                    )
+                )
+            else:
+                tag = data_to_tag(data)
+            tree.create_node(
+                tag,
+                node_index,
+                parent=self.get_parent_index(node_index),
+                data=data,
+            )
+        return tree
+
+    def save(self, path: str):
+        """Write the tree to a flat binary file.
+
+        :param path: The path of the file.
+        :type path: str
+
+        The file contains the arrays of all nodes, the exponents of all
+        symbols and the symbol indices of all rules (so all symbols need
+        to be :class:`music_parameters.JustIntonationPitch` objects). It
+        can be read with :meth:`load`. The file is written to a temporary
+        file first and then atomically renamed, so that other processes
+        never see partially written files.
+        """
+
+        column_count = max(
+            (len(symbol.exponent_tuple) for symbol in self._symbol_tuple), default=0
+        )
+        exponent_array = array.array("q")
+        for symbol in self._symbol_tuple:
+            exponent_tuple = symbol.exponent_tuple
+            exponent_array.extend(exponent_tuple)
+            exponent_array.extend((0,) * (column_count - len(exponent_tuple)))
+        rule_offset_array = array.array("q", (0,))
+        rule_right_side_array = array.array("i")
+        for right_side in self._rule_right_side_tuple:
+            rule_right_side_array.extend(right_side)
+            rule_offset_array.append(len(rule_right_side_array))
+
+        name_and_array_tuple = (
+            ("parent", self._parent_array),
+            ("rule", self._rule_array),
+            ("position", self._position_array),
+            ("depth", self._depth_array),
+            ("symbol_exponent", exponent_array),
+            (
+                "symbol_is_non_terminal",
+                array.array(
+                    "B",
+                    (
+                        isinstance(symbol, common_generators.NonTerminal)
+                        for symbol in self._symbol_tuple
+                    ),
+                ),
+            ),
+            ("rule_right_side", rule_right_side_array),
+            ("rule_offset", rule_offset_array),
+        )
+
+        header_dict = dict(
+            format_version=self._FORMAT_VERSION,
+            byteorder=sys.byteorder,
+            column_count=column_count,
+            root_symbol_index_list=list(self._root_symbol_index_tuple),
+            array_dict={},
+        )
+        # Arrays start after the header, but the size of the header
+        # depends on the offsets of the arrays. So we move the arrays
+        # until the header fits in front of them.
+        header_start = len(self._MAGIC) + struct.calcsize(self._HEADER_SIZE_FORMAT)
+        data_start, header = 0, b""
+        while data_start < header_start + len(header):
+            data_start = self._align(header_start + len(header))
+            offset = data_start
+            for name, integer_array in name_and_array_tuple:
+                header_dict["array_dict"][name] = (
+                    (
+                        integer_array.format
+                        if isinstance(integer_array, memoryview)
+                        else integer_array.typecode
+                    ),
+                    offset,
+                    len(integer_array),
+                )
+                offset = self._align(
+                    offset + len(integer_array) * integer_array.itemsize
+                )
+            header = json.dumps(header_dict).encode()
+
+        with _open_atomically(path) as temporary_file:
+            temporary_file.write(self._MAGIC)
+            temporary_file.write(struct.pack(self._HEADER_SIZE_FORMAT, len(header)))
+            temporary_file.write(header)
+            for name, integer_array in name_and_array_tuple:
+                temporary_file.seek(header_dict["array_dict"][name][1])
+                temporary_file.write(integer_array.tobytes())
+            # Also write the padding of the last array, so that the
+            # file size is aligned.
+            temporary_file.truncate(offset)
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> CompactDerivationTree:
+        """Read a tree which has been written with :meth:`save`.
+
+        :param path: The path of the file.
+        :type path: str
+        :param use_mmap: If ``True`` the file is mapped into memory:
+            nothing is read until it is used and several processes which
+            load the same file share the same memory. If ``False`` the
+            file is read at once. Default to ``True``.
+        :type use_mmap: bool
+        :return: A read-only tree (see :attr:`is_read_only`). Its node
+            arrays are :class:`memoryview` objects of the file content,
+            so leaves, paths and the data of single nodes can be asked
+            for without reading the whole file.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> compact_derivation_tree.save("forest.cdt")
+        >>> loaded_tree = zimmermann_generators.CompactDerivationTree.load(
+        >>>     "forest.cdt"
+        >>> )
+        >>> loaded_tree.get_data(3)
+        (JustIntonationPitchTerminal('16/15'), JustIntonationPitchNonTerminal('5/4'), JustIntonationPitchTerminal('15/16'))
+        """
+
+        with open(path, "rb") as file:
+            if use_mmap:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = file.read()
+        memory_view = memoryview(buffer)
+
+        header_start = len(cls._MAGIC) + struct.calcsize(cls._HEADER_SIZE_FORMAT)
+        if bytes(memory_view[: len(cls._MAGIC)]) != cls._MAGIC:
+            raise ValueError(f"'{path}' isn't a file of a CompactDerivationTree.")
+        (header_size,) = struct.unpack(
+            cls._HEADER_SIZE_FORMAT, memory_view[len(cls._MAGIC) : header_start]
+        )
+        header_dict = json.loads(
+            bytes(memory_view[header_start : header_start + header_size])
+        )
+        if header_dict["format_version"] != cls._FORMAT_VERSION:
+            raise ValueError(
+                f"Found unsupported format version '{header_dict['format_version']}'"
+                f" in '{path}'."
+            )
+        if header_dict["byteorder"] != sys.byteorder:
+            raise ValueError(
+                f"'{path}' has been written on a machine with a different byte order."
+            )
+
+        name_to_array = {
+            name: memory_view[
+                offset : offset + item_count * struct.calcsize(format_)
+            ].cast(format_)
+            for name, (format_, offset, item_count) in header_dict["array_dict"].items()
+        }
+
+        # Symbols and rules are small: we create them immediately.
+        column_count = header_dict["column_count"]
+        exponent_list = name_to_array["symbol_exponent"].tolist()
+        symbol_tuple = tuple(
+            (
+                zimmermann_generators.JustIntonationPitchNonTerminal
+                if is_non_terminal
+                else zimmermann_generators.JustIntonationPitchTerminal
+            )(
+                exponent_list[
+                    symbol_index * column_count : (symbol_index + 1) * column_count
+                ]
+            )
+            for symbol_index, is_non_terminal in enumerate(
+                name_to_array["symbol_is_non_terminal"].tolist()
+            )
+        )
+        rule_right_side_list = name_to_array["rule_right_side"].tolist()
+        rule_offset_list = name_to_array["rule_offset"].tolist()
+        rule_right_side_tuple = tuple(
+            tuple(rule_right_side_list[start:stop])
+            for start, stop in zip(rule_offset_list, rule_offset_list[1:])
+        )
+
+        compact_derivation_tree = cls(
+            symbol_tuple,
+            rule_right_side_tuple,
+            tuple(header_dict["root_symbol_index_list"]),
+        )
+        compact_derivation_tree._parent_array = name_to_array["parent"]
+        compact_derivation_tree._rule_array = name_to_array["rule"]
+        compact_derivation_tree._position_array = name_to_array["position"]
+        compact_derivation_tree._depth_array = name_to_array["depth"]
+        compact_derivation_tree._is_read_only = True
+        return compact_derivation_tree
+
+    @classmethod
+    def _align(cls, offset: int) -> int:
+        return -(-offset // cls._ALIGNMENT) * cls._ALIGNMENT
+
+
+class DerivationGraph(object):
+    """Resolution where equal derivations of the same level are shared.
+
+    :param symbol_tuple: All symbols which can appear in a derivation.
+        Symbols are referred to by their index in this tuple.
+    :type symbol_tuple: tuple[Symbol, ...]
+    :param rule_right_side_tuple: The right side of each rule as a tuple
+        of symbol indices. Rules are referred to by their index in this
+        tuple.
+    :type rule_right_side_tuple: tuple[tuple[int, ...], ...]
+    :param root_symbol_index_tuple: The symbol indices of the data of
+        the root.
+    :type root_symbol_index_tuple: tuple[int, ...]
+
+    In the tree of a resolution the same derivation often appears
+    many times on the same level (e.g. if two rules are applied in a
+    different order). All these nodes have the same descendants. The
+    graph only has one vertex for each different derivation of a level
+    and an edge for each applied rule, so each derivation is only
+    expanded and filtered once. Each path from the root to a vertex is
+    one node of the tree (a derivation): they can be found with
+    :meth:`iter_derivations` and :meth:`to_compact_derivation_tree`.
+
+    Vertices and edges are referred to by their index. Like the nodes
+    of a :class:`CompactDerivationTree`, each vertex saves the parent,
+    the rule and the position of its first edge, so that its data can
+    be calculated. Vertices and edges are added in breadth-first order,
+    therefore the edges of each vertex have consecutive indices.
+
+    Usually a graph isn't created directly, but with
+    :meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.resolve_graph`.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> pitch_based_context_free_grammar = (
+    >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+    >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+    >>>         maximum_cent_deviation=550,
+    >>>     )
+    >>> )
+    >>> derivation_graph = pitch_based_context_free_grammar.resolve_graph(
+    >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"), limit=3
+    >>> )
+    >>> len(derivation_graph), derivation_graph.edge_count
+    (7, 6)
+    >>> derivation_graph.count_derivations()
+    (7, 2)
+    """
+
+    def __init__(
+        self,
+        symbol_tuple: tuple[Symbol, ...],
+        rule_right_side_tuple: tuple[tuple[int, ...], ...],
+        root_symbol_index_tuple: tuple[int, ...],
+    ):
+        self._symbol_tuple = tuple(symbol_tuple)
+        self._rule_right_side_tuple = tuple(
+            tuple(right_side) for right_side in rule_right_side_tuple
+        )
+        self._root_symbol_index_tuple = tuple(root_symbol_index_tuple)
+        # First edge of each vertex
+        self._parent_array = array.array("q", (-1,))
+        self._rule_array = array.array("i", (-1,))
+        self._position_array = array.array("i", (-1,))
+        self._depth_array = array.array("i", (0,))
+        # All edges
+        self._edge_parent_array = array.array("q")
+        self._edge_rule_array = array.array("i")
+        self._edge_position_array = array.array("i")
+        self._edge_child_array = array.array("q")
+
+    def __len__(self) -> int:
+        return len(self._parent_array)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(range(len(self)))
+
+    @property
+    def symbol_tuple(self) -> tuple[Symbol, ...]:
+        """All symbols which can appear in a derivation."""
+
+        return self._symbol_tuple
+
+    @property
+    def rule_right_side_tuple(self) -> tuple[tuple[int, ...], ...]:
+        """The symbol indices of the right side of each rule."""
+
+        return self._rule_right_side_tuple
+
+    @property
+    def edge_count(self) -> int:
+        """The number of edges of the graph."""
+
+        return len(self._edge_parent_array)
+
+    def add_vertex(self, parent_index: int, rule_index: int, position: int) -> int:
+        """Add a new vertex and the edge from its parent to the graph.
+
+        :param parent_index: The index of the parent of the new vertex.
+            Because edges are ordered breadth-first, this must not be
+            smaller than the parent index of the previously added edge.
+        :type parent_index: int
+        :param rule_index: The index of the rule which has been applied.
+        :type rule_index: int
+        :param position: The position in the data of the parent where
+            the rule has been applied.
+        :type position: int
+        :return: The index of the new vertex.
+        """
+
+        self._check_parent_index(parent_index)
+        vertex_index = len(self)
+        self._parent_array.append(parent_index)
+        self._rule_array.append(rule_index)
+        self._position_array.append(position)
+        self._depth_array.append(self._depth_array[parent_index] + 1)
+        self._append_edge(parent_index, rule_index, position, vertex_index)
+        return vertex_index
+
+    def add_edge(
+        self, parent_index: int, rule_index: int, position: int, child_index: int
+    ):
+        """Add a new edge between two existing vertices.
+
+        :param parent_index: The index of the parent vertex. This must
+            not be smaller than the parent index of the previously added
+            edge.
+        :type parent_index: int
+        :param rule_index: The index of the rule which has been applied.
+        :type rule_index: int
+        :param position: The position in the data of the parent where
+            the rule has been applied.
+        :type position: int
+        :param child_index: The index of the vertex with the resulting data.
+        :type child_index: int
+        """
+
+        self._check_parent_index(parent_index)
+        if (
+            not 0 < child_index < len(self)
+            or self._depth_array[child_index] != self._depth_array[parent_index] + 1
+        ):
+            raise ValueError(f"Found illegal child index '{child_index}'.")
+        self._append_edge(parent_index, rule_index, position, child_index)
+
+    def _check_parent_index(self, parent_index: int):
+        if (
+            self._edge_parent_array and parent_index < self._edge_parent_array[-1]
+        ) or not 0 <= parent_index < len(self):
+            raise ValueError(
+                f"Found illegal parent index '{parent_index}'. Edges "
+                "need to be added in breadth-first order."
+            )
+
+    def _append_edge(
+        self, parent_index: int, rule_index: int, position: int, child_index: int
+    ):
+        self._edge_parent_array.append(parent_index)
+        self._edge_rule_array.append(rule_index)
+        self._edge_position_array.append(position)
+        self._edge_child_array.append(child_index)
+
+    def depth(self, vertex_index: typing.Optional[int] = None) -> int:
+        """Get the depth of a vertex or of the whole graph.
+
+        :param vertex_index: The index of the vertex. If ``None`` the
+            maximum depth of all vertices is returned. Default to ``None``.
+        :type vertex_index: typing.Optional[int]
+        """
+
+        if vertex_index is None:
+            # Vertices are ordered breadth-first
+            return self._depth_array[-1]
+        return self._depth_array[vertex_index]
+
+    def get_edge_index_range(self, vertex_index: int) -> range:
+        """Get the indices of all edges which start at a vertex.
+
+        :param vertex_index: The index of the vertex.
+        :type vertex_index: int
+        """
+
+        # The parent indices of breadth-first ordered edges are sorted.
+        return range(
+            bisect.bisect_left(self._edge_parent_array, vertex_index),
+            bisect.bisect_right(self._edge_parent_array, vertex_index),
+        )
+
+    def get_edge(self, edge_index: int) -> tuple[int, int, int, int]:
+        """Get the parent, the rule, the position and the child of an edge.
+
+        :param edge_index: The index of the edge.
+        :type edge_index: int
+        """
+
+        return (
+            self._edge_parent_array[edge_index],
+            self._edge_rule_array[edge_index],
+            self._edge_position_array[edge_index],
+            self._edge_child_array[edge_index],
+        )
+
+    def get_symbol_index_tuple(self, vertex_index: int) -> tuple[int, ...]:
+        """Get the data of a vertex as symbol indices.
+
+        :param vertex_index: The index of the vertex.
+        :type vertex_index: int
+        """
+
+        if vertex_index < 0 or vertex_index >= len(self):
+            raise IndexError(f"Vertex index '{vertex_index}' is out of range.")
+        vertex_index_list = []
+        while vertex_index > 0:
+            vertex_index_list.append(vertex_index)
+            vertex_index = self._parent_array[vertex_index]
+        symbol_index_tuple = self._root_symbol_index_tuple
+        for path_vertex_index in reversed(vertex_index_list):
+            position = self._position_array[path_vertex_index]
+            symbol_index_tuple = (
+                symbol_index_tuple[:position]
+                + self._rule_right_side_tuple[self._rule_array[path_vertex_index]]
+                + symbol_index_tuple[position + 1 :]
+            )
+        return symbol_index_tuple
+
+    def get_data(self, vertex_index: int) -> tuple[Symbol, ...]:
+        """Get the data of a vertex.
+
+        :param vertex_index: The index of the vertex.
+        :type vertex_index: int
+        """
+
+        symbol_tuple = self._symbol_tuple
+        return tuple(
+            symbol_tuple[symbol_index]
+            for symbol_index in self.get_symbol_index_tuple(vertex_index)
+        )
+
+    def get_path_count_tuple(self) -> tuple[int, ...]:
+        """Get the number of paths from the root to each vertex.
+
+        This is how often the derivation of each vertex appears in the
+        tree of the resolution.
+        """
+
+        path_count_list = [0] * len(self)
+        path_count_list[0] = 1
+        # Parents are always added before their children
+        for parent_index, child_index in zip(
+            self._edge_parent_array, self._edge_child_array
+        ):
+            path_count_list[child_index] += path_count_list[parent_index]
+        return tuple(path_count_list)
+
+    def count_derivations(self) -> tuple[int, int]:
+        """Get the number of nodes and leaves of the tree of the resolution."""
+
+        has_edge_bytearray = bytearray(len(self))
+        for parent_index in self._edge_parent_array:
+            has_edge_bytearray[parent_index] = 1
+        path_count_tuple = self.get_path_count_tuple()
+        return sum(path_count_tuple), sum(
+            path_count
+            for path_count, has_edge in zip(path_count_tuple, has_edge_bytearray)
+            if not has_edge
+        )
+
+    def iter_derivations(
+        self,
+    ) -> typing.Generator[tuple[tuple[Symbol, ...], ...], None, None]:
+        """Iterate over all derivations in depth-first order.
+
+        Each derivation is a tuple of the data of all steps from the
+        root to a node of the tree of the resolution (in the same
+        format and the same order as
+        :meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.iter_resolve`
+        yields them). Only the current path is kept in memory.
+        """
+
+        symbol_tuple = self._symbol_tuple
+        rule_right_side_data_tuple = tuple(
+            tuple(symbol_tuple[symbol_index] for symbol_index in right_side)
+            for right_side in self._rule_right_side_tuple
+        )
+        path = [
+            tuple(
+                symbol_tuple[symbol_index]
+                for symbol_index in self._root_symbol_index_tuple
+            )
+        ]
+        yield tuple(path)
+        stack = [iter(self.get_edge_index_range(0))]
+        while stack:
+            for edge_index in stack[-1]:
+                data = path[-1]
+                position = self._edge_position_array[edge_index]
+                path.append(
+                    data[:position]
+                    + rule_right_side_data_tuple[self._edge_rule_array[edge_index]]
+                    + data[position + 1 :]
+                )
+                yield tuple(path)
+                stack.append(
+                    iter(self.get_edge_index_range(self._edge_child_array[edge_index]))
+                )
+                break
+            else:
+                stack.pop()
+                path.pop()
+
+    def to_compact_derivation_tree(self) -> CompactDerivationTree:
+        """Expand the graph to the tree of the resolution.
+
+        The tree has the same nodes in the same order as the tree of
+        :meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.resolve_compact`.
+        """
+
+        compact_derivation_tree = CompactDerivationTree(
+            self._symbol_tuple,
+            self._rule_right_side_tuple,
+            self._root_symbol_index_tuple,
+        )
+        # Pairs of node index and vertex index of the deepest level
+        frontier_list = [(0, 0)]
+        while frontier_list:
+            child_frontier_list = []
+            for node_index, vertex_index in frontier_list:
+                for edge_index in self.get_edge_index_range(vertex_index):
+                    child_frontier_list.append(
+                        (
+                            compact_derivation_tree.add_node(
+                                node_index,
+                                self._edge_rule_array[edge_index],
+                                self._edge_position_array[edge_index],
+                            ),
+                            self._edge_child_array[edge_index],
+                        )
+                    )
+            frontier_list = child_frontier_list
+        return compact_derivation_tree
@@ -1,15 +1,22 @@
 """Algorithms which are related to the mutwo author L.E. Zimmermann"""
 
 from __future__ import annotations
+import asyncio
+import concurrent.futures
+import functools
 import itertools
+import math
+import os
+import random
+import time
 import typing
 
+import numpy as np
 import treelib
-from sympy import primerange
 
 from mutwo import common_generators
-from mutwo import core_utilities
 from mutwo import music_parameters
+from mutwo import zimmermann_generators
 
 __all__ = (
     "PitchBasedContextFreeGrammar",
@@ -17,17 +24,31 @@ __all__ = (
     "JustIntonationPitchNonTerminal",
 )
 
+# How many pair sums are calculated at once when rules are created
+_PAIR_CHUNK_SIZE = 2**20
+
+# Bounds of pruning which didn't converge until this depth are unbounded
+_OPTIMISTIC_BOUND_MAXIMUM_DEPTH = 64
+
 
 class JustIntonationPitchNonTerminal(
     music_parameters.JustIntonationPitch, common_generators.NonTerminal
 ):
-    pass
+    def __reduce__(self):
+        # 'JustIntonationPitch' can't be pickled (its envelope contains
+        # lambda functions). But symbols of a grammar are only intervals,
+        # so it's sufficient to keep their exponents.
+        return type(self), (self.exponent_tuple,)
 
 
 class JustIntonationPitchTerminal(
     music_parameters.JustIntonationPitch, common_generators.Terminal
 ):
-    pass
+    def __reduce__(self):
+        # 'JustIntonationPitch' can't be pickled (its envelope contains
+        # lambda functions). But symbols of a grammar are only intervals,
+        # so it's sufficient to keep their exponents.
+        return type(self), (self.exponent_tuple,)
 
 
 class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
@@ -60,11 +81,198 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
     └── (4/3 15/16)
         └── (16/15 5/4 15/16)
             └── (16/15 4/3 15/16 15/16)
+
+    :param context_free_grammar_rule_sequence: All rules of the grammar.
+    :type context_free_grammar_rule_sequence: typing.Sequence[common_generators.ContextFreeGrammarRule]
+    :param status_cache: The cache which remembers which derivations
+        are valid. If ``None`` a new
+        :class:`mutwo.zimmermann_generators.StatusCache` is created.
+        Default to ``None``.
+    :type status_cache: typing.Optional[mutwo.zimmermann_generators.StatusCache]
+    :param add_tag: If set to ``True`` each node of a resolved tree
+        shows its data as ratios (e.g. ``"(15/16 4/3)"``). The tag is
+        only created when it is used for the first time (e.g. by
+        :meth:`treelib.Tree.show`). If set to ``False`` the nodes keep
+        the default tag of :mod:`treelib` (their identifier). The
+        attribute can be changed after the grammar has been created.
+        Default to ``True``.
+    :type add_tag: bool
+    :param profile: If set, counters and timers of all resolutions
+        are added to the profile (see
+        :class:`mutwo.zimmermann_generators.ResolveProfile`). The
+        attribute can be changed after the grammar has been created.
+        Default to ``None``.
+    :type profile: typing.Optional[mutwo.zimmermann_generators.ResolveProfile]
+    :param pruning: If set, branches of a resolution which break the
+        constraints of the pruning are cut while the grammar is resolved
+        (see :class:`mutwo.zimmermann_generators.ResolvePruning`). The
+        root of a resolution is never removed. The attribute can be
+        changed after the grammar has been created. Default to ``None``.
+    :type pruning: typing.Optional[mutwo.zimmermann_generators.ResolvePruning]
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._exponent_tuple_tuple_to_status = {}
+    def __init__(
+        self,
+        context_free_grammar_rule_sequence: typing.Sequence[
+            common_generators.ContextFreeGrammarRule
+        ],
+        status_cache: typing.Optional[zimmermann_generators.StatusCache] = None,
+        add_tag: bool = True,
+        profile: typing.Optional[zimmermann_generators.ResolveProfile] = None,
+        pruning: typing.Optional[zimmermann_generators.ResolvePruning] = None,
+    ):
+        self.add_tag = add_tag
+        self.profile = profile
+        self.pruning = pruning
+        # We don't call the parent '__init__': it looks up the rules of each
+        # non-terminal with 'tuple.index' and uniqifies the symbols by
+        # sorting and comparing pitch objects. For grammars with thousands
+        # of rules this takes minutes. Here we do the same with hash tables.
+        non_terminal_list, terminal_list = [], []
+        for context_free_grammar_rule in context_free_grammar_rule_sequence:
+            non_terminal_list.append(context_free_grammar_rule.left_side)
+            for terminal_or_non_terminal in context_free_grammar_rule.right_side:
+                if isinstance(terminal_or_non_terminal, common_generators.NonTerminal):
+                    non_terminal_list.append(terminal_or_non_terminal)
+                elif isinstance(terminal_or_non_terminal, common_generators.Terminal):
+                    terminal_list.append(terminal_or_non_terminal)
+        self._non_terminal_tuple = self._uniqify_pitch_sequence(non_terminal_list)
+        self._terminal_tuple = self._uniqify_pitch_sequence(terminal_list)
+        self._exponent_tuple_to_non_terminal_index = {
+            non_terminal.exponent_tuple: non_terminal_index
+            for non_terminal_index, non_terminal in enumerate(self._non_terminal_tuple)
+        }
+        self._context_free_grammar_rule_tuple = tuple(
+            context_free_grammar_rule_sequence
+        )
+        divided_context_free_grammar_rule_index_list = [
+            [] for _ in self._non_terminal_tuple
+        ]
+        for context_free_grammar_rule_index, context_free_grammar_rule in enumerate(
+            self._context_free_grammar_rule_tuple
+        ):
+            divided_context_free_grammar_rule_index_list[
+                self._exponent_tuple_to_non_terminal_index[
+                    context_free_grammar_rule.left_side.exponent_tuple
+                ]
+            ].append(context_free_grammar_rule_index)
+        self._divided_context_free_grammar_rule_index_tuple = tuple(
+            tuple(context_free_grammar_rule_index_list)
+            for context_free_grammar_rule_index_list in divided_context_free_grammar_rule_index_list
+        )
+        self._divided_context_free_grammar_rule_tuple = tuple(
+            tuple(
+                self._context_free_grammar_rule_tuple[context_free_grammar_rule_index]
+                for context_free_grammar_rule_index in context_free_grammar_rule_index_tuple
+            )
+            for context_free_grammar_rule_index_tuple in self._divided_context_free_grammar_rule_index_tuple
+        )
+        # Each different pitch gets a number (starting with 1), so that
+        # a sequence of pitches can be packed into one integer.
+        self._exponent_tuple_to_symbol_number = {}
+        for symbol in self._non_terminal_tuple + self._terminal_tuple:
+            self._exponent_tuple_to_symbol_number.setdefault(
+                symbol.exponent_tuple, len(self._exponent_tuple_to_symbol_number) + 1
+            )
+        self._symbol_number_base = len(self._exponent_tuple_to_symbol_number) + 1
+        # Precompiled rule table: during a resolution symbols are referred
+        # to by their id (their index in the symbol tuple), so that the
+        # right side of each rule is only a tuple of integers. The ids of
+        # the non-terminals are equal to their index in the non-terminal
+        # tuple: the rules of a non-terminal id are found in
+        # '_divided_context_free_grammar_rule_index_tuple'.
+        self._symbol_tuple = self._non_terminal_tuple + self._terminal_tuple
+        self._symbol_key_to_symbol_id = {}
+        for symbol_id, symbol in enumerate(self._symbol_tuple):
+            self._symbol_key_to_symbol_id.setdefault(
+                self._get_symbol_key(symbol), symbol_id
+            )
+        self._symbol_id_to_exponent_tuple = tuple(
+            symbol.exponent_tuple for symbol in self._symbol_tuple
+        )
+        self._symbol_id_to_symbol_number = tuple(
+            self._exponent_tuple_to_symbol_number[exponent_tuple]
+            for exponent_tuple in self._symbol_id_to_exponent_tuple
+        )
+        self._rule_right_side_symbol_id_tuple = tuple(
+            tuple(
+                self._symbol_key_to_symbol_id[self._get_symbol_key(symbol)]
+                for symbol in context_free_grammar_rule.right_side
+            )
+            for context_free_grammar_rule in self._context_free_grammar_rule_tuple
+        )
+        # Each rule which adds at least one symbol: the number of symbols
+        # limits the number of further expansions.
+        self._is_growing = all(
+            len(right_side_symbol_id_tuple) > 1
+            for right_side_symbol_id_tuple in self._rule_right_side_symbol_id_tuple
+        )
+        # Tables for pruning: they are only created when needed. The
+        # bound depths are the depths from which on the optimistic
+        # bounds don't change anymore.
+        self._symbol_id_to_cent = None
+        self._symbol_id_to_harmonicity = None
+        self._optimistic_bound_list = None
+        self._optimistic_cent_bound_depth = None
+        self._optimistic_harmonicity_bound_depth = None
+        # Rules by their right side for parsing: also only created when needed.
+        self._symbol_id_pair_to_rule_list = None
+        if status_cache is None:
+            status_cache = zimmermann_generators.StatusCache()
+        status_cache.register_symbol_signature(
+            tuple(self._exponent_tuple_to_symbol_number)
+        )
+        self._status_cache = status_cache
+        # Tags are only created lazily with the default '_data_to_tag':
+        # tags of subclasses which override it are created immediately.
+        self._is_tag_lazy = (
+            type(self)._data_to_tag is PitchBasedContextFreeGrammar._data_to_tag
+        )
+        # Resolutions only use the precompiled rule table if no subclass
+        # changed how derivations are expanded or accepted.
+        self._is_rule_table_used = all(
+            getattr(type(self), method_name)
+            is getattr(PitchBasedContextFreeGrammar, method_name)
+            for method_name in ("_resolve_content", "_add_node", "_is_valid")
+        )
+
+    @property
+    def status_cache(self) -> zimmermann_generators.StatusCache:
+        """Cache which remembers derivations which passed or failed the filter.
+
+        The counters of the cache can be used to see how effective the
+        cache is (see :class:`mutwo.zimmermann_generators.StatusCache`).
+        """
+
+        return self._status_cache
+
+    @staticmethod
+    def _get_symbol_key(
+        symbol: typing.Union[
+            JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+        ],
+    ) -> tuple[bool, tuple[int, ...]]:
+        # The same pitch can be a terminal and a non-terminal
+        return (
+            isinstance(symbol, common_generators.NonTerminal),
+            symbol.exponent_tuple,
+        )
+
+    @staticmethod
+    def _uniqify_pitch_sequence(
+        pitch_sequence: typing.Sequence[music_parameters.JustIntonationPitch],
+    ) -> tuple[music_parameters.JustIntonationPitch, ...]:
+        # Same result as 'core_utilities.uniqify_sequence', but we only
+        # calculate the frequency of each different pitch once instead of
+        # calculating it again for each comparison while sorting.
+        exponent_tuple_to_pitch_dict = {}
+        for pitch in pitch_sequence:
+            exponent_tuple_to_pitch_dict.setdefault(pitch.exponent_tuple, pitch)
+        return tuple(
+            sorted(
+                exponent_tuple_to_pitch_dict.values(), key=lambda pitch: pitch.frequency
+            )
+        )
 
     @staticmethod
     def _maximum_exponent_to_allowed_exponent_tuple(
@@ -75,38 +283,163 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
         )
 
     @staticmethod
-    def _add_pitch_to_terminal_list_or_non_terminal_list(
-        minimal_barlow_harmonicity_non_terminal: float,
-        minimal_barlow_harmonicity_terminal: float,
+    def _get_ascending_prime_tuple(
         prime_number_tuple: tuple[int, ...],
-        exponent_tuple: tuple[int, ...],
-        ascending_prime_tuple: tuple[int, ...],
-        non_terminal_list: list[JustIntonationPitchNonTerminal],
-        terminal_list: list[JustIntonationPitchTerminal],
-        octave: int,
-        maximum_cent_deviation: float,
-    ):
-        complete_exponent_list = [
-            exponent_tuple[prime_number_tuple.index(prime)]
-            if prime in prime_number_tuple
-            else 0
-            for prime in ascending_prime_tuple
-        ]
-        just_intonation_pitch = music_parameters.JustIntonationPitch(
-            complete_exponent_list
-        ).register(octave)
-        if abs(just_intonation_pitch.interval) <= maximum_cent_deviation:
-            harmonicity_simplified_barlow = (
-                just_intonation_pitch.harmonicity_simplified_barlow
+    ) -> tuple[int, ...]:
+        # All occuring primes until the highest prime
+        try:
+            ascending_prime_tuple = _get_prime_tuple(max(prime_number_tuple) + 1)
+        # If there are no prime numbers we can simply use an empty tuple
+        except ValueError:
+            ascending_prime_tuple = tuple([])
+        # We always need the octave to register the pitches
+        return ascending_prime_tuple or (2,)
+
+    @staticmethod
+    def _get_octave_shift(
+        exponent_tuple: tuple[int, ...], prime_tuple: tuple[int, ...]
+    ) -> int:
+        # Exact version of 'floor(log2(ratio))' for ratios which are
+        # (almost) a power of two.
+        numerator, denominator = 1, 1
+        for prime, exponent in zip(prime_tuple, exponent_tuple):
+            if exponent > 0:
+                numerator *= prime**exponent
+            elif exponent < 0:
+                denominator *= prime**-exponent
+        octave_shift = numerator.bit_length() - denominator.bit_length()
+        if octave_shift >= 0:
+            is_too_high = numerator < denominator << octave_shift
+        else:
+            is_too_high = numerator << -octave_shift < denominator
+        return octave_shift - is_too_high
+
+    @staticmethod
+    def _get_pitch_lattice(
+        prime_number_to_maximum_exponent_dict: dict[int, int],
+        allowed_octave_sequence: typing.Sequence[int],
+        add_unison: bool,
+    ) -> tuple[tuple[int, ...], np.ndarray, np.ndarray, np.ndarray]:
+        """Get all candidate pitches of the given constraints as arrays.
+
+        :return: A tuple with four elements: the prime numbers which
+            belong to the columns of the exponent array, the exponent
+            array (one row for each registered candidate pitch), the cent
+            value of each candidate and the simplified barlow harmonicity
+            of each candidate. The candidates are ordered in the same way
+            as the nested loops 'number of primes - combination of primes -
+            exponents - octave' would order them.
+        """
+
+        prime_number_tuple = tuple(prime_number_to_maximum_exponent_dict.keys())
+        ascending_prime_tuple = PitchBasedContextFreeGrammar._get_ascending_prime_tuple(
+            prime_number_tuple
+        )
+        prime_to_column_index_dict = {
+            prime: column_index
+            for column_index, prime in enumerate(ascending_prime_tuple)
+        }
+        prime_number_to_allowed_exponent_array_dict = {
+            prime_number: np.array(
+                PitchBasedContextFreeGrammar._maximum_exponent_to_allowed_exponent_tuple(
+                    maximum_exponent
+                ),
+                dtype=np.int64,
             )
-            if harmonicity_simplified_barlow >= minimal_barlow_harmonicity_non_terminal:
-                non_terminal_list.append(
-                    JustIntonationPitchNonTerminal(just_intonation_pitch.exponent_tuple)
+            for prime_number, maximum_exponent in prime_number_to_maximum_exponent_dict.items()
+        }
+
+        exponent_array_list = []
+        for n_prime_numbers in range(
+            not add_unison, len(prime_number_to_maximum_exponent_dict) + 1
+        ):
+            for combined_prime_number_tuple in itertools.combinations(
+                prime_number_tuple, n_prime_numbers
+            ):
+                allowed_exponent_array_tuple = tuple(
+                    prime_number_to_allowed_exponent_array_dict[prime_number]
+                    for prime_number in combined_prime_number_tuple
+                )
+                # 'np.meshgrid' with 'indexing="ij"' has the same
+                # order as 'itertools.product'.
+                exponent_grid_tuple = np.meshgrid(
+                    *allowed_exponent_array_tuple, indexing="ij"
                 )
-            elif harmonicity_simplified_barlow >= minimal_barlow_harmonicity_terminal:
-                terminal_list.append(
-                    JustIntonationPitchTerminal(just_intonation_pitch.exponent_tuple)
+                exponent_array = np.zeros(
+                    (
+                        int(
+                            np.prod(
+                                [
+                                    len(allowed_exponent_array)
+                                    for allowed_exponent_array in allowed_exponent_array_tuple
+                                ]
+                            )
+                        ),
+                        len(ascending_prime_tuple),
+                    ),
+                    dtype=np.int64,
                 )
+                for prime_number, exponent_grid in zip(
+                    combined_prime_number_tuple, exponent_grid_tuple
+                ):
+                    if prime_number in prime_to_column_index_dict:
+                        exponent_array[:, prime_to_column_index_dict[prime_number]] = (
+                            exponent_grid.ravel()
+                        )
+                exponent_array_list.append(exponent_array)
+
+        if exponent_array_list:
+            exponent_array = np.concatenate(exponent_array_list)
+        else:
+            exponent_array = np.zeros((0, len(ascending_prime_tuple)), dtype=np.int64)
+
+        octave_array = np.array(allowed_octave_sequence, dtype=np.int64)
+        exponent_array = np.repeat(exponent_array, len(octave_array), axis=0)
+        octave_array = np.tile(
+            octave_array, len(exponent_array) // max(len(octave_array), 1)
+        )
+
+        # Register pitches: this is the same as
+        # 'JustIntonationPitch.register(octave)', which first
+        # normalizes the pitch and then adds the octave.
+        log2_prime_array = np.log2(np.array(ascending_prime_tuple, dtype=np.float64))
+        log2_array = exponent_array @ log2_prime_array
+        octave_shift_array = np.floor(log2_array).astype(np.int64)
+        fraction_array = log2_array - octave_shift_array
+        for index in np.flatnonzero(
+            np.minimum(fraction_array, 1 - fraction_array)
+            < zimmermann_generators.constants.FLOATING_POINT_TOLERANCE
+        ):
+            octave_shift_array[index] = PitchBasedContextFreeGrammar._get_octave_shift(
+                exponent_array[index].tolist(), ascending_prime_tuple
+            )
+        exponent_array[:, 0] += octave_array - octave_shift_array
+        cent_array = 1200 * (exponent_array @ log2_prime_array)
+
+        # Same as 'JustIntonationPitch.harmonicity_simplified_barlow'. We
+        # sum the indigestibility of each prime in ascending order, so that
+        # we get exactly the same floating point numbers.
+        indigestibility_numerator_array = np.zeros(len(exponent_array))
+        indigestibility_denominator_array = np.zeros(len(exponent_array))
+        for prime, exponent_column in zip(ascending_prime_tuple, exponent_array.T):
+            indigestibility_array = (
+                np.abs(exponent_column) * ((prime - 1) ** 2)
+            ) / prime
+            indigestibility_numerator_array += np.where(
+                exponent_column > 0, indigestibility_array, 0
+            )
+            indigestibility_denominator_array += np.where(
+                exponent_column < 0, indigestibility_array, 0
+            )
+        indigestibility_sum_array = 2 * indigestibility_numerator_array + (
+            2 * indigestibility_denominator_array
+        )
+        with np.errstate(divide="ignore"):
+            harmonicity_array = np.where(
+                indigestibility_sum_array == 0, 1, 1 / indigestibility_sum_array
+            )
+
+        return ascending_prime_tuple, exponent_array, cent_array, harmonicity_array
 
     @staticmethod
     def _get_terminal_tuple_and_non_terminal_tuple(
@@ -120,48 +453,302 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
         tuple[JustIntonationPitchNonTerminal, ...],
         tuple[JustIntonationPitchTerminal, ...],
     ]:
-        terminal_list = []
-        non_terminal_list = []
+        (
+            _,
+            exponent_array,
+            cent_array,
+            harmonicity_array,
+        ) = PitchBasedContextFreeGrammar._get_pitch_lattice(
+            prime_number_to_maximum_exponent_dict, allowed_octave_sequence, add_unison
+        )
+        return PitchBasedContextFreeGrammar._filter_pitch_lattice(
+            minimal_barlow_harmonicity_non_terminal,
+            minimal_barlow_harmonicity_terminal,
+            maximum_cent_deviation,
+            exponent_array,
+            cent_array,
+            harmonicity_array,
+        )
 
-        prime_number_tuple = tuple(prime_number_to_maximum_exponent_dict.keys())
-        prime_number_to_allowed_exponent_tuple_dict = {
-            prime_number: PitchBasedContextFreeGrammar._maximum_exponent_to_allowed_exponent_tuple(
-                maximum_exponent
-            )
-            for prime_number, maximum_exponent in prime_number_to_maximum_exponent_dict.items()
-        }
-        # All occuring primes until the highest prime
-        try:
-            ascending_prime_tuple = tuple(primerange(max(prime_number_tuple) + 1))
-        # If there are no prime numbers we can simply use an empty tuple
-        except ValueError:
-            ascending_prime_tuple = tuple([])
+    @staticmethod
+    def _filter_pitch_lattice(
+        minimal_barlow_harmonicity_non_terminal: float,
+        minimal_barlow_harmonicity_terminal: float,
+        maximum_cent_deviation: float,
+        exponent_array: np.ndarray,
+        cent_array: np.ndarray,
+        harmonicity_array: np.ndarray,
+    ) -> tuple[
+        tuple[JustIntonationPitchNonTerminal, ...],
+        tuple[JustIntonationPitchTerminal, ...],
+    ]:
+        (
+            is_non_terminal_array,
+            is_terminal_array,
+        ) = PitchBasedContextFreeGrammar._get_is_non_terminal_and_is_terminal_array(
+            minimal_barlow_harmonicity_non_terminal,
+            minimal_barlow_harmonicity_terminal,
+            maximum_cent_deviation,
+            exponent_array,
+            cent_array,
+            harmonicity_array,
+        )
+        # Only now we create pitch objects
+        non_terminal_tuple = tuple(
+            JustIntonationPitchNonTerminal(exponent_list)
+            for exponent_list in exponent_array[is_non_terminal_array].tolist()
+        )
+        terminal_tuple = tuple(
+            JustIntonationPitchTerminal(exponent_list)
+            for exponent_list in exponent_array[is_terminal_array].tolist()
+        )
+        return non_terminal_tuple, terminal_tuple
 
-        for n_prime_numbers in range(
-            not add_unison, len(prime_number_to_maximum_exponent_dict) + 1
+    @staticmethod
+    def _get_is_non_terminal_and_is_terminal_array(
+        minimal_barlow_harmonicity_non_terminal: float,
+        minimal_barlow_harmonicity_terminal: float,
+        maximum_cent_deviation: float,
+        exponent_array: np.ndarray,
+        cent_array: np.ndarray,
+        harmonicity_array: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        absolute_cent_array = np.abs(cent_array)
+        is_in_ambitus_array = absolute_cent_array <= maximum_cent_deviation
+        # Our cent values may differ in the last digits from the cent
+        # values of 'JustIntonationPitch'. So for pitches which are close
+        # to the border we ask the pitch object.
+        for index in np.flatnonzero(
+            np.abs(absolute_cent_array - maximum_cent_deviation)
+            < zimmermann_generators.constants.FLOATING_POINT_TOLERANCE
         ):
-            for combined_prime_number_tuple in itertools.combinations(
-                prime_number_tuple, n_prime_numbers
+            is_in_ambitus_array[index] = (
+                abs(
+                    music_parameters.JustIntonationPitch(
+                        exponent_array[index].tolist()
+                    ).interval
+                )
+                <= maximum_cent_deviation
+            )
+        is_non_terminal_array = is_in_ambitus_array & (
+            harmonicity_array >= minimal_barlow_harmonicity_non_terminal
+        )
+        is_terminal_array = (
+            is_in_ambitus_array
+            & np.logical_not(is_non_terminal_array)
+            & (harmonicity_array >= minimal_barlow_harmonicity_terminal)
+        )
+        return is_non_terminal_array, is_terminal_array
+
+    @staticmethod
+    def _get_exponent_array(
+        pitch_tuple: tuple[music_parameters.JustIntonationPitch, ...],
+        column_count: int,
+    ) -> np.ndarray:
+        # Exponent tuples of pitches have different lengths (trailing
+        # zeros are discarded), so we fill them up with zeros.
+        exponent_array = np.zeros((len(pitch_tuple), column_count), dtype=np.int64)
+        for row_index, pitch in enumerate(pitch_tuple):
+            exponent_tuple = pitch.exponent_tuple
+            exponent_array[row_index, : len(exponent_tuple)] = exponent_tuple
+        return exponent_array
+
+    @staticmethod
+    def _get_element0_element1_and_non_terminal_tuple(
+        element_tuple: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        non_terminal_tuple: tuple[JustIntonationPitchNonTerminal, ...],
+    ) -> tuple[
+        tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            JustIntonationPitchNonTerminal,
+        ],
+        ...,
+    ]:
+        """Find all element pairs which sum up to a non-terminal.
+
+        The pairs are returned in the same order as
+        ``itertools.combinations(element_tuple, 2)`` would return them.
+        Instead of adding pitch objects, each element is converted
+        once to an integer key, so that the key of the sum of two
+        elements is the sum of their keys (the exponents are written as
+        digits of a mixed radix number which is big enough for all
+        sums). The keys of all pairs are then added at once with
+        ``numpy`` and matched against the sorted keys of the
+        non-terminals. Pitch objects are only touched for the pairs
+        which match.
+        """
+
+        if not element_tuple or not non_terminal_tuple:
+            return tuple([])
+
+        column_count = max(
+            len(pitch.exponent_tuple) for pitch in element_tuple + non_terminal_tuple
+        )
+        element_exponent_array = PitchBasedContextFreeGrammar._get_exponent_array(
+            element_tuple, column_count
+        )
+        non_terminal_exponent_array = PitchBasedContextFreeGrammar._get_exponent_array(
+            non_terminal_tuple, column_count
+        )
+        (
+            element_index0_array,
+            element_index1_array,
+            non_terminal_index_array,
+        ) = PitchBasedContextFreeGrammar._get_pair_index_array_tuple(
+            element_exponent_array, non_terminal_exponent_array
+        )
+        return tuple(
+            (
+                element_tuple[element_index0],
+                element_tuple[element_index1],
+                non_terminal_tuple[non_terminal_index],
+            )
+            for element_index0, element_index1, non_terminal_index in zip(
+                element_index0_array.tolist(),
+                element_index1_array.tolist(),
+                non_terminal_index_array.tolist(),
+            )
+        )
+
+    @staticmethod
+    def _get_pair_index_array_tuple(
+        element_exponent_array: np.ndarray,
+        non_terminal_exponent_array: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find all element pairs which sum up to a non-terminal by their index.
+
+        :return: The index of the first element, the index of the second
+            element and the index of the non-terminal (of the first
+            non-terminal with the same exponents) of each pair. The pairs
+            are in the same order as ``itertools.combinations``.
+        """
+
+        empty_index_array = np.zeros(0, dtype=np.int64)
+        if not len(element_exponent_array) or not len(non_terminal_exponent_array):
+            return empty_index_array, empty_index_array, empty_index_array
+
+        # Each column of a sum is between the doubled minimum and the
+        # doubled maximum of the column of the elements.
+        minimum_list = element_exponent_array.min(axis=0).tolist()
+        radix_list = [
+            2 * (maximum - minimum) + 1
+            for minimum, maximum in zip(
+                minimum_list, element_exponent_array.max(axis=0).tolist()
+            )
+        ]
+        multiplier_list, key_count = [], 1
+        for radix in radix_list:
+            multiplier_list.append(key_count)
+            key_count *= radix
+        # Fall back to python integers if keys could overflow
+        dtype = np.int64 if key_count < 2**62 else object
+        multiplier_array = np.array(multiplier_list, dtype=dtype)
+        minimum_array = np.array(minimum_list, dtype=np.int64)
+        element_key_array = (element_exponent_array - minimum_array).astype(
+            dtype
+        ) @ multiplier_array
+
+        # Non-terminals which aren't in the range of the sums can't be
+        # found (and their key may collide with other keys).
+        non_terminal_index_array = np.flatnonzero(
+            np.all(
+                (non_terminal_exponent_array >= 2 * minimum_array)
+                & (
+                    non_terminal_exponent_array
+                    < 2 * minimum_array + np.array(radix_list, dtype=np.int64)
+                ),
+                axis=1,
+            )
+        )
+        # 'np.unique' returns the index of the first occurrence of each
+        # key (equal to 'tuple.index').
+        non_terminal_key_array, first_index_array = np.unique(
+            (
+                non_terminal_exponent_array[non_terminal_index_array]
+                - 2 * minimum_array
+            ).astype(dtype)
+            @ multiplier_array,
+            return_index=True,
+        )
+        non_terminal_index_array = non_terminal_index_array[first_index_array]
+        if not len(non_terminal_key_array):
+            return empty_index_array, empty_index_array, empty_index_array
+
+        element_count = len(element_exponent_array)
+        row_count = max(_PAIR_CHUNK_SIZE // element_count, 1)
+        column_index_array = np.arange(element_count)
+        index_array_list_tuple = ([], [], [])
+        for row_start in range(0, element_count, row_count):
+            row_stop = min(row_start + row_count, element_count)
+            pair_key_array = (
+                element_key_array[row_start:row_stop, np.newaxis]
+                + element_key_array[np.newaxis, :]
+            )
+            position_array = np.searchsorted(non_terminal_key_array, pair_key_array)
+            np.minimum(
+                position_array, len(non_terminal_key_array) - 1, out=position_array
+            )
+            is_match_array = (
+                non_terminal_key_array[position_array] == pair_key_array
+            ) & (
+                column_index_array[np.newaxis, :]
+                > np.arange(row_start, row_stop)[:, np.newaxis]
+            )
+            # 'np.nonzero' returns the indices in row-major order, which
+            # is the order of 'itertools.combinations'.
+            row_index_array, element_index1_array = np.nonzero(is_match_array)
+            for index_array_list, index_array in zip(
+                index_array_list_tuple,
+                (
+                    row_index_array + row_start,
+                    element_index1_array,
+                    non_terminal_index_array[
+                        position_array[row_index_array, element_index1_array]
+                    ],
+                ),
             ):
-                for exponent_tuple in itertools.product(
-                    *[
-                        prime_number_to_allowed_exponent_tuple_dict[prime_number]
-                        for prime_number in combined_prime_number_tuple
-                    ]
-                ):
-                    for octave in allowed_octave_sequence:
-                        PitchBasedContextFreeGrammar._add_pitch_to_terminal_list_or_non_terminal_list(
-                            minimal_barlow_harmonicity_non_terminal,
-                            minimal_barlow_harmonicity_terminal,
-                            combined_prime_number_tuple,
-                            exponent_tuple,
-                            ascending_prime_tuple,
-                            non_terminal_list,
-                            terminal_list,
-                            octave,
-                            maximum_cent_deviation,
-                        )
-        return tuple(non_terminal_list), tuple(terminal_list)
+                index_array_list.append(index_array.astype(np.int64))
+        return tuple(
+            np.concatenate(index_array_list)
+            for index_array_list in index_array_list_tuple
+        )
+
+    @staticmethod
+    def _get_context_free_grammar_rule_list(
+        element0_element1_and_non_terminal_iterable: typing.Iterable[
+            tuple[
+                typing.Union[
+                    JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+                ],
+                typing.Union[
+                    JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+                ],
+                JustIntonationPitchNonTerminal,
+            ]
+        ],
+    ) -> list[common_generators.ContextFreeGrammarRule]:
+        # Each pair can be added in both orders
+        rule_list = []
+        for (
+            element0,
+            element1,
+            non_terminal,
+        ) in element0_element1_and_non_terminal_iterable:
+            rule_list.extend(
+                (
+                    common_generators.ContextFreeGrammarRule(
+                        non_terminal, (element0, element1)
+                    ),
+                    common_generators.ContextFreeGrammarRule(
+                        non_terminal, (element1, element0)
+                    ),
+                )
+            )
+        return rule_list
 
     @classmethod
     def from_constraints(
@@ -177,6 +764,8 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
         allowed_octave_sequence: typing.Sequence[int] = (-1, 0),
         maximum_cent_deviation: float = 500,
         add_unison: bool = False,
+        cache_directory: typing.Optional[str] = None,
+        status_cache: typing.Optional[zimmermann_generators.StatusCache] = None,
     ) -> PitchBasedContextFreeGrammar:
         """Create rules based on various constraints.
 
@@ -185,6 +774,22 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
         :param allowed_octave_sequence:
         :param maximum_cent_deviation:
         :param add_unison:
+        :param cache_directory: If set, the grammar is loaded from this
+            directory if it has already been created with the same
+            constraints and otherwise saved to this directory (see
+            :class:`mutwo.zimmermann_generators.GrammarCache`). If ``None``
+            the directory is read from the environment variable which is
+            named in
+            :const:`mutwo.zimmermann_generators.configurations.GRAMMAR_CACHE_DIRECTORY_ENVIRONMENT_VARIABLE_NAME`.
+            If this variable isn't set either, no cache is used.
+            Default to ``None``.
+        :type cache_directory: typing.Optional[str]
+        :param status_cache: The cache which remembers which derivations
+            are valid. It can be shared between grammars which are created
+            with the same constraints. If ``None`` a new
+            :class:`mutwo.zimmermann_generators.StatusCache` is created.
+            Default to ``None``.
+        :type status_cache: typing.Optional[mutwo.zimmermann_generators.StatusCache]
         """
 
         assert (
@@ -192,6 +797,35 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
             > minimal_barlow_harmonicity_terminal
         )
 
+        if cache_directory is None:
+            cache_directory = os.environ.get(
+                zimmermann_generators.configurations.GRAMMAR_CACHE_DIRECTORY_ENVIRONMENT_VARIABLE_NAME
+            )
+        if cache_directory:
+            grammar_cache = zimmermann_generators.GrammarCache(cache_directory)
+            # Arguments may be numpy numbers, which can't be
+            # serialized to JSON.
+            grammar_key = grammar_cache.get_key(
+                float(minimal_barlow_harmonicity_non_terminal),
+                float(minimal_barlow_harmonicity_terminal),
+                # Keep order: it defines the order of the symbols
+                [
+                    [int(prime_number), int(maximum_exponent)]
+                    for (
+                        prime_number,
+                        maximum_exponent,
+                    ) in prime_number_to_maximum_exponent_dict.items()
+                ],
+                [int(octave) for octave in allowed_octave_sequence],
+                float(maximum_cent_deviation),
+                bool(add_unison),
+            )
+            cached = grammar_cache.load(grammar_key)
+            if cached is not None:
+                return cls(cached[2], status_cache)
+        else:
+            grammar_cache = None
+
         (
             non_terminal_tuple,
             terminal_tuple,
@@ -204,73 +838,2775 @@ class PitchBasedContextFreeGrammar(common_generators.ContextFreeGrammar):
             add_unison,
         )
 
-        element_iterator = filter(
-            lambda terminal_or_non_terminal: terminal_or_non_terminal
-            != music_parameters.JustIntonationPitch("1/1"),
-            non_terminal_tuple + terminal_tuple,
+        element_tuple = tuple(
+            terminal_or_non_terminal
+            for terminal_or_non_terminal in non_terminal_tuple + terminal_tuple
+            # Ignore 1/1
+            if terminal_or_non_terminal.exponent_tuple
         )
-        rule_list = []
-        for element0, element1 in itertools.combinations(element_iterator, 2):
-            summed = element0 + element1
-            if summed in non_terminal_tuple:
-                non_terminal = non_terminal_tuple[non_terminal_tuple.index(summed)]
-                rule_list.extend(
-                    (
-                        common_generators.ContextFreeGrammarRule(
-                            non_terminal, (element0, element1)
-                        ),
-                        common_generators.ContextFreeGrammarRule(
-                            non_terminal, (element1, element0)
+        rule_list = cls._get_context_free_grammar_rule_list(
+            cls._get_element0_element1_and_non_terminal_tuple(
+                element_tuple, non_terminal_tuple
+            )
+        )
+        if grammar_cache is not None:
+            grammar_cache.save(
+                grammar_key, non_terminal_tuple, terminal_tuple, rule_list
+            )
+        return cls(rule_list, status_cache)
+
+    @classmethod
+    def from_constraint_grid(
+        cls,
+        minimal_barlow_harmonicity_non_terminal_sequence: typing.Sequence[float] = (
+            0.1,
+        ),
+        minimal_barlow_harmonicity_terminal_sequence: typing.Sequence[float] = (0.05,),
+        prime_number_to_maximum_exponent_dict: dict[int, int] = {
+            3: 2,
+            5: 1,
+            7: 1,
+            11: 1,
+        },
+        allowed_octave_sequence_sequence: typing.Sequence[typing.Sequence[int]] = (
+            (-1, 0),
+        ),
+        maximum_cent_deviation_sequence: typing.Sequence[float] = (500,),
+        add_unison: bool = False,
+        worker_count: typing.Optional[int] = None,
+    ) -> dict[
+        tuple[float, float, tuple[int, ...], float], PitchBasedContextFreeGrammar
+    ]:
+        """Create grammars for each combination of the given constraints.
+
+        :param minimal_barlow_harmonicity_non_terminal_sequence: All tested
+            values of ``minimal_barlow_harmonicity_non_terminal`` (see
+            :meth:`from_constraints`).
+        :type minimal_barlow_harmonicity_non_terminal_sequence: typing.Sequence[float]
+        :param minimal_barlow_harmonicity_terminal_sequence: All tested
+            values of ``minimal_barlow_harmonicity_terminal``.
+        :type minimal_barlow_harmonicity_terminal_sequence: typing.Sequence[float]
+        :param prime_number_to_maximum_exponent_dict: The same for all
+            grammars.
+        :type prime_number_to_maximum_exponent_dict: dict[int, int]
+        :param allowed_octave_sequence_sequence: All tested values of
+            ``allowed_octave_sequence``.
+        :type allowed_octave_sequence_sequence: typing.Sequence[typing.Sequence[int]]
+        :param maximum_cent_deviation_sequence: All tested values of
+            ``maximum_cent_deviation``.
+        :type maximum_cent_deviation_sequence: typing.Sequence[float]
+        :param add_unison: The same for all grammars.
+        :type add_unison: bool
+        :param worker_count: If set to a number bigger than 1, the grammars
+            are created in parallel by the given number of processes.
+            Default to ``None``.
+        :type worker_count: typing.Optional[int]
+        :return: A dict where the keys are the constraints of each grammar
+            as a tuple ``(minimal_barlow_harmonicity_non_terminal,
+            minimal_barlow_harmonicity_terminal, allowed_octave_tuple,
+            maximum_cent_deviation)`` in the order of
+            ``itertools.product``. Combinations where the minimal
+            harmonicity of non-terminals isn't bigger than the minimal
+            harmonicity of terminals are skipped.
+
+        Each grammar is equal to the grammar which
+        :meth:`from_constraints` returns for the same constraints (also
+        the order of the rules is the same). But the candidate pitches,
+        their cent values and harmonicities and all pairs of candidates
+        which sum up to another candidate are only calculated once for
+        the loosest constraints of the grid: for each grammar these
+        arrays are only filtered. In the current process pitch objects
+        are also only created once, so grammars of the same grid share
+        their pitches. If ``worker_count`` is bigger than 1, each grammar
+        is sent back from a worker process and is an independent copy
+        with its own pitch objects. Each grammar gets its own
+        :class:`mutwo.zimmermann_generators.StatusCache`.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> grammar_dict = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraint_grid(
+        >>>         minimal_barlow_harmonicity_terminal_sequence=(0.04, 0.05),
+        >>>         maximum_cent_deviation_sequence=(500, 700),
+        >>>     )
+        >>> )
+        >>> tuple(grammar_dict)
+        ((0.1, 0.04, (-1, 0), 500), (0.1, 0.04, (-1, 0), 700), (0.1, 0.05, (-1, 0), 500), (0.1, 0.05, (-1, 0), 700))
+        """
+
+        constraint_tuple_tuple = tuple(
+            dict.fromkeys(
+                (
+                    minimal_barlow_harmonicity_non_terminal,
+                    minimal_barlow_harmonicity_terminal,
+                    tuple(allowed_octave_sequence),
+                    maximum_cent_deviation,
+                )
+                for (
+                    minimal_barlow_harmonicity_non_terminal,
+                    minimal_barlow_harmonicity_terminal,
+                    allowed_octave_sequence,
+                    maximum_cent_deviation,
+                ) in itertools.product(
+                    minimal_barlow_harmonicity_non_terminal_sequence,
+                    minimal_barlow_harmonicity_terminal_sequence,
+                    allowed_octave_sequence_sequence,
+                    maximum_cent_deviation_sequence,
+                )
+                if minimal_barlow_harmonicity_non_terminal
+                > minimal_barlow_harmonicity_terminal
+            )
+        )
+        if not constraint_tuple_tuple:
+            return {}
+
+        constraint_grid = _ConstraintGrid(
+            cls,
+            prime_number_to_maximum_exponent_dict,
+            tuple(
+                dict.fromkeys(
+                    octave
+                    for _, _, allowed_octave_tuple, _ in constraint_tuple_tuple
+                    for octave in allowed_octave_tuple
+                )
+            ),
+            add_unison,
+            max(
+                maximum_cent_deviation
+                for _, _, _, maximum_cent_deviation in constraint_tuple_tuple
+            ),
+            min(
+                minimal_barlow_harmonicity_terminal
+                for _, minimal_barlow_harmonicity_terminal, _, _ in constraint_tuple_tuple
+            ),
+        )
+        if worker_count is None or worker_count < 2:
+            grammar_tuple = tuple(
+                constraint_grid.get_grammar(*constraint_tuple)
+                for constraint_tuple in constraint_tuple_tuple
+            )
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                worker_count,
+                initializer=_initialize_constraint_grid_worker,
+                initargs=(constraint_grid,),
+            ) as executor:
+                grammar_tuple = tuple(
+                    executor.map(
+                        _get_constraint_grid_grammar,
+                        constraint_tuple_tuple,
+                        chunksize=max(
+                            len(constraint_tuple_tuple) // (worker_count * 4), 1
                         ),
                     )
                 )
-        return cls(rule_list)
+        return dict(zip(constraint_tuple_tuple, grammar_tuple))
 
-    def _data_to_tag(
+    def get_context_free_grammar_rule_tuple(
+        self, non_terminal: JustIntonationPitchNonTerminal
+    ) -> tuple[common_generators.ContextFreeGrammarRule, ...]:
+        try:
+            index = self._exponent_tuple_to_non_terminal_index[
+                non_terminal.exponent_tuple
+            ]
+        except KeyError:
+            raise ValueError(f"{non_terminal} is not a non-terminal of the grammar")
+        return self._divided_context_free_grammar_rule_tuple[index]
+
+    def _get_symbol_id_tuple(
         self,
         data: tuple[
             typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
             ...,
         ],
-    ) -> str:
-        return "({})".format(
-            " ".join([f"{pitch.numerator}/{pitch.denominator}" for pitch in data])
+        symbol_list: list[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+        symbol_key_to_symbol_id: dict[tuple[bool, tuple[int, ...]], int],
+        symbol_id_to_exponent_tuple: list[tuple[int, ...]],
+    ) -> tuple[int, ...]:
+        # Symbols which aren't part of the grammar (e.g. an unknown start)
+        # get new ids: they are added to the given copies of the tables.
+        symbol_id_list = []
+        for symbol in data:
+            symbol_key = self._get_symbol_key(symbol)
+            try:
+                symbol_id = symbol_key_to_symbol_id[symbol_key]
+            except KeyError:
+                symbol_id = symbol_key_to_symbol_id[symbol_key] = len(symbol_list)
+                symbol_list.append(symbol)
+                symbol_id_to_exponent_tuple.append(symbol.exponent_tuple)
+            symbol_id_list.append(symbol_id)
+        return tuple(symbol_id_list)
+
+    def _get_symbol_table_copy(
+        self,
+    ) -> tuple[
+        list[typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]],
+        dict[tuple[bool, tuple[int, ...]], int],
+        list[tuple[int, ...]],
+    ]:
+        return (
+            list(self._symbol_tuple),
+            dict(self._symbol_key_to_symbol_id),
+            list(self._symbol_id_to_exponent_tuple),
         )
 
-    def _add_node(
+    def _iter_symbol_id_expansion(
         self,
-        tree: treelib.Tree,
-        data: tuple[
-            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
-            ...,
+        symbol_id_tuple: tuple[int, ...],
+        symbol_list: list[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
         ],
-        parent: typing.Optional[treelib.Node] = None,
-    ):
-        exponent_tuple_tuple = tuple(
-            just_intonation_pitch.exponent_tuple for just_intonation_pitch in data
+    ) -> typing.Iterator[tuple[int, int, tuple[int, ...]]]:
+        # Yield position, rule index and symbol ids of all possible
+        # expansions in the same order as '_resolve_content'.
+        non_terminal_count = len(self._non_terminal_tuple)
+        divided_context_free_grammar_rule_index_tuple = (
+            self._divided_context_free_grammar_rule_index_tuple
         )
-        if exponent_tuple_tuple in self._exponent_tuple_tuple_to_status:
-            status = self._exponent_tuple_tuple_to_status[exponent_tuple_tuple]
-        else:
-            # We only add an element if the goal isn't already reached
-            # in a step in between and if there aren't any pitch
-            # repetitions.
-            pitch_accumulation = tuple(
-                core_utilities.accumulate_from_n(
-                    data, music_parameters.JustIntonationPitch("1/1")
+        rule_right_side_symbol_id_tuple = self._rule_right_side_symbol_id_tuple
+        for position, symbol_id in enumerate(symbol_id_tuple):
+            if symbol_id >= non_terminal_count:
+                if isinstance(symbol_list[symbol_id], common_generators.NonTerminal):
+                    raise ValueError(
+                        f"{symbol_list[symbol_id]} is not a non-terminal of the grammar"
+                    )
+                continue
+            for (
+                context_free_grammar_rule_index
+            ) in divided_context_free_grammar_rule_index_tuple[symbol_id]:
+                yield position, context_free_grammar_rule_index, (
+                    symbol_id_tuple[:position]
+                    + rule_right_side_symbol_id_tuple[context_free_grammar_rule_index]
+                    + symbol_id_tuple[position + 1 :]
                 )
+
+    def _iter_accepted_symbol_id_expansion(
+        self,
+        symbol_id_tuple: tuple[int, ...],
+        symbol_list: list[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+        symbol_id_to_exponent_tuple: typing.Sequence[tuple[int, ...]],
+        is_feasible: typing.Optional[
+            typing.Callable[[tuple[int, ...], typing.Optional[int]], bool]
+        ],
+        remaining_depth: typing.Optional[int],
+    ) -> typing.Iterator[tuple[int, int, tuple[int, ...]]]:
+        # Same as '_iter_symbol_id_expansion', but only yield the
+        # expansions which pass the filter and the pruning: these are
+        # the children of the node in the tree of 'resolve'. All tested
+        # expansions are counted by the profile (the caller counts the
+        # accepted ones).
+        profile = self.profile
+        for (
+            position,
+            context_free_grammar_rule_index,
+            child_symbol_id_tuple,
+        ) in self._iter_symbol_id_expansion(symbol_id_tuple, symbol_list):
+            if profile is not None:
+                profile.generated_node_count += 1
+            if self._is_symbol_id_tuple_valid(
+                child_symbol_id_tuple, symbol_id_to_exponent_tuple
+            ) and (
+                is_feasible is None
+                or is_feasible(child_symbol_id_tuple, remaining_depth)
+            ):
+                yield position, context_free_grammar_rule_index, child_symbol_id_tuple
+
+    def _get_symbol_value_tuple_pair(
+        self,
+    ) -> tuple[tuple[float, ...], tuple[float, ...]]:
+        if self._symbol_id_to_cent is None:
+            self._symbol_id_to_cent = tuple(
+                symbol.interval for symbol in self._symbol_tuple
+            )
+            self._symbol_id_to_harmonicity = tuple(
+                symbol.harmonicity_simplified_barlow for symbol in self._symbol_tuple
             )
+        return self._symbol_id_to_cent, self._symbol_id_to_harmonicity
+
+    def _get_optimistic_bound_tuple(
+        self, remaining_depth: typing.Optional[int]
+    ) -> tuple[
+        typing.Optional[tuple[tuple[float, ...], tuple[float, ...]]],
+        typing.Optional[tuple[float, ...]],
+    ]:
+        """Get bounds of all derivations of each symbol within the depth.
+
+        Return the lowest and the highest accumulated pitch (relative to
+        the start of the symbol) and the highest harmonicity sum which
+        each known symbol can reach within the remaining depth (each
+        symbol may use all remaining expansions, so these bounds are
+        optimistic). A part is ``None`` if it doesn't converge for an
+        unlimited depth.
+        """
 
-            # Special treatment for movement 1/1: here the first and the
-            # last pitches are equal and we should skip one in order
-            # to pass the test.
-            if pitch_accumulation[0] == pitch_accumulation[-1]:
-                pitch_accumulation = pitch_accumulation[1:]
+        if self._optimistic_bound_list is None:
+            symbol_id_to_cent, symbol_id_to_harmonicity = (
+                self._get_symbol_value_tuple_pair()
+            )
+            self._optimistic_bound_list = [
+                (
+                    tuple(min(0, cent) for cent in symbol_id_to_cent),
+                    tuple(max(0, cent) for cent in symbol_id_to_cent),
+                    symbol_id_to_harmonicity,
+                )
+            ]
 
-            status = len(core_utilities.uniqify_sequence(pitch_accumulation)) == len(
-                pitch_accumulation
+        bound_list = self._optimistic_bound_list
+        maximum_depth = _OPTIMISTIC_BOUND_MAXIMUM_DEPTH
+        while (
+            self._optimistic_cent_bound_depth is None
+            or self._optimistic_harmonicity_bound_depth is None
+        ) and len(bound_list) <= min(
+            maximum_depth,
+            maximum_depth if remaining_depth is None else remaining_depth,
+        ):
+            lowest_tuple, highest_tuple, harmonicity_tuple = bound_list[-1]
+            lowest_list, highest_list, harmonicity_list = (
+                list(lowest_tuple),
+                list(highest_tuple),
+                list(harmonicity_tuple),
             )
-            self._exponent_tuple_tuple_to_status.update({exponent_tuple_tuple: status})
+            cent_tuple = self._symbol_id_to_cent
+            for (
+                non_terminal_id,
+                context_free_grammar_rule_index_tuple,
+            ) in enumerate(self._divided_context_free_grammar_rule_index_tuple):
+                for (
+                    context_free_grammar_rule_index
+                ) in context_free_grammar_rule_index_tuple:
+                    offset, harmonicity_sum = 0, 0
+                    for symbol_id in self._rule_right_side_symbol_id_tuple[
+                        context_free_grammar_rule_index
+                    ]:
+                        lowest_list[non_terminal_id] = min(
+                            lowest_list[non_terminal_id],
+                            offset + lowest_tuple[symbol_id],
+                        )
+                        highest_list[non_terminal_id] = max(
+                            highest_list[non_terminal_id],
+                            offset + highest_tuple[symbol_id],
+                        )
+                        harmonicity_sum += harmonicity_tuple[symbol_id]
+                        offset += cent_tuple[symbol_id]
+                    harmonicity_list[non_terminal_id] = max(
+                        harmonicity_list[non_terminal_id], harmonicity_sum
+                    )
+            if (
+                self._optimistic_cent_bound_depth is None
+                and lowest_list == list(lowest_tuple)
+                and highest_list == list(highest_tuple)
+            ):
+                self._optimistic_cent_bound_depth = len(bound_list) - 1
+            if (
+                self._optimistic_harmonicity_bound_depth is None
+                and harmonicity_list == list(harmonicity_tuple)
+            ):
+                self._optimistic_harmonicity_bound_depth = len(bound_list) - 1
+            bound_list.append(
+                (tuple(lowest_list), tuple(highest_list), tuple(harmonicity_list))
+            )
+
+        def get_bound_index(converged_depth: typing.Optional[int]):
+            if converged_depth is not None:
+                if remaining_depth is None:
+                    return converged_depth
+                return min(remaining_depth, converged_depth)
+            if remaining_depth is None or remaining_depth >= len(bound_list):
+                return None
+            return remaining_depth
+
+        cent_bound_index = get_bound_index(self._optimistic_cent_bound_depth)
+        harmonicity_bound_index = get_bound_index(
+            self._optimistic_harmonicity_bound_depth
+        )
+        return (
+            None if cent_bound_index is None else bound_list[cent_bound_index][:2],
+            (
+                None
+                if harmonicity_bound_index is None
+                else bound_list[harmonicity_bound_index][2]
+            ),
+        )
+
+    def _get_feasibility_test(
+        self,
+        symbol_list: list[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+    ) -> typing.Optional[
+        typing.Callable[[tuple[int, ...], typing.Optional[int]], bool]
+    ]:
+        # Return a function which tests if a derivation (given as symbol
+        # ids) and its descendants within the remaining depth can still
+        # fulfill the constraints of the pruning. If there is no pruning
+        # nothing needs to be tested.
+        pruning = self.pruning
+        if pruning is None:
+            return None
+
+        tolerance = zimmermann_generators.constants.FLOATING_POINT_TOLERANCE
+        maximum_cent_range = pruning.maximum_cent_range
+        minimum_cent_range = pruning.minimum_cent_range
+        maximum_symbol_count = pruning.maximum_symbol_count
+        minimum_harmonicity_sum = pruning.minimum_harmonicity_sum
+        symbol_id_to_cent, symbol_id_to_harmonicity = (
+            self._get_symbol_value_tuple_pair()
+        )
+        known_symbol_count = len(symbol_id_to_cent)
+        # Symbols which aren't part of the grammar (e.g. an unknown start)
+        symbol_id_to_cent = list(symbol_id_to_cent)
+        symbol_id_to_harmonicity = list(symbol_id_to_harmonicity)
+        is_growing = self._is_growing
+
+        def is_feasible(
+            symbol_id_tuple: tuple[int, ...], remaining_depth: typing.Optional[int]
+        ) -> bool:
+            if (
+                maximum_symbol_count is not None
+                and len(symbol_id_tuple) > maximum_symbol_count
+            ):
+                return False
+            for symbol_id in range(len(symbol_id_to_cent), len(symbol_list)):
+                symbol = symbol_list[symbol_id]
+                symbol_id_to_cent.append(symbol.interval)
+                symbol_id_to_harmonicity.append(symbol.harmonicity_simplified_barlow)
+
+            if maximum_cent_range is not None:
+                offset = lowest = highest = 0
+                for symbol_id in symbol_id_tuple:
+                    offset += symbol_id_to_cent[symbol_id]
+                    if offset < lowest:
+                        lowest = offset
+                    elif offset > highest:
+                        highest = offset
+                if highest - lowest > maximum_cent_range + tolerance:
+                    return False
+
+            if minimum_cent_range is None and minimum_harmonicity_sum is None:
+                return True
+
+            # Each expansion adds at least one symbol: the maximum
+            # symbol count limits the remaining expansions.
+            if is_growing and maximum_symbol_count is not None:
+                symbol_count_depth = maximum_symbol_count - len(symbol_id_tuple)
+                if remaining_depth is None or symbol_count_depth < remaining_depth:
+                    remaining_depth = symbol_count_depth
+            cent_bound_pair, harmonicity_bound_tuple = self._get_optimistic_bound_tuple(
+                remaining_depth
+            )
+
+            if minimum_cent_range is not None and cent_bound_pair is not None:
+                lowest_bound_tuple, highest_bound_tuple = cent_bound_pair
+                offset = lowest = highest = 0
+                for symbol_id in symbol_id_tuple:
+                    if symbol_id < known_symbol_count:
+                        symbol_lowest = offset + lowest_bound_tuple[symbol_id]
+                        symbol_highest = offset + highest_bound_tuple[symbol_id]
+                    else:
+                        symbol_lowest = symbol_highest = offset
+                    offset += symbol_id_to_cent[symbol_id]
+                    lowest = min(lowest, symbol_lowest, offset)
+                    highest = max(highest, symbol_highest, offset)
+                if highest - lowest < minimum_cent_range - tolerance:
+                    return False
+
+            if (
+                minimum_harmonicity_sum is not None
+                and harmonicity_bound_tuple is not None
+            ):
+                harmonicity_sum = sum(
+                    (
+                        harmonicity_bound_tuple[symbol_id]
+                        if symbol_id < known_symbol_count
+                        else symbol_id_to_harmonicity[symbol_id]
+                    )
+                    for symbol_id in symbol_id_tuple
+                )
+                if harmonicity_sum < minimum_harmonicity_sum - tolerance:
+                    return False
+
+            return True
+
+        return is_feasible
+
+    def _data_to_tag(
+        self,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+    ) -> str:
+        return _data_to_tag(data)
+
+    def _is_valid(
+        self,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+    ) -> bool:
+        return self._is_exponent_tuple_tuple_valid_cached(
+            tuple(
+                just_intonation_pitch.exponent_tuple for just_intonation_pitch in data
+            )
+        )
+
+    def _is_exponent_tuple_tuple_valid_cached(
+        self, exponent_tuple_tuple: tuple[tuple[int, ...], ...]
+    ) -> bool:
+        if self.profile is not None:
+            return self._is_exponent_tuple_tuple_valid_profiled(exponent_tuple_tuple)
+        status_key = self._get_status_key(exponent_tuple_tuple)
+        # Pitches which aren't part of the grammar (e.g. an unknown start)
+        # can't be packed: their status isn't cached.
+        if status_key is None:
+            return self._is_exponent_tuple_tuple_valid(exponent_tuple_tuple)
+        status = self._status_cache.get(status_key)
+        if status is None:
+            status = self._is_exponent_tuple_tuple_valid(exponent_tuple_tuple)
+            self._status_cache.set(status_key, status)
+        return status
+
+    def _is_symbol_id_tuple_valid(
+        self,
+        symbol_id_tuple: tuple[int, ...],
+        symbol_id_to_exponent_tuple: typing.Sequence[tuple[int, ...]],
+    ) -> bool:
+        # Same as '_is_exponent_tuple_tuple_valid_cached', but the status
+        # key is packed directly from the symbol ids: exponent tuples are
+        # only needed if the status isn't cached yet.
+        symbol_id_to_symbol_number = self._symbol_id_to_symbol_number
+        symbol_number_base = self._symbol_number_base
+        status_key = 0
+        try:
+            for symbol_id in symbol_id_tuple:
+                status_key = (
+                    status_key * symbol_number_base
+                    + symbol_id_to_symbol_number[symbol_id]
+                )
+        # Symbols which aren't part of the grammar
+        except IndexError:
+            status_key = None
+        if status_key is None or self.profile is not None:
+            return self._is_exponent_tuple_tuple_valid_cached(
+                tuple(
+                    symbol_id_to_exponent_tuple[symbol_id]
+                    for symbol_id in symbol_id_tuple
+                )
+            )
+        status = self._status_cache.get(status_key)
+        if status is None:
+            status = self._is_exponent_tuple_tuple_valid(
+                tuple(
+                    symbol_id_to_exponent_tuple[symbol_id]
+                    for symbol_id in symbol_id_tuple
+                )
+            )
+            self._status_cache.set(status_key, status)
+        return status
+
+    def _is_exponent_tuple_tuple_valid_profiled(
+        self, exponent_tuple_tuple: tuple[tuple[int, ...], ...]
+    ) -> bool:
+        # Same as '_is_exponent_tuple_tuple_valid_cached', but with
+        # counters and timers: we keep it separated, so that grammars
+        # without profile aren't slowed down.
+        profile = self.profile
+        status_key = self._get_status_key(exponent_tuple_tuple)
+        status = None if status_key is None else self._status_cache.get(status_key)
+        if status is None:
+            profile.status_cache_miss_count += 1
+            start = time.perf_counter()
+            status = self._is_exponent_tuple_tuple_valid(exponent_tuple_tuple)
+            profile.accumulation_duration += time.perf_counter() - start
+            if status_key is not None:
+                self._status_cache.set(status_key, status)
+        else:
+            profile.status_cache_hit_count += 1
+        return status
+
+    def _get_status_key(
+        self, exponent_tuple_tuple: tuple[tuple[int, ...], ...]
+    ) -> typing.Optional[int]:
+        # Pack the numbers of all pitches into one integer: this needs
+        # much less memory than a tuple of exponent tuples.
+        exponent_tuple_to_symbol_number = self._exponent_tuple_to_symbol_number
+        symbol_number_base = self._symbol_number_base
+        status_key = 0
+        for exponent_tuple in exponent_tuple_tuple:
+            try:
+                symbol_number = exponent_tuple_to_symbol_number[exponent_tuple]
+            except KeyError:
+                return None
+            status_key = status_key * symbol_number_base + symbol_number
+        return status_key
+
+    @staticmethod
+    def _is_exponent_tuple_tuple_valid(
+        exponent_tuple_tuple: tuple[tuple[int, ...], ...],
+    ) -> bool:
+        # We only add an element if the goal isn't already reached
+        # in a step in between and if there aren't any pitch
+        # repetitions.
+        #
+        # This is the same as accumulating the pitches (starting
+        # with 1/1) and testing if all accumulated pitches are
+        # different. But instead of creating pitch objects, we only
+        # sum up the exponents.
+        exponent_list = [0] * max(map(len, exponent_tuple_tuple), default=0)
+        exponent_tuple_accumulation = [tuple(exponent_list)]
+        for exponent_tuple in exponent_tuple_tuple:
+            for index, exponent in enumerate(exponent_tuple):
+                exponent_list[index] += exponent
+            exponent_tuple_accumulation.append(tuple(exponent_list))
+
+        # Special treatment for movement 1/1: here the first and the
+        # last pitches are equal and we should skip one in order
+        # to pass the test.
+        if exponent_tuple_accumulation[0] == exponent_tuple_accumulation[-1]:
+            del exponent_tuple_accumulation[0]
+
+        return len(set(exponent_tuple_accumulation)) == len(exponent_tuple_accumulation)
+
+    def _add_node(
+        self,
+        tree: treelib.Tree,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        parent: typing.Optional[treelib.Node] = None,
+    ) -> typing.Optional[treelib.Node]:
+        if self.profile is not None:
+            self.profile.generated_node_count += 1
+        if self._is_valid(data):
+            return self._create_node(tree, data, parent)
+        return None
+
+    def _create_node(
+        self,
+        tree: treelib.Tree,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        parent: typing.Optional[treelib.Node] = None,
+    ) -> treelib.Node:
+        if self.profile is not None:
+            return self._create_node_profiled(tree, data, parent)
+        if self.add_tag:
+            if self._is_tag_lazy:
+                node = _LazyTagNode(data=data)
+            else:
+                node = treelib.Node(tag=self._data_to_tag(data), data=data)
+        else:
+            node = treelib.Node(data=data)
+        tree.add_node(node, parent)
+        return node
+
+    def _create_node_profiled(
+        self,
+        tree: treelib.Tree,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        parent: typing.Optional[treelib.Node] = None,
+    ) -> treelib.Node:
+        profile = self.profile
+        profile.accepted_node_count += 1
+        start = time.perf_counter()
+        if self.add_tag:
+            if self._is_tag_lazy:
+                node = _ProfiledLazyTagNode(data=data, profile=profile)
+            else:
+                tag_start = time.perf_counter()
+                tag = self._data_to_tag(data)
+                profile.tag_duration += time.perf_counter() - tag_start
+                node = treelib.Node(tag=tag, data=data)
+        else:
+            node = treelib.Node(data=data)
+        tree.add_node(node, parent)
+        profile.insertion_duration += time.perf_counter() - start
+        return node
+
+    def _expand(
+        self,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        position: int,
+        context_free_grammar_rule_index: int,
+    ) -> tuple[
+        typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+        ...,
+    ]:
+        return (
+            data[:position]
+            + self._context_free_grammar_rule_tuple[
+                context_free_grammar_rule_index
+            ].right_side
+            + data[position + 1 :]
+        )
+
+    def _get_layer_tuple(
+        self,
+        data: tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        limit: typing.Optional[int],
+    ) -> tuple[tuple[tuple[int, int, int], ...], ...]:
+        # Resolve data layer by layer (in the same order as 'resolve') and
+        # return for each accepted node the index of its parent in the
+        # previous layer, the position of the expansion and the index
+        # of the applied rule. The profile counts the tried rules of each
+        # layer, the accepted nodes are counted when they are added to
+        # a tree.
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        layer_list = []
+        symbol_id_tuple_list = [
+            self._get_symbol_id_tuple(
+                data, symbol_list, symbol_key_to_symbol_id, symbol_id_to_exponent_tuple
+            )
+        ]
+        is_feasible = self._get_feasibility_test(symbol_list)
+        profile = self.profile
+        while symbol_id_tuple_list and (limit is None or len(layer_list) < limit):
+            if profile is not None:
+                generated_node_count = profile.generated_node_count
+            remaining_depth = None if limit is None else limit - len(layer_list) - 1
+            layer, child_symbol_id_tuple_list = [], []
+            for parent_index, symbol_id_tuple in enumerate(symbol_id_tuple_list):
+                for (
+                    position,
+                    context_free_grammar_rule_index,
+                    child_symbol_id_tuple,
+                ) in self._iter_accepted_symbol_id_expansion(
+                    symbol_id_tuple,
+                    symbol_list,
+                    symbol_id_to_exponent_tuple,
+                    is_feasible,
+                    remaining_depth,
+                ):
+                    layer.append(
+                        (parent_index, position, context_free_grammar_rule_index)
+                    )
+                    child_symbol_id_tuple_list.append(child_symbol_id_tuple)
+            if profile is not None:
+                profile._add_tried_rule_count(
+                    len(layer_list) + 1,
+                    profile.generated_node_count - generated_node_count,
+                )
+            if layer:
+                layer_list.append(tuple(layer))
+            symbol_id_tuple_list = child_symbol_id_tuple_list
+        return tuple(layer_list)
+
+    def resolve(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+        worker_count: typing.Optional[int] = None,
+        split_depth: int = 1,
+    ) -> treelib.Tree:
+        """Resolve until only :class:`Terminal` are left or the limit is reached.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels until the function returns a tree.
+            If it is set to `None` it will only stop once all nodes are
+            :class:`Terminal`.
+        :type limit: typing.Optional[int]
+        :param worker_count: If set to a number bigger than 1, the subtrees
+            are resolved in parallel by the given number of processes.
+            Default to ``None``.
+        :type worker_count: typing.Optional[int]
+        :param split_depth: If resolved in parallel, the tree is resolved
+            until this depth in the current process. Each node of this
+            depth is the root of one subtree which is resolved by one of
+            the worker processes. Default to 1.
+        :type split_depth: int
+
+        The resulting tree of a parallel resolution is exactly the
+        same as the result of a serial resolution (also the order of
+        the nodes is equal).
+
+        Derivations are expanded with a precompiled table of the rules.
+        If a subclass overrides ``_resolve_content``, ``_add_node`` or
+        ``_is_valid``, the overridden methods are used instead (and the
+        tree is always resolved in the current process). The other
+        resolution methods (e.g. :meth:`resolve_compact`) always use the
+        table.
+        """
+
+        tree = treelib.Tree()
+        self._add_node(tree, (start,))
+        if worker_count is None or worker_count < 2 or not self._is_rule_table_used:
+            self._deepen(tree, limit, limit)
+            self._report_profile()
+            return tree
+
+        if limit is not None:
+            split_depth = min(split_depth, limit)
+        frontier_node_list = list(self._deepen(tree, split_depth, limit))
+        if not frontier_node_list or limit == split_depth:
+            self._report_profile()
+            return tree
+
+        with concurrent.futures.ProcessPoolExecutor(
+            worker_count,
+            initializer=_initialize_worker,
+            initargs=(self,),
+        ) as executor:
+            layer_tuple_tuple, worker_profile_tuple = zip(
+                *executor.map(
+                    _get_layer_tuple,
+                    (node.data for node in frontier_node_list),
+                    itertools.repeat(None if limit is None else limit - split_depth),
+                    chunksize=max(len(frontier_node_list) // (worker_count * 4), 1),
+                )
+            )
+        if self.profile is not None:
+            for worker_profile in worker_profile_tuple:
+                self.profile._add_profile(worker_profile, split_depth)
+
+        # Merge subtrees layer by layer, so that the nodes are added
+        # in the same order as in a serial resolution.
+        parent_node_list_list = [[node] for node in frontier_node_list]
+        for layer_index in range(max(map(len, layer_tuple_tuple))):
+            for subtree_index, layer_tuple in enumerate(layer_tuple_tuple):
+                parent_node_list = parent_node_list_list[subtree_index]
+                node_list = []
+                if layer_index < len(layer_tuple):
+                    for (
+                        parent_index,
+                        position,
+                        context_free_grammar_rule_index,
+                    ) in layer_tuple[layer_index]:
+                        parent_node = parent_node_list[parent_index]
+                        node_list.append(
+                            self._create_node(
+                                tree,
+                                self._expand(
+                                    parent_node.data,
+                                    position,
+                                    context_free_grammar_rule_index,
+                                ),
+                                parent_node,
+                            )
+                        )
+                parent_node_list_list[subtree_index] = node_list
+        self._report_profile()
+        return tree
+
+    async def resolve_async(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+        deadline: typing.Optional[float] = None,
+        maximum_node_count: typing.Optional[int] = None,
+        interval: typing.Optional[float] = None,
+    ) -> tuple[treelib.Tree, bool]:
+        """Resolve without blocking the event loop.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels until the function returns a tree.
+            If it is set to `None` it will only stop once all nodes are
+            :class:`Terminal`.
+        :type limit: typing.Optional[int]
+        :param deadline: If set, the resolution stops when the time of
+            the running event loop reaches the deadline (e.g.
+            ``asyncio.get_running_loop().time() + 2`` to resolve at
+            most two seconds). Default to ``None``.
+        :type deadline: typing.Optional[float]
+        :param maximum_node_count: If set, the resolution stops before
+            the tree would have more nodes. Default to ``None``.
+        :type maximum_node_count: typing.Optional[int]
+        :param interval: How many seconds the resolution runs before it
+            gives control back to the event loop. If ``None`` the value of
+            :const:`mutwo.zimmermann_generators.configurations.DEFAULT_ASYNC_RESOLVE_INTERVAL`
+            is used. Default to ``None``.
+        :type interval: typing.Optional[float]
+        :return: The tree and ``True`` if the resolution is complete
+            (it is then the same tree as :meth:`resolve` returns) or
+            ``False`` if it has been stopped by the deadline or the
+            maximum node count. The last level of a stopped tree may
+            only contain the children of some of the nodes of the
+            previous level.
+
+        The resolution only gives control back to the event loop between
+        the expansions of two nodes, when all changes of the tree and of
+        the status cache are finished. So if the task is cancelled, the
+        status cache stays consistent and can still be used by the grammar.
+
+        **Example:**
+
+        >>> import asyncio
+        >>> from mutwo import zimmermann_generators
+        >>> pitch_based_context_free_grammar = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+        >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+        >>>         maximum_cent_deviation=550,
+        >>>     )
+        >>> )
+        >>> tree, is_complete = asyncio.run(
+        >>>     pitch_based_context_free_grammar.resolve_async(
+        >>>         zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>         limit=3,
+        >>>         maximum_node_count=4,
+        >>>     )
+        >>> )
+        >>> len(tree), is_complete
+        (4, False)
+        """
+
+        if maximum_node_count is not None and maximum_node_count < 1:
+            raise ValueError(
+                f"Found illegal maximum node count '{maximum_node_count}'."
+            )
+        if interval is None:
+            interval = (
+                zimmermann_generators.configurations.DEFAULT_ASYNC_RESOLVE_INTERVAL
+            )
+        loop = asyncio.get_running_loop()
+        tree = treelib.Tree()
+        self._add_node(tree, (start,))
+        deepening = self._iter_deepen(
+            tree, limit, limit, maximum_node_count=maximum_node_count
+        )
+        is_complete = False
+        pause_time = loop.time() + interval
+        try:
+            while deadline is None or loop.time() < deadline:
+                try:
+                    next(deepening)
+                except StopIteration as stop_iteration:
+                    _, is_complete = stop_iteration.value
+                    break
+                if loop.time() >= pause_time:
+                    await asyncio.sleep(0)
+                    pause_time = loop.time() + interval
+        finally:
+            deepening.close()
+        self._report_profile()
+        return tree, is_complete
+
+    def _report_profile(self):
+        if self.profile is not None:
+            self.profile._report()
+
+    def get_frontier_node_tuple(self, tree: treelib.Tree) -> tuple[treelib.Node, ...]:
+        """Get all nodes of the deepest level of a resolved tree.
+
+        :param tree: A tree which has been returned by :meth:`resolve`.
+        :type tree: treelib.Tree
+
+        Only these nodes can still be resolved further: all other leaves
+        either only contain :class:`Terminal` or all their possible
+        children have been rejected.
+        """
+
+        if tree.root is None:
+            return tuple([])
+        depth = tree.depth()
+        return tuple(
+            leaf for leaf in tree.leaves() if tree.level(leaf.identifier) == depth
+        )
+
+    def deepen(
+        self,
+        tree: treelib.Tree,
+        limit: typing.Optional[int] = 1,
+        frontier_node_sequence: typing.Optional[typing.Sequence[treelib.Node]] = None,
+    ) -> tuple[treelib.Node, ...]:
+        """Resolve an already resolved tree further.
+
+        :param tree: A tree which has been returned by :meth:`resolve`.
+            The tree is changed in place.
+        :type tree: treelib.Tree
+        :param limit: How many node levels are added. If it is set to
+            `None` it will only stop once all nodes are :class:`Terminal`.
+            Default to 1.
+        :type limit: typing.Optional[int]
+        :param frontier_node_sequence: The nodes which are resolved further.
+            This should be the return value of the previous call of
+            :meth:`deepen`. If ``None`` the nodes of the deepest level of
+            the tree are used (see :meth:`get_frontier_node_tuple`).
+            Default to ``None``.
+        :type frontier_node_sequence: typing.Optional[typing.Sequence[treelib.Node]]
+        :return: The nodes of the new deepest level (the frontier which can
+            be passed to the next call of :meth:`deepen`).
+
+        Only the current frontier is resolved, all other nodes are kept as
+        they are. The resulting tree is exactly the same as if it would
+        have been resolved with a higher limit from the beginning.
+
+        If the grammar has a pruning with minimum constraints (see
+        :class:`mutwo.zimmermann_generators.ResolvePruning`), a
+        :class:`ValueError` is raised: the minimum constraints are
+        estimated with the limit of a resolution, so nodes which
+        could reach the minimum after further calls of
+        :meth:`deepen` would have been removed already. Maximum
+        constraints don't depend on the limit and can be used.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> pitch_based_context_free_grammar = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+        >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+        >>>         maximum_cent_deviation=550,
+        >>>     )
+        >>> )
+        >>> tree = pitch_based_context_free_grammar.resolve(
+        >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>     limit=1
+        >>> )
+        >>> frontier = pitch_based_context_free_grammar.deepen(tree)
+        >>> frontier = pitch_based_context_free_grammar.deepen(tree, 1, frontier)
+        >>> tree.show()
+        (5/4)
+        ├── (15/16 4/3)
+        │   └── (15/16 5/4 16/15)
+        │       └── (15/16 15/16 4/3 16/15)
+        └── (4/3 15/16)
+            └── (16/15 5/4 15/16)
+                └── (16/15 4/3 15/16 15/16)
+        """
+
+        if self.pruning is not None and self.pruning.has_minimum_constraint:
+            raise ValueError(
+                "A tree can't be deepened with the minimum constraints of "
+                f"'{self.pruning}': resolve it again with a higher limit."
+            )
+        frontier_node_tuple = self._deepen(tree, limit, limit, frontier_node_sequence)
+        self._report_profile()
+        return frontier_node_tuple
+
+    def _deepen(
+        self,
+        tree: treelib.Tree,
+        limit: typing.Optional[int],
+        pruning_limit: typing.Optional[int],
+        frontier_node_sequence: typing.Optional[typing.Sequence[treelib.Node]] = None,
+    ) -> tuple[treelib.Node, ...]:
+        deepening = self._iter_deepen(
+            tree, limit, pruning_limit, frontier_node_sequence
+        )
+        while True:
+            try:
+                next(deepening)
+            except StopIteration as stop_iteration:
+                frontier_node_tuple, _ = stop_iteration.value
+                return frontier_node_tuple
+
+    def _iter_deepen(
+        self,
+        tree: treelib.Tree,
+        limit: typing.Optional[int],
+        pruning_limit: typing.Optional[int],
+        frontier_node_sequence: typing.Optional[typing.Sequence[treelib.Node]] = None,
+        maximum_node_count: typing.Optional[int] = None,
+    ) -> typing.Generator[None, None, tuple[tuple[treelib.Node, ...], bool]]:
+        # Same as '_deepen', but yield after each expanded frontier node,
+        # so that the caller can pause the resolution (e.g. to give control
+        # back to an event loop). All changes of the tree and of the status
+        # cache are finished when the generator yields. Return the new
+        # frontier and if the resolution is complete (and not stopped
+        # because the tree reached 'maximum_node_count').
+        #
+        # 'pruning_limit' is the number of levels which are added to the
+        # frontier in total (also by later steps, e.g. by the workers of
+        # a parallel resolution): minimum constraints of the pruning are
+        # estimated with this limit.
+        if frontier_node_sequence is None:
+            frontier_node_sequence = self.get_frontier_node_tuple(tree)
+        if not self._is_rule_table_used:
+            return (
+                yield from self._iter_deepen_with_hooks(
+                    tree,
+                    limit,
+                    pruning_limit,
+                    frontier_node_sequence,
+                    maximum_node_count,
+                )
+            )
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        # Keep the symbol ids of each frontier node, so that the data of
+        # the nodes only needs to be converted once.
+        frontier_list = [
+            (
+                frontier_node,
+                self._get_symbol_id_tuple(
+                    frontier_node.data,
+                    symbol_list,
+                    symbol_key_to_symbol_id,
+                    symbol_id_to_exponent_tuple,
+                ),
+            )
+            for frontier_node in frontier_node_sequence
+        ]
+        context_free_grammar_rule_tuple = self._context_free_grammar_rule_tuple
+        is_feasible = self._get_feasibility_test(symbol_list)
+        profile = self.profile
+        if profile is not None and frontier_list:
+            depth = tree.level(frontier_list[0][0].identifier)
+        counter = 0
+        while frontier_list and (limit is None or counter < limit):
+            if profile is not None:
+                generated_node_count = profile.generated_node_count
+            remaining_depth = (
+                None if pruning_limit is None else pruning_limit - counter - 1
+            )
+            child_frontier_list = []
+            for frontier_node, symbol_id_tuple in frontier_list:
+                data = frontier_node.data
+                for (
+                    position,
+                    context_free_grammar_rule_index,
+                    child_symbol_id_tuple,
+                ) in self._iter_accepted_symbol_id_expansion(
+                    symbol_id_tuple,
+                    symbol_list,
+                    symbol_id_to_exponent_tuple,
+                    is_feasible,
+                    remaining_depth,
+                ):
+                    if (
+                        maximum_node_count is not None
+                        and len(tree) >= maximum_node_count
+                    ):
+                        if profile is not None:
+                            profile._add_tried_rule_count(
+                                depth + 1,
+                                profile.generated_node_count - generated_node_count,
+                            )
+                        return (
+                            tuple(
+                                frontier_node
+                                for frontier_node, _ in child_frontier_list
+                            ),
+                            False,
+                        )
+                    child_frontier_list.append(
+                        (
+                            self._create_node(
+                                tree,
+                                data[:position]
+                                + context_free_grammar_rule_tuple[
+                                    context_free_grammar_rule_index
+                                ].right_side
+                                + data[position + 1 :],
+                                frontier_node,
+                            ),
+                            child_symbol_id_tuple,
+                        )
+                    )
+                yield
+            frontier_list = child_frontier_list
+            counter += 1
+            if profile is not None:
+                depth += 1
+                profile._add_tried_rule_count(
+                    depth, profile.generated_node_count - generated_node_count
+                )
+        return tuple(frontier_node for frontier_node, _ in frontier_list), True
+
+    def _iter_deepen_with_hooks(
+        self,
+        tree: treelib.Tree,
+        limit: typing.Optional[int],
+        pruning_limit: typing.Optional[int],
+        frontier_node_sequence: typing.Sequence[treelib.Node],
+        maximum_node_count: typing.Optional[int],
+    ) -> typing.Generator[None, None, tuple[tuple[treelib.Node, ...], bool]]:
+        # Same as '_iter_deepen', but derivations are expanded with
+        # '_resolve_content' and added with '_add_node' (in the same
+        # way as the resolution of 'common_generators.ContextFreeGrammar').
+        symbol_table = self._get_symbol_table_copy()
+        is_feasible = self._get_feasibility_test(symbol_table[0])
+        frontier_node_tuple = tuple(frontier_node_sequence)
+        profile = self.profile
+        if profile is not None and frontier_node_tuple:
+            depth = tree.level(frontier_node_tuple[0].identifier)
+        counter = 0
+        while frontier_node_tuple and (limit is None or counter < limit):
+            if profile is not None:
+                generated_node_count = profile.generated_node_count
+            remaining_depth = (
+                None if pruning_limit is None else pruning_limit - counter - 1
+            )
+            child_frontier_node_list = []
+            for frontier_node in frontier_node_tuple:
+                # '_add_node' doesn't need to return the new node: new
+                # nodes are the children which are added to the frontier
+                # node.
+                child_count = len(tree.is_branch(frontier_node.identifier))
+                for data in self._resolve_content(frontier_node.data):
+                    if is_feasible is not None and not is_feasible(
+                        self._get_symbol_id_tuple(data, *symbol_table),
+                        remaining_depth,
+                    ):
+                        # Count the pruned child in the same way as
+                        # '_iter_deepen' (children which are tested by
+                        # '_add_node' are counted there).
+                        if profile is not None:
+                            profile.generated_node_count += 1
+                        continue
+                    if (
+                        maximum_node_count is not None
+                        and len(tree) >= maximum_node_count
+                    ):
+                        child_frontier_node_list.extend(
+                            tree.children(frontier_node.identifier)[child_count:]
+                        )
+                        if profile is not None:
+                            profile._add_tried_rule_count(
+                                depth + 1,
+                                profile.generated_node_count - generated_node_count,
+                            )
+                        return tuple(child_frontier_node_list), False
+                    self._add_node(tree, data, frontier_node)
+                child_frontier_node_list.extend(
+                    tree.children(frontier_node.identifier)[child_count:]
+                )
+                yield
+            frontier_node_tuple = tuple(child_frontier_node_list)
+            counter += 1
+            if profile is not None:
+                depth += 1
+                profile._add_tried_rule_count(
+                    depth, profile.generated_node_count - generated_node_count
+                )
+        return frontier_node_tuple, True
+
+    def resolve_compact(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+    ) -> zimmermann_generators.CompactDerivationTree:
+        """Resolve in the same way as :meth:`resolve`, but return a compact tree.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels until the function returns a tree.
+            If it is set to `None` it will only stop once all nodes are
+            :class:`Terminal`.
+        :type limit: typing.Optional[int]
+
+        The nodes of the returned
+        :class:`mutwo.zimmermann_generators.CompactDerivationTree` are
+        the same nodes in the same order as the nodes of the tree
+        returned by :meth:`resolve`. But only a few integers are
+        saved for each node, so that trees with millions of nodes
+        can be kept in memory. Use
+        :meth:`mutwo.zimmermann_generators.CompactDerivationTree.to_tree`
+        to get a :class:`treelib.Tree`.
+        """
+
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        root_symbol_id_tuple = self._get_symbol_id_tuple(
+            (start,), symbol_list, symbol_key_to_symbol_id, symbol_id_to_exponent_tuple
+        )
+        compact_derivation_tree = zimmermann_generators.CompactDerivationTree(
+            tuple(symbol_list),
+            self._rule_right_side_symbol_id_tuple,
+            root_symbol_id_tuple,
+        )
+
+        is_feasible = self._get_feasibility_test(symbol_list)
+
+        profile = self.profile
+        # Only keep the data of the deepest level
+        frontier_list = [(0, root_symbol_id_tuple)]
+        counter = 0
+        while frontier_list and (limit is None or counter < limit):
+            if profile is not None:
+                generated_node_count = profile.generated_node_count
+            remaining_depth = None if limit is None else limit - counter - 1
+            child_frontier_list = []
+            for parent_index, symbol_id_tuple in frontier_list:
+                for (
+                    position,
+                    context_free_grammar_rule_index,
+                    child_symbol_id_tuple,
+                ) in self._iter_accepted_symbol_id_expansion(
+                    symbol_id_tuple,
+                    symbol_list,
+                    symbol_id_to_exponent_tuple,
+                    is_feasible,
+                    remaining_depth,
+                ):
+                    child_frontier_list.append(
+                        (
+                            compact_derivation_tree.add_node(
+                                parent_index,
+                                context_free_grammar_rule_index,
+                                position,
+                            ),
+                            child_symbol_id_tuple,
+                        )
+                    )
+            frontier_list = child_frontier_list
+            counter += 1
+            if profile is not None:
+                profile._add_tried_rule_count(
+                    counter, profile.generated_node_count - generated_node_count
+                )
+        if profile is not None:
+            # The root is added without test
+            profile.generated_node_count += 1
+            profile.accepted_node_count += len(compact_derivation_tree)
+        self._report_profile()
+        return compact_derivation_tree
+
+    def resolve_graph(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+    ) -> zimmermann_generators.DerivationGraph:
+        """Resolve in the same way as :meth:`resolve`, but share equal derivations.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels until the function returns a graph.
+            If it is set to `None` it will only stop once all nodes are
+            :class:`Terminal`.
+        :type limit: typing.Optional[int]
+
+        All nodes of a level which have the same data also have the same
+        descendants (the filter and the pruning only depend on the data
+        and the level). The returned
+        :class:`mutwo.zimmermann_generators.DerivationGraph` only has one
+        vertex for each different derivation of a level, so each of them
+        is only expanded and tested once. The derivations of all nodes
+        of the tree can still be found with
+        :meth:`mutwo.zimmermann_generators.DerivationGraph.iter_derivations`
+        or :meth:`mutwo.zimmermann_generators.DerivationGraph.to_compact_derivation_tree`.
+        """
+
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        root_symbol_id_tuple = self._get_symbol_id_tuple(
+            (start,), symbol_list, symbol_key_to_symbol_id, symbol_id_to_exponent_tuple
+        )
+        derivation_graph = zimmermann_generators.DerivationGraph(
+            tuple(symbol_list),
+            self._rule_right_side_symbol_id_tuple,
+            root_symbol_id_tuple,
+        )
+
+        is_feasible = self._get_feasibility_test(symbol_list)
+
+        profile = self.profile
+        # Only keep the data of the vertices of the deepest level
+        frontier_list = [(0, root_symbol_id_tuple)]
+        counter = 0
+        while frontier_list and (limit is None or counter < limit):
+            if profile is not None:
+                generated_node_count = profile.generated_node_count
+            remaining_depth = None if limit is None else limit - counter - 1
+            child_symbol_id_tuple_to_vertex_index = {}
+            child_frontier_list = []
+            for parent_index, symbol_id_tuple in frontier_list:
+                for (
+                    position,
+                    context_free_grammar_rule_index,
+                    child_symbol_id_tuple,
+                ) in self._iter_accepted_symbol_id_expansion(
+                    symbol_id_tuple,
+                    symbol_list,
+                    symbol_id_to_exponent_tuple,
+                    is_feasible,
+                    remaining_depth,
+                ):
+                    try:
+                        vertex_index = child_symbol_id_tuple_to_vertex_index[
+                            child_symbol_id_tuple
+                        ]
+                    except KeyError:
+                        vertex_index = derivation_graph.add_vertex(
+                            parent_index, context_free_grammar_rule_index, position
+                        )
+                        child_symbol_id_tuple_to_vertex_index[child_symbol_id_tuple] = (
+                            vertex_index
+                        )
+                        child_frontier_list.append(
+                            (vertex_index, child_symbol_id_tuple)
+                        )
+                    else:
+                        derivation_graph.add_edge(
+                            parent_index,
+                            context_free_grammar_rule_index,
+                            position,
+                            vertex_index,
+                        )
+            frontier_list = child_frontier_list
+            counter += 1
+            if profile is not None:
+                profile._add_tried_rule_count(
+                    counter, profile.generated_node_count - generated_node_count
+                )
+        if profile is not None:
+            # Each edge is an accepted expansion (and the root is added
+            # without test).
+            profile.generated_node_count += 1
+            profile.accepted_node_count += derivation_graph.edge_count + 1
+        self._report_profile()
+        return derivation_graph
+
+    def _iter_depth_first(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int],
+    ) -> typing.Generator[
+        tuple[
+            tuple[
+                tuple[
+                    typing.Union[
+                        JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+                    ],
+                    ...,
+                ],
+                ...,
+            ],
+            bool,
+        ],
+        None,
+        None,
+    ]:
+        # Yield each derivation when it is found ('False') and yield it
+        # again when it turns out to be a leaf ('True'). In this way the
+        # same walk can be used for all derivations and for leaves only.
+        def get_child_iterator(data) -> typing.Iterator:
+            # 'len(path) - 1' is the depth of data
+            if limit is None or len(path) <= limit:
+                child_data_iterator = iter(self._resolve_content(data))
+                if profile is not None:
+                    child_data_iterator = count_child_data(
+                        child_data_iterator, len(path)
+                    )
+                if is_feasible is None:
+                    return child_data_iterator
+                remaining_depth = None if limit is None else limit - len(path)
+                return (
+                    child_data
+                    for child_data in child_data_iterator
+                    if is_feasible(
+                        self._get_symbol_id_tuple(child_data, *symbol_table),
+                        remaining_depth,
+                    )
+                )
+            return iter(tuple([]))
+
+        def count_child_data(child_data_iterator, depth) -> typing.Iterator:
+            tried_rule_count = 0
+            for child_data in child_data_iterator:
+                profile.generated_node_count += 1
+                tried_rule_count += 1
+                yield child_data
+            profile._add_tried_rule_count(depth, tried_rule_count)
+
+        symbol_table = self._get_symbol_table_copy()
+        is_feasible = self._get_feasibility_test(symbol_table[0])
+        profile = self.profile
+
+        start_data = (start,)
+        if profile is not None:
+            profile.generated_node_count += 1
+        if not self._is_valid(start_data):
+            self._report_profile()
+            return
+        if profile is not None:
+            profile.accepted_node_count += 1
+        path = [start_data]
+        yield tuple(path), False
+        # Each item of the stack is a list with an iterator over the
+        # possible children of the current derivation and a flag which
+        # tells whether any child has been accepted.
+        stack = [[get_child_iterator(start_data), False]]
+        while stack:
+            item = stack[-1]
+            for data in item[0]:
+                if self._is_valid(data):
+                    if profile is not None:
+                        profile.accepted_node_count += 1
+                    item[1] = True
+                    path.append(data)
+                    yield tuple(path), False
+                    stack.append([get_child_iterator(data), False])
+                    break
+            else:
+                if not item[1]:
+                    yield tuple(path), True
+                stack.pop()
+                path.pop()
+        self._report_profile()
+
+    def iter_resolve(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+    ) -> typing.Generator[
+        tuple[
+            tuple[
+                typing.Union[
+                    JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+                ],
+                ...,
+            ],
+            ...,
+        ],
+        None,
+        None,
+    ]:
+        """Resolve depth-first and yield each derivation as soon as it is found.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels. If it is set to `None` it will
+            only stop once all nodes are :class:`Terminal`.
+        :type limit: typing.Optional[int]
+
+        Each derivation is a tuple of all steps from the start to the
+        current node (the same as the data of the nodes from the root
+        to a node in the tree of :meth:`resolve`). The generator finds
+        the same nodes as :meth:`resolve`, but in depth-first order.
+        Because no tree is created, the used memory only depends on the
+        depth of the resolution and not on the number of derivations.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> pitch_based_context_free_grammar = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+        >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+        >>>         maximum_cent_deviation=550,
+        >>>     )
+        >>> )
+        >>> for derivation in pitch_based_context_free_grammar.iter_resolve(
+        >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>     limit=2,
+        >>> ):
+        >>>     print(derivation[-1])
+        """
+
+        for derivation, is_finished in self._iter_depth_first(start, limit):
+            if not is_finished:
+                yield derivation
+
+    def iter_leaves(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+    ) -> typing.Generator[
+        tuple[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+            ...,
+        ],
+        None,
+        None,
+    ]:
+        """Resolve depth-first and only yield the data of the leaves.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels. If it is set to `None` it will
+            only stop once all nodes are :class:`Terminal`.
+        :type limit: typing.Optional[int]
+
+        The leaves are the same as the leaves of the tree which
+        :meth:`resolve` returns, but in depth-first order.
+        """
+
+        for derivation, is_leaf in self._iter_depth_first(start, limit):
+            if is_leaf:
+                yield derivation[-1]
+
+    def sample(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+        count: int = 1,
+        seed: typing.Optional[int] = None,
+        is_uniform: bool = False,
+    ) -> tuple[
+        tuple[
+            tuple[
+                typing.Union[
+                    JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+                ],
+                ...,
+            ],
+            ...,
+        ],
+        ...,
+    ]:
+        """Pick random derivations without resolving the complete tree.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The depth of the derivations. If it is set to `None`
+            each derivation ends when it can't be resolved any further
+            (it is a leaf of the tree of :meth:`resolve`).
+        :type limit: typing.Optional[int]
+        :param count: How many derivations are picked. The same derivation
+            can be picked more than once. Default to 1.
+        :type count: int
+        :param seed: The seed of the random generator. With the same seed
+            the same derivations are picked. Default to ``None``.
+        :type seed: typing.Optional[int]
+        :param is_uniform: If set to ``True`` each derivation of the
+            given depth has the same probability. If set to ``False``
+            each step picks one of its possible children with the same
+            probability: derivations with less siblings are picked more
+            often. Default to ``False``.
+        :type is_uniform: bool
+        :return: A tuple with ``count`` derivations (each one in the
+            same format as :meth:`iter_resolve` yields them) or an
+            empty tuple if no derivation of the given depth exists.
+
+        The derivations are picked top-down: each step only tests the
+        children of the current derivation. If a step doesn't have any
+        valid child before the limit is reached, the sampler goes back
+        and tries another child. Dead ends are remembered, so each
+        further derivation is found faster. In this way the needed time
+        depends on the number and the depth of the derivations and not
+        on the size of the tree.
+
+        A uniform sampler needs to know how many derivations each child
+        has: these numbers are counted once for each distinct
+        derivation and remaining depth, so this needs much more time
+        for the first derivation.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> pitch_based_context_free_grammar = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+        >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+        >>>         maximum_cent_deviation=550,
+        >>>     )
+        >>> )
+        >>> derivation_tuple = pitch_based_context_free_grammar.sample(
+        >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>     limit=3,
+        >>>     count=2,
+        >>>     seed=100,
+        >>> )
+        >>> len(derivation_tuple)
+        2
+        """
+
+        start_data = (start,)
+        if count < 1 or not self._is_valid(start_data):
+            return tuple([])
+        random_generator = random.Random(seed)
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        is_feasible = self._get_feasibility_test(symbol_list)
+        profile = self.profile
+
+        child_list_cache = {}
+
+        def get_child_list(symbol_id_tuple, remaining_depth) -> list:
+            # Valid children as (position, rule index, symbol ids)
+            cache_key = (symbol_id_tuple, remaining_depth)
+            try:
+                return child_list_cache[cache_key]
+            except KeyError:
+                pass
+            if remaining_depth is not None:
+                remaining_depth -= 1
+            child_list_cache[cache_key] = child_list = list(
+                self._iter_accepted_symbol_id_expansion(
+                    symbol_id_tuple,
+                    symbol_list,
+                    symbol_id_to_exponent_tuple,
+                    is_feasible,
+                    remaining_depth,
+                )
+            )
+            if profile is not None:
+                profile.accepted_node_count += len(child_list)
+            return child_list
+
+        root_symbol_id_tuple = self._get_symbol_id_tuple(
+            start_data,
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        )
+        if is_uniform:
+            pick_step_list = self._get_uniform_step_list_picker(
+                root_symbol_id_tuple, limit, get_child_list, random_generator
+            )
+        else:
+            pick_step_list = self._get_random_step_list_picker(
+                root_symbol_id_tuple, limit, get_child_list, random_generator
+            )
+
+        derivation_list = []
+        for _ in range(count):
+            step_list = pick_step_list()
+            if step_list is None:
+                self._report_profile()
+                return tuple([])
+            derivation = [start_data]
+            for position, context_free_grammar_rule_index in step_list:
+                derivation.append(
+                    self._expand(
+                        derivation[-1], position, context_free_grammar_rule_index
+                    )
+                )
+            derivation_list.append(tuple(derivation))
+        self._report_profile()
+        return tuple(derivation_list)
+
+    @staticmethod
+    def _get_random_step_list_picker(
+        root_symbol_id_tuple: tuple[int, ...],
+        limit: typing.Optional[int],
+        get_child_list: typing.Callable[
+            [tuple[int, ...], typing.Optional[int]],
+            list[tuple[int, int, tuple[int, ...]]],
+        ],
+        random_generator: random.Random,
+    ) -> typing.Callable[[], typing.Optional[list[tuple[int, int]]]]:
+        # Random depth-first walk which goes back from dead ends. States
+        # which don't lead to any derivation of the wanted depth are
+        # shared between all walks.
+        dead_end_set = set()
+
+        def pick_step_list() -> typing.Optional[list[tuple[int, int]]]:
+            state_list = [(root_symbol_id_tuple, limit)]
+            step_list, candidate_list_stack = [], []
+            while state_list:
+                symbol_id_tuple, remaining_depth = state_list[-1]
+                # A new state has been reached
+                if len(candidate_list_stack) < len(state_list):
+                    if remaining_depth == 0:
+                        return step_list
+                    child_list = get_child_list(symbol_id_tuple, remaining_depth)
+                    if not child_list and limit is None:
+                        return step_list
+                    candidate_list_stack.append(list(child_list))
+                candidate_list = candidate_list_stack[-1]
+                child_remaining_depth = (
+                    None if remaining_depth is None else remaining_depth - 1
+                )
+                while candidate_list:
+                    # Remove a random candidate in constant time
+                    index = random_generator.randrange(len(candidate_list))
+                    candidate_list[index], candidate_list[-1] = (
+                        candidate_list[-1],
+                        candidate_list[index],
+                    )
+                    (
+                        position,
+                        context_free_grammar_rule_index,
+                        child_symbol_id_tuple,
+                    ) = candidate_list.pop()
+                    child_state = (child_symbol_id_tuple, child_remaining_depth)
+                    if child_state not in dead_end_set:
+                        state_list.append(child_state)
+                        step_list.append((position, context_free_grammar_rule_index))
+                        break
+                else:
+                    dead_end_set.add(state_list.pop())
+                    candidate_list_stack.pop()
+                    if step_list:
+                        step_list.pop()
+            return None
+
+        return pick_step_list
+
+    @staticmethod
+    def _get_uniform_step_list_picker(
+        root_symbol_id_tuple: tuple[int, ...],
+        limit: typing.Optional[int],
+        get_child_list: typing.Callable[
+            [tuple[int, ...], typing.Optional[int]],
+            list[tuple[int, int, tuple[int, ...]]],
+        ],
+        random_generator: random.Random,
+    ) -> typing.Callable[[], typing.Optional[list[tuple[int, int]]]]:
+        # Each child is picked with a probability which is proportional
+        # to the number of its derivations of the wanted depth.
+        derivation_count_cache = {}
+
+        def get_derivation_count(
+            symbol_id_tuple: tuple[int, ...], remaining_depth: typing.Optional[int]
+        ) -> int:
+            cache_key = (symbol_id_tuple, remaining_depth)
+            try:
+                return derivation_count_cache[cache_key]
+            except KeyError:
+                pass
+            if remaining_depth == 0:
+                derivation_count = 1
+            else:
+                child_list = get_child_list(symbol_id_tuple, remaining_depth)
+                if not child_list:
+                    derivation_count = int(limit is None)
+                else:
+                    child_remaining_depth = (
+                        None if remaining_depth is None else remaining_depth - 1
+                    )
+                    derivation_count = sum(
+                        get_derivation_count(
+                            child_symbol_id_tuple, child_remaining_depth
+                        )
+                        for _, _, child_symbol_id_tuple in child_list
+                    )
+            derivation_count_cache[cache_key] = derivation_count
+            return derivation_count
+
+        def pick_step_list() -> typing.Optional[list[tuple[int, int]]]:
+            symbol_id_tuple, remaining_depth = root_symbol_id_tuple, limit
+            if not get_derivation_count(symbol_id_tuple, remaining_depth):
+                return None
+            step_list = []
+            while remaining_depth != 0:
+                child_list = get_child_list(symbol_id_tuple, remaining_depth)
+                if not child_list:
+                    break
+                # Pick a random derivation and find the child it belongs to
+                derivation_index = random_generator.randrange(
+                    get_derivation_count(symbol_id_tuple, remaining_depth)
+                )
+                if remaining_depth is not None:
+                    remaining_depth -= 1
+                for (
+                    position,
+                    context_free_grammar_rule_index,
+                    symbol_id_tuple,
+                ) in child_list:
+                    derivation_index -= get_derivation_count(
+                        symbol_id_tuple, remaining_depth
+                    )
+                    if derivation_index < 0:
+                        break
+                step_list.append((position, context_free_grammar_rule_index))
+            return step_list
+
+        return pick_step_list
+
+    def count_derivations(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        limit: typing.Optional[int] = None,
+        apply_filter: bool = True,
+        maximum_node_count: typing.Optional[int] = None,
+    ) -> tuple[int, int, bool]:
+        """Count the nodes and leaves of a resolution without creating it.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param limit: The maximum node levels. If it is set to `None` it will
+            only stop once all nodes are :class:`Terminal`.
+        :type limit: typing.Optional[int]
+        :param apply_filter: If set to ``True`` the derivations are tested
+            in the same way as in :meth:`resolve` (pitch repetitions and
+            pruning). If set to ``False`` all derivations of the rules
+            are counted. Default to ``True``.
+        :type apply_filter: bool
+        :param maximum_node_count: If the filter is applied, the counting
+            stops as soon as more nodes than this number have been found.
+            If ``None`` the value of
+            :const:`mutwo.zimmermann_generators.configurations.DEFAULT_COUNT_DERIVATIONS_MAXIMUM_NODE_COUNT`
+            is used. Default to ``None``.
+        :type maximum_node_count: typing.Optional[int]
+        :return: The number of nodes and the number of leaves of the
+            tree which :meth:`resolve` would return (or of the tree
+            without filter) and ``True`` if these numbers are exact. If
+            the counting has been stopped by ``maximum_node_count`` it is
+            ``False`` and the numbers are only lower bounds: the tree has
+            more than ``maximum_node_count`` nodes.
+
+        If the filter is applied, the levels are resolved one after the
+        other, but equal derivations of a level are only expanded once
+        (and counted as often as they occur). Only the distinct
+        derivations of the current level are kept, so no tree or graph
+        is created. The needed time still grows with the number of
+        distinct derivations, but it is bounded by
+        ``maximum_node_count``: each of them is at least one node. So a
+        resolution which is too big can be rejected before it is
+        started. To count without bound use
+        ``resolve_graph(start, limit).count_derivations()``.
+
+        Without filter the derivations of a sequence are only the
+        interleavings of the derivations of its symbols, so they are
+        counted for each symbol and depth by dynamic programming. This
+        is fast also for very big trees. The filter only removes nodes,
+        so this count is an upper bound of the number of nodes of
+        :meth:`resolve`. If the start has infinite derivations without
+        filter and the limit is ``None``, a :class:`ValueError` is
+        raised.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> pitch_based_context_free_grammar = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+        >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+        >>>         maximum_cent_deviation=550,
+        >>>     )
+        >>> )
+        >>> pitch_based_context_free_grammar.count_derivations(
+        >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>     limit=3,
+        >>> )
+        (7, 2, True)
+        """
+
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        root_symbol_id_tuple = self._get_symbol_id_tuple(
+            (start,),
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        )
+        if apply_filter:
+            if maximum_node_count is None:
+                maximum_node_count = (
+                    zimmermann_generators.configurations.DEFAULT_COUNT_DERIVATIONS_MAXIMUM_NODE_COUNT
+                )
+            if maximum_node_count < 1:
+                raise ValueError(
+                    f"Found illegal maximum node count '{maximum_node_count}'."
+                )
+            counter_tuple = self._count_filtered_derivations(
+                root_symbol_id_tuple,
+                limit,
+                symbol_list,
+                symbol_id_to_exponent_tuple,
+                maximum_node_count,
+            )
+            self._report_profile()
+            return counter_tuple
+        return self._count_unfiltered_derivations(
+            root_symbol_id_tuple[0], limit, symbol_list
+        ) + (True,)
+
+    def _count_filtered_derivations(
+        self,
+        root_symbol_id_tuple: tuple[int, ...],
+        limit: typing.Optional[int],
+        symbol_list: list[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+        symbol_id_to_exponent_tuple: list[tuple[int, ...]],
+        maximum_node_count: int,
+    ) -> tuple[int, int, bool]:
+        profile = self.profile
+        if profile is not None:
+            profile.generated_node_count += 1
+        if not self._is_symbol_id_tuple_valid(
+            root_symbol_id_tuple, symbol_id_to_exponent_tuple
+        ):
+            return 0, 0, True
+        if profile is not None:
+            profile.accepted_node_count += 1
+        is_feasible = self._get_feasibility_test(symbol_list)
+        # Resolve level by level, but equal derivations of one level are
+        # only expanded once: we only keep how often they occur.
+        symbol_id_tuple_to_count = {root_symbol_id_tuple: 1}
+        node_count = 1
+        leaf_count = 0
+        depth = 0
+        while symbol_id_tuple_to_count and (limit is None or depth < limit):
+            if profile is not None:
+                generated_node_count = profile.generated_node_count
+            remaining_depth = None if limit is None else limit - depth - 1
+            child_symbol_id_tuple_to_count = {}
+            for symbol_id_tuple, count in symbol_id_tuple_to_count.items():
+                is_leaf = True
+                for (
+                    _,
+                    _,
+                    child_symbol_id_tuple,
+                ) in self._iter_accepted_symbol_id_expansion(
+                    symbol_id_tuple,
+                    symbol_list,
+                    symbol_id_to_exponent_tuple,
+                    is_feasible,
+                    remaining_depth,
+                ):
+                    if profile is not None:
+                        profile.accepted_node_count += 1
+                    is_leaf = False
+                    node_count += count
+                    child_symbol_id_tuple_to_count[child_symbol_id_tuple] = (
+                        child_symbol_id_tuple_to_count.get(child_symbol_id_tuple, 0)
+                        + count
+                    )
+                if is_leaf:
+                    leaf_count += count
+                if node_count > maximum_node_count:
+                    return node_count, leaf_count, False
+            symbol_id_tuple_to_count = child_symbol_id_tuple_to_count
+            depth += 1
+            if profile is not None:
+                profile._add_tried_rule_count(
+                    depth, profile.generated_node_count - generated_node_count
+                )
+        # All nodes of the last level are leaves
+        leaf_count += sum(symbol_id_tuple_to_count.values())
+        return node_count, leaf_count, True
+
+    def _count_unfiltered_derivations(
+        self,
+        root_symbol_id: int,
+        limit: typing.Optional[int],
+        symbol_list: list[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+    ) -> tuple[int, int]:
+        # For each symbol we count how many sequences of 'depth' expansions
+        # exist ('expansion_count') and how many of them end with a
+        # sequence which can't be expanded anymore ('final_count'). A
+        # rule applies one expansion, the expansions of its right side
+        # are interleavings of the expansions of its symbols: this is the
+        # product of exponential generating functions, so the counts of a
+        # right side are binomial convolutions of the counts of its symbols.
+        divided_context_free_grammar_rule_index_tuple = (
+            self._divided_context_free_grammar_rule_index_tuple
+        )
+        rule_right_side_symbol_id_tuple = self._rule_right_side_symbol_id_tuple
+        non_terminal_count = len(self._non_terminal_tuple)
+
+        if root_symbol_id >= non_terminal_count:
+            if isinstance(symbol_list[root_symbol_id], common_generators.NonTerminal):
+                raise ValueError(
+                    f"{symbol_list[root_symbol_id]} is not a non-terminal of the grammar"
+                )
+            return 1, 1
+
+        # Find all non-terminals which can be reached by a depth-first
+        # search (and if any of them can be reached from itself).
+        def iter_child_symbol_id(non_terminal_id: int) -> typing.Iterator[int]:
+            for (
+                context_free_grammar_rule_index
+            ) in divided_context_free_grammar_rule_index_tuple[non_terminal_id]:
+                yield from rule_right_side_symbol_id_tuple[
+                    context_free_grammar_rule_index
+                ]
+
+        non_terminal_id_to_is_finished = {root_symbol_id: False}
+        stack = [(root_symbol_id, iter_child_symbol_id(root_symbol_id))]
+        is_cyclic = False
+        while stack:
+            for symbol_id in stack[-1][1]:
+                if symbol_id >= non_terminal_count:
+                    continue
+                try:
+                    is_cyclic |= not non_terminal_id_to_is_finished[symbol_id]
+                except KeyError:
+                    non_terminal_id_to_is_finished[symbol_id] = False
+                    stack.append((symbol_id, iter_child_symbol_id(symbol_id)))
+                    break
+            else:
+                non_terminal_id_to_is_finished[stack.pop()[0]] = True
+        if limit is None and is_cyclic:
+            raise ValueError(
+                f"{symbol_list[root_symbol_id]} has infinite derivations "
+                "without filter: set a limit."
+            )
+
+        # Counts of each depth for all symbols which can be reached. A
+        # symbol without rules can't be expanded: its only sequence has
+        # depth 0 and it is final.
+        symbol_id_to_expansion_count_list = {}
+        symbol_id_to_final_count_list = {}
+        non_terminal_id_to_rule_index_tuple = {}
+        for non_terminal_id in non_terminal_id_to_is_finished:
+            context_free_grammar_rule_index_tuple = (
+                divided_context_free_grammar_rule_index_tuple[non_terminal_id]
+            )
+            for symbol_id in itertools.chain(
+                (non_terminal_id,), iter_child_symbol_id(non_terminal_id)
+            ):
+                if symbol_id not in symbol_id_to_expansion_count_list:
+                    symbol_id_to_expansion_count_list[symbol_id] = [1]
+                    symbol_id_to_final_count_list[symbol_id] = [
+                        int(
+                            symbol_id >= non_terminal_count
+                            or not divided_context_free_grammar_rule_index_tuple[
+                                symbol_id
+                            ]
+                        )
+                    ]
+            if context_free_grammar_rule_index_tuple:
+                non_terminal_id_to_rule_index_tuple[non_terminal_id] = (
+                    context_free_grammar_rule_index_tuple
+                )
+        # Counts of the products of the first n + 1 symbols of each right
+        # side (for n > 0), so that each depth only adds one item.
+        rule_index_to_product_count_list_pair_list = {
+            context_free_grammar_rule_index: [
+                ([], [])
+                for _ in rule_right_side_symbol_id_tuple[
+                    context_free_grammar_rule_index
+                ][1:]
+            ]
+            for context_free_grammar_rule_index_tuple in non_terminal_id_to_rule_index_tuple.values()
+            for context_free_grammar_rule_index in context_free_grammar_rule_index_tuple
+        }
+
+        depth = 0
+        root_expansion_count_list = symbol_id_to_expansion_count_list[root_symbol_id]
+        while (limit is None or depth < limit) and root_expansion_count_list[-1]:
+            binomial_tuple = tuple(
+                math.comb(depth, index) for index in range(depth + 1)
+            )
+            non_terminal_id_to_count_pair = {}
+            for (
+                non_terminal_id,
+                context_free_grammar_rule_index_tuple,
+            ) in non_terminal_id_to_rule_index_tuple.items():
+                expansion_count = final_count = 0
+                for (
+                    context_free_grammar_rule_index
+                ) in context_free_grammar_rule_index_tuple:
+                    right_side_symbol_id_tuple = rule_right_side_symbol_id_tuple[
+                        context_free_grammar_rule_index
+                    ]
+                    count_list_pair = (
+                        symbol_id_to_expansion_count_list[
+                            right_side_symbol_id_tuple[0]
+                        ],
+                        symbol_id_to_final_count_list[right_side_symbol_id_tuple[0]],
+                    )
+                    for symbol_id, product_count_list_pair in zip(
+                        right_side_symbol_id_tuple[1:],
+                        rule_index_to_product_count_list_pair_list[
+                            context_free_grammar_rule_index
+                        ],
+                    ):
+                        for count_list, symbol_count_list, product_count_list in zip(
+                            count_list_pair,
+                            (
+                                symbol_id_to_expansion_count_list[symbol_id],
+                                symbol_id_to_final_count_list[symbol_id],
+                            ),
+                            product_count_list_pair,
+                        ):
+                            product_count_list.append(
+                                sum(
+                                    binomial
+                                    * count_list[index]
+                                    * symbol_count_list[depth - index]
+                                    for index, binomial in enumerate(binomial_tuple)
+                                )
+                            )
+                        count_list_pair = product_count_list_pair
+                    expansion_count += count_list_pair[0][depth]
+                    final_count += count_list_pair[1][depth]
+                non_terminal_id_to_count_pair[non_terminal_id] = (
+                    expansion_count,
+                    final_count,
+                )
+            for (
+                symbol_id,
+                expansion_count_list,
+            ) in symbol_id_to_expansion_count_list.items():
+                expansion_count, final_count = non_terminal_id_to_count_pair.get(
+                    symbol_id, (0, 0)
+                )
+                expansion_count_list.append(expansion_count)
+                symbol_id_to_final_count_list[symbol_id].append(final_count)
+            depth += 1
+
+        root_final_count_list = symbol_id_to_final_count_list[root_symbol_id]
+        node_count = sum(root_expansion_count_list)
+        # All nodes of the last level are leaves
+        if limit is not None and depth == limit:
+            leaf_count = sum(root_final_count_list[:-1]) + root_expansion_count_list[-1]
+        else:
+            leaf_count = sum(root_final_count_list)
+        return node_count, leaf_count
+
+    def _get_parse_chart(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        sequence: typing.Sequence[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+    ) -> typing.Optional[
+        tuple[
+            int,
+            tuple[int, ...],
+            list[list[dict[int, list[tuple[int, int]]]]],
+        ]
+    ]:
+        # CYK chart of the sequence: 'chart[start][length - 1]' maps each
+        # symbol id which derives the items 'start:start + length' of the
+        # sequence to all (rule index, split) which can be applied. Return
+        # 'None' if the sequence isn't derivable.
+        data = tuple(sequence)
+        if not data or not self._is_valid(data):
+            return None
+        (
+            symbol_list,
+            symbol_key_to_symbol_id,
+            symbol_id_to_exponent_tuple,
+        ) = self._get_symbol_table_copy()
+        start_symbol_id, *_ = self._get_symbol_id_tuple(
+            (start,), symbol_list, symbol_key_to_symbol_id, symbol_id_to_exponent_tuple
+        )
+        if start_symbol_id >= len(self._non_terminal_tuple):
+            raise ValueError(f"{start} is not a non-terminal of the grammar")
+        symbol_id_tuple = self._get_symbol_id_tuple(
+            data, symbol_list, symbol_key_to_symbol_id, symbol_id_to_exponent_tuple
+        )
+
+        symbol_id_pair_to_rule_list = self._get_symbol_id_pair_to_rule_list()
+        item_count = len(symbol_id_tuple)
+        chart = [
+            [{symbol_id: []}] + [None] * (item_count - index - 1)
+            for index, symbol_id in enumerate(symbol_id_tuple)
+        ]
+        for length in range(2, item_count + 1):
+            for span_start in range(item_count - length + 1):
+                cell = {}
+                for split in range(span_start + 1, span_start + length):
+                    left_cell = chart[span_start][split - span_start - 1]
+                    right_cell = chart[split][span_start + length - split - 1]
+                    if not left_cell or not right_cell:
+                        continue
+                    for left_symbol_id in left_cell:
+                        for right_symbol_id in right_cell:
+                            for (
+                                non_terminal_id,
+                                context_free_grammar_rule_index,
+                            ) in symbol_id_pair_to_rule_list.get(
+                                (left_symbol_id, right_symbol_id), ()
+                            ):
+                                cell.setdefault(non_terminal_id, []).append(
+                                    (context_free_grammar_rule_index, split)
+                                )
+                chart[span_start][length - 1] = cell
+        if start_symbol_id not in chart[0][item_count - 1]:
+            return None
+        return start_symbol_id, symbol_id_tuple, chart
+
+    def _get_symbol_id_pair_to_rule_list(
+        self,
+    ) -> dict[tuple[int, int], list[tuple[int, int]]]:
+        if self._symbol_id_pair_to_rule_list is not None:
+            return self._symbol_id_pair_to_rule_list
+        symbol_id_pair_to_rule_list = {}
+        for (
+            non_terminal_id,
+            context_free_grammar_rule_index_tuple,
+        ) in enumerate(self._divided_context_free_grammar_rule_index_tuple):
+            for (
+                context_free_grammar_rule_index
+            ) in context_free_grammar_rule_index_tuple:
+                right_side_symbol_id_tuple = self._rule_right_side_symbol_id_tuple[
+                    context_free_grammar_rule_index
+                ]
+                if len(right_side_symbol_id_tuple) != 2:
+                    raise ValueError(
+                        "Only grammars where each rule has two symbols on its "
+                        "right side (Chomsky normal form) can be parsed, but "
+                        f"found '{self._context_free_grammar_rule_tuple[context_free_grammar_rule_index]}'."
+                    )
+                symbol_id_pair_to_rule_list.setdefault(
+                    right_side_symbol_id_tuple, []
+                ).append((non_terminal_id, context_free_grammar_rule_index))
+        self._symbol_id_pair_to_rule_list = symbol_id_pair_to_rule_list
+        return symbol_id_pair_to_rule_list
+
+    def is_derivable(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        sequence: typing.Sequence[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+    ) -> bool:
+        """Test if a sequence can be derived from the start.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param sequence: The symbols which should be derived (e.g. a
+            melody as intervals of :class:`JustIntonationPitchTerminal`).
+            The sequence may also contain non-terminals (it is then
+            the data of an inner node of :meth:`resolve`).
+        :type sequence: typing.Sequence[typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]]
+
+        This is the same as testing if any node of a resolution
+        without limit has the sequence as its data, but the test only
+        needs polynomial time (see :meth:`parse`).
+        """
+
+        return self._get_parse_chart(start, sequence) is not None
+
+    def parse(
+        self,
+        start: JustIntonationPitchNonTerminal,
+        sequence: typing.Sequence[
+            typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]
+        ],
+    ) -> typing.Generator[
+        tuple[
+            tuple[
+                typing.Union[
+                    JustIntonationPitchTerminal, JustIntonationPitchNonTerminal
+                ],
+                ...,
+            ],
+            ...,
+        ],
+        None,
+        None,
+    ]:
+        """Find all ways in which a sequence can be derived from the start.
+
+        :param start: The start value.
+        :type start: JustIntonationPitchNonTerminal
+        :param sequence: The symbols which should be derived (e.g. a
+            melody as intervals of :class:`JustIntonationPitchTerminal`).
+        :type sequence: typing.Sequence[typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal]]
+
+        Each parse tree is yielded as its leftmost derivation (in the
+        same format as :meth:`iter_resolve` yields derivations): it is
+        the path from the root to a node with the sequence as its data
+        in the tree of :meth:`resolve`. Use ``next`` to only get one
+        derivation. Nothing is yielded if the sequence isn't derivable.
+
+        The sequence is parsed with the CYK algorithm, which needs
+        cubic time of the length of the sequence. This only works
+        for grammars in Chomsky normal form (each rule has two symbols
+        on its right side, as the rules of :meth:`from_constraints`),
+        otherwise a :class:`ValueError` is raised. Each expansion only
+        inserts new accumulated pitches between the existing ones,
+        so if the sequence itself passes the pitch repetition filter,
+        all steps of its derivations pass it too: the filter is only
+        applied to the sequence. Pruning isn't applied.
+
+        **Example:**
+
+        >>> from mutwo import zimmermann_generators
+        >>> pitch_based_context_free_grammar = (
+        >>>     zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+        >>>         prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+        >>>         maximum_cent_deviation=550,
+        >>>     )
+        >>> )
+        >>> derivation = next(
+        >>>     pitch_based_context_free_grammar.parse(
+        >>>         zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>         (
+        >>>             zimmermann_generators.JustIntonationPitchTerminal("15/16"),
+        >>>             zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        >>>             zimmermann_generators.JustIntonationPitchTerminal("16/15"),
+        >>>         ),
+        >>>     )
+        >>> )
+        >>> len(derivation)
+        3
+        """
+
+        parse_chart = self._get_parse_chart(start, sequence)
+        if parse_chart is None:
+            return
+        start_symbol_id, symbol_id_tuple, chart = parse_chart
+
+        # A parse tree is the list of its expansions in pre-order (this is
+        # the leftmost derivation). When a symbol is expanded, all symbols
+        # on its left side are already expanded: so the position of the
+        # expansion is the start of the part of the sequence which the
+        # symbol derives.
+        def iter_step_list(
+            symbol_id: int, span_start: int, length: int
+        ) -> typing.Iterator[list[tuple[int, int]]]:
+            if length == 1 and symbol_id_tuple[span_start] == symbol_id:
+                yield []
+            for context_free_grammar_rule_index, split in chart[span_start][
+                length - 1
+            ].get(symbol_id, ()):
+                (
+                    left_symbol_id,
+                    right_symbol_id,
+                ) = self._rule_right_side_symbol_id_tuple[
+                    context_free_grammar_rule_index
+                ]
+                for left_step_list in iter_step_list(
+                    left_symbol_id, span_start, split - span_start
+                ):
+                    for right_step_list in iter_step_list(
+                        right_symbol_id, split, span_start + length - split
+                    ):
+                        yield [
+                            (span_start, context_free_grammar_rule_index)
+                        ] + left_step_list + right_step_list
+
+        start_data = (start,)
+        for step_list in iter_step_list(start_symbol_id, 0, len(symbol_id_tuple)):
+            derivation = [start_data]
+            for position, context_free_grammar_rule_index in step_list:
+                derivation.append(
+                    self._expand(
+                        derivation[-1], position, context_free_grammar_rule_index
+                    )
+                )
+            yield tuple(derivation)
+
+
+def _get_prime_tuple(stop: int) -> tuple[int, ...]:
+    # All primes smaller than 'stop' (sieve of Eratosthenes). Grammars
+    # only use small primes, so we don't need 'sympy.primerange'.
+    if stop < 3:
+        return tuple([])
+    is_prime_bytearray = bytearray([1]) * stop
+    is_prime_bytearray[:2] = b"\x00\x00"
+    for number in range(2, int(stop**0.5) + 1):
+        if is_prime_bytearray[number]:
+            is_prime_bytearray[number * number :: number] = bytes(
+                len(range(number * number, stop, number))
+            )
+    return tuple(
+        number for number, is_prime in enumerate(is_prime_bytearray) if is_prime
+    )
+
+
+# The ratio string of a pitch only depends on its exponents. Grammars
+# only have a few different pitches, so most strings are found in the
+# cache.
+@functools.lru_cache(
+    maxsize=zimmermann_generators.configurations.RATIO_STRING_CACHE_SIZE
+)
+def _exponent_tuple_to_ratio_string(exponent_tuple: tuple[int, ...]) -> str:
+    just_intonation_pitch = music_parameters.JustIntonationPitch(list(exponent_tuple))
+    return f"{just_intonation_pitch.numerator}/{just_intonation_pitch.denominator}"
+
+
+def _data_to_tag(
+    data: tuple[
+        typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+        ...,
+    ],
+) -> str:
+    return "({})".format(
+        " ".join(
+            _exponent_tuple_to_ratio_string(pitch.exponent_tuple) for pitch in data
+        )
+    )
+
+
+class _LazyTagNode(treelib.Node):
+    # Node of a resolved tree which only creates its tag when it's
+    # needed: most trees are never shown.
+
+    def __init__(self, tag=None, identifier=None, expanded=True, data=None):
+        super().__init__(tag, identifier, expanded, data)
+        if tag is None:
+            self._tag = None
+
+    @property
+    def tag(self) -> str:
+        if self._tag is None:
+            self._tag = _data_to_tag(self.data)
+        return self._tag
+
+    @tag.setter
+    def tag(self, value: typing.Optional[str]):
+        self._tag = value
+
+
+class _ProfiledLazyTagNode(_LazyTagNode):
+    # Node of a grammar with a profile: the time to create the tag is
+    # added to the profile.
+
+    def __init__(
+        self, tag=None, identifier=None, expanded=True, data=None, profile=None
+    ):
+        super().__init__(tag, identifier, expanded, data)
+        self._profile = profile
+
+    @property
+    def tag(self) -> str:
+        if self._tag is None:
+            start = time.perf_counter()
+            self._tag = _data_to_tag(self.data)
+            self._profile.tag_duration += time.perf_counter() - start
+        return self._tag
+
+    @tag.setter
+    def tag(self, value: typing.Optional[str]):
+        self._tag = value
+
+
+class _ConstraintGrid(object):
+    # Candidate pitches of all grammars of 'from_constraint_grid'. The
+    # lattice is created for all octaves of the grid: the rows of each
+    # candidate are followed by the rows of the same candidate in the
+    # other octaves. So the candidates of each octave sequence can be
+    # picked (in the same order as '_get_pitch_lattice' would return
+    # them) without calculating anything again.
+
+    def __init__(
+        self,
+        grammar_class: typing.Type[PitchBasedContextFreeGrammar],
+        prime_number_to_maximum_exponent_dict: dict[int, int],
+        octave_tuple: tuple[int, ...],
+        add_unison: bool,
+        maximum_cent_deviation: float,
+        minimal_barlow_harmonicity: float,
+    ):
+        self._grammar_class = grammar_class
+        self._octave_to_column_index = {
+            octave: column_index for column_index, octave in enumerate(octave_tuple)
+        }
+        (
+            _,
+            self._exponent_array,
+            self._cent_array,
+            self._harmonicity_array,
+        ) = grammar_class._get_pitch_lattice(
+            prime_number_to_maximum_exponent_dict, octave_tuple, add_unison
+        )
+        self._row_index_array = np.arange(len(self._exponent_array)).reshape(
+            -1, max(len(octave_tuple), 1)
+        )
+        self._is_unison_array = np.logical_not(self._exponent_array.any(axis=1))
+
+        # All pairs of the loosest constraints: the pairs of each grammar
+        # are a subset of them.
+        (
+            is_non_terminal_array,
+            is_terminal_array,
+        ) = grammar_class._get_is_non_terminal_and_is_terminal_array(
+            minimal_barlow_harmonicity,
+            minimal_barlow_harmonicity,
+            maximum_cent_deviation,
+            self._exponent_array,
+            self._cent_array,
+            self._harmonicity_array,
+        )
+        candidate_row_index_array = np.flatnonzero(
+            is_non_terminal_array | is_terminal_array
+        )
+        element_row_index_array = candidate_row_index_array[
+            np.logical_not(self._is_unison_array[candidate_row_index_array])
+        ]
+        (
+            element_index0_array,
+            element_index1_array,
+            candidate_index_array,
+        ) = grammar_class._get_pair_index_array_tuple(
+            self._exponent_array[element_row_index_array],
+            self._exponent_array[candidate_row_index_array],
+        )
+        self._pair_row_index0_array = element_row_index_array[element_index0_array]
+        self._pair_row_index1_array = element_row_index_array[element_index1_array]
+        self._pair_sum_row_index_array = candidate_row_index_array[
+            candidate_index_array
+        ]
+
+        # Pitch objects of each row are only created once
+        self._row_index_to_non_terminal = {}
+        self._row_index_to_terminal = {}
+
+    def _get_non_terminal(self, row_index: int) -> JustIntonationPitchNonTerminal:
+        try:
+            return self._row_index_to_non_terminal[row_index]
+        except KeyError:
+            non_terminal = self._row_index_to_non_terminal[row_index] = (
+                JustIntonationPitchNonTerminal(self._exponent_array[row_index].tolist())
+            )
+            return non_terminal
+
+    def _get_terminal(self, row_index: int) -> JustIntonationPitchTerminal:
+        try:
+            return self._row_index_to_terminal[row_index]
+        except KeyError:
+            terminal = self._row_index_to_terminal[row_index] = (
+                JustIntonationPitchTerminal(self._exponent_array[row_index].tolist())
+            )
+            return terminal
+
+    def get_grammar(
+        self,
+        minimal_barlow_harmonicity_non_terminal: float,
+        minimal_barlow_harmonicity_terminal: float,
+        allowed_octave_tuple: tuple[int, ...],
+        maximum_cent_deviation: float,
+    ) -> PitchBasedContextFreeGrammar:
+        row_index_array = self._row_index_array[
+            :,
+            [self._octave_to_column_index[octave] for octave in allowed_octave_tuple],
+        ].ravel()
+        (
+            is_non_terminal_array,
+            is_terminal_array,
+        ) = self._grammar_class._get_is_non_terminal_and_is_terminal_array(
+            minimal_barlow_harmonicity_non_terminal,
+            minimal_barlow_harmonicity_terminal,
+            maximum_cent_deviation,
+            self._exponent_array[row_index_array],
+            self._cent_array[row_index_array],
+            self._harmonicity_array[row_index_array],
+        )
+        non_terminal_row_index_array = row_index_array[is_non_terminal_array]
+        non_terminal_tuple = tuple(
+            map(self._get_non_terminal, non_terminal_row_index_array.tolist())
+        )
+        terminal_row_index_array = row_index_array[is_terminal_array]
+        element_tuple = tuple(
+            element
+            for element in non_terminal_tuple
+            + tuple(map(self._get_terminal, terminal_row_index_array.tolist()))
+            # Ignore 1/1
+            if element.exponent_tuple
+        )
+
+        if len(set(allowed_octave_tuple)) < len(allowed_octave_tuple):
+            # If octaves are repeated, the same pitch appears more than
+            # once: the pairs can't be found by their row.
+            element0_element1_and_non_terminal_tuple = (
+                self._grammar_class._get_element0_element1_and_non_terminal_tuple(
+                    element_tuple, non_terminal_tuple
+                )
+            )
+        else:
+            element_row_index_array = np.concatenate(
+                (non_terminal_row_index_array, terminal_row_index_array)
+            )
+            element_row_index_array = element_row_index_array[
+                np.logical_not(self._is_unison_array[element_row_index_array])
+            ]
+            # Index of each row in the element tuple or the non-terminal
+            # tuple of the grammar (or -1 if it isn't part of it).
+            element_index_array = np.full(len(self._exponent_array), -1)
+            element_index_array[element_row_index_array] = np.arange(
+                len(element_row_index_array)
+            )
+            non_terminal_index_array = np.full(len(self._exponent_array), -1)
+            non_terminal_index_array[non_terminal_row_index_array] = np.arange(
+                len(non_terminal_row_index_array)
+            )
+            element_index0_array = element_index_array[self._pair_row_index0_array]
+            element_index1_array = element_index_array[self._pair_row_index1_array]
+            pair_non_terminal_index_array = non_terminal_index_array[
+                self._pair_sum_row_index_array
+            ]
+            is_pair_array = (
+                (element_index0_array >= 0)
+                & (element_index1_array >= 0)
+                & (pair_non_terminal_index_array >= 0)
+            )
+            # Same order as 'itertools.combinations(element_tuple, 2)'
+            lower_element_index_array = np.minimum(
+                element_index0_array, element_index1_array
+            )[is_pair_array]
+            upper_element_index_array = np.maximum(
+                element_index0_array, element_index1_array
+            )[is_pair_array]
+            pair_non_terminal_index_array = pair_non_terminal_index_array[is_pair_array]
+            order_array = np.lexsort(
+                (upper_element_index_array, lower_element_index_array)
+            )
+            element0_element1_and_non_terminal_tuple = tuple(
+                (
+                    element_tuple[element_index0],
+                    element_tuple[element_index1],
+                    non_terminal_tuple[non_terminal_index],
+                )
+                for element_index0, element_index1, non_terminal_index in zip(
+                    lower_element_index_array[order_array].tolist(),
+                    upper_element_index_array[order_array].tolist(),
+                    pair_non_terminal_index_array[order_array].tolist(),
+                )
+            )
+
+        return self._grammar_class(
+            self._grammar_class._get_context_free_grammar_rule_list(
+                element0_element1_and_non_terminal_tuple
+            )
+        )
+
+
+# Each worker process of a parallel resolution keeps its own copy of
+# the grammar, so that the grammar only needs to be pickled once for
+# each process and not once for each subtree.
+_worker_pitch_based_context_free_grammar: typing.Optional[
+    PitchBasedContextFreeGrammar
+] = None
+
+
+def _initialize_worker(
+    pitch_based_context_free_grammar: PitchBasedContextFreeGrammar,
+):
+    global _worker_pitch_based_context_free_grammar
+    _worker_pitch_based_context_free_grammar = pitch_based_context_free_grammar
+
+
+def _get_layer_tuple(
+    data: tuple[
+        typing.Union[JustIntonationPitchTerminal, JustIntonationPitchNonTerminal],
+        ...,
+    ],
+    limit: typing.Optional[int],
+) -> tuple[
+    tuple[tuple[tuple[int, int, int], ...], ...],
+    typing.Optional[zimmermann_generators.ResolveProfile],
+]:
+    pitch_based_context_free_grammar = _worker_pitch_based_context_free_grammar
+    if pitch_based_context_free_grammar.profile is None:
+        return pitch_based_context_free_grammar._get_layer_tuple(data, limit), None
+    # Each subtree gets a new profile, which is sent back and added to
+    # the profile of the grammar in the parent process.
+    pitch_based_context_free_grammar.profile = zimmermann_generators.ResolveProfile()
+    return (
+        pitch_based_context_free_grammar._get_layer_tuple(data, limit),
+        pitch_based_context_free_grammar.profile,
+    )
+
+
+# Each worker process of a grammar sweep keeps its own copy of the
+# lattice, so that it only needs to be pickled once for each process.
+_worker_constraint_grid: typing.Optional[_ConstraintGrid] = None
+
+
+def _initialize_constraint_grid_worker(constraint_grid: _ConstraintGrid):
+    global _worker_constraint_grid
+    _worker_constraint_grid = constraint_grid
+
 
-        if status:
-            super()._add_node(tree, data, parent)
+def _get_constraint_grid_grammar(
+    constraint_tuple: tuple[float, float, tuple[int, ...], float],
+) -> PitchBasedContextFreeGrammar:
+    return _worker_constraint_grid.get_grammar(*constraint_tuple)
@@ -1,9 +1,295 @@
+import collections
 import typing
 
-from mutwo import common_generators
+import numpy as np
 
+from mutwo import zimmermann_generators
 
-__all__ = ("euclidean_interlocking",)
+__all__ = (
+    "euclidean_interlocking",
+    "iter_euclidean_interlocking",
+    "get_euclidean_interlocking_pattern",
+    "euclidean_interlocking_array",
+)
+
+_CHUNK_SIZE = 4096
+
+# Read-only arrays of interlockings by '(kind, length tuple)', the least
+# recently used first. The cache is bounded by the bytes of all arrays
+# (and not by their number), so that interlockings of long sequences
+# can't keep much memory.
+_key_to_cached_array: collections.OrderedDict[
+    tuple[str, tuple[int, ...]], np.ndarray
+] = collections.OrderedDict()
+_cached_byte_count = 0
+
+
+def _euclidean(size: int, distribution: int) -> np.ndarray:
+    # Same as 'common_generators.euclidean', but with arrays (the
+    # original function needs quadratic time for big distributions).
+    standard_size, rest = divmod(size, distribution)
+    euclidean_array = np.full(distribution, standard_size, dtype=np.int64)
+    if rest:
+        euclidean_array[_get_start_array(_euclidean(distribution, rest))] += 1
+    return euclidean_array
+
+
+def _get_start_array(euclidean_array: np.ndarray) -> np.ndarray:
+    # Position of the first beat of each distance (the same as
+    # 'core_utilities.accumulate_from_zero' without the last item).
+    start_array = np.zeros(len(euclidean_array), dtype=np.int64)
+    np.cumsum(euclidean_array[:-1], out=start_array[1:])
+    return start_array
+
+
+def _get_new_position_array(old_count: int, new_count: int) -> np.ndarray:
+    # Positions of the new items when 'new_count' items are interlocked
+    # with 'old_count' items (the zeros of
+    # 'common_generators.euclidean(old_count, old_count + new_count)').
+    if not old_count or not new_count:
+        return np.arange(new_count, dtype=np.int64)
+    if new_count < old_count:
+        # Each old item is followed by at most one new item. We only need
+        # to know after which old items a new item is inserted. In this
+        # way we don't need to touch each of the (many) old items.
+        start_array = _get_start_array(_euclidean(old_count, new_count))
+        return start_array + np.arange(1, new_count + 1, dtype=np.int64)
+    is_new_array = np.ones(old_count + new_count, dtype=bool)
+    is_new_array[_get_start_array(_euclidean(old_count + new_count, old_count))] = False
+    return np.flatnonzero(is_new_array)
+
+
+def _get_euclidean_interlocking_pattern(
+    length_sequence: typing.Sequence[int],
+) -> np.ndarray:
+    """Get the index of the source sequence for each item of the result.
+
+    The original algorithm interlocks the sequences one after the other:
+    the items of each sequence are inserted into the result of all
+    previous sequences. In order to avoid rebuilding the result for each
+    sequence, we go backwards: the items of the last sequence get their
+    final positions immediately, the items of each previous sequence get
+    the free positions which are left. Free positions are counted with
+    a Fenwick tree, so that finding the n-th free position only needs
+    logarithmic time. The tree is queried and updated for all items of
+    one sequence at once.
+    """
+
+    length_tuple = tuple(length_sequence)
+    item_count = sum(length_tuple)
+    pattern = np.zeros(
+        item_count, dtype=np.uint16 if len(length_tuple) <= 2**16 else np.uint32
+    )
+    if not item_count:
+        return pattern
+
+    # Fenwick tree (1-based) where each position is free at the beginning.
+    # The size is a power of two, so that we never need to check if a
+    # position is inside the tree. The additional positions are never
+    # found, because they are behind all positions which we ask for.
+    fenwick_size = 1 << item_count.bit_length()
+    fenwick_array = np.arange(fenwick_size + 1, dtype=np.int64)
+    fenwick_array &= -fenwick_array
+
+    old_count = item_count
+    for sequence_index in range(len(length_tuple) - 1, 0, -1):
+        new_count = length_tuple[sequence_index]
+        old_count -= new_count
+        if not new_count:
+            continue
+
+        # Find position of n-th free item for each new item
+        rank_array = _get_new_position_array(old_count, new_count) + 1
+        position_array = np.zeros(new_count, dtype=np.int64)
+        step = fenwick_size >> 1
+        while step:
+            next_position_array = position_array + step
+            count_array = fenwick_array[next_position_array]
+            is_free_array = count_array < rank_array
+            position_array[is_free_array] = next_position_array[is_free_array]
+            rank_array[is_free_array] -= count_array[is_free_array]
+            step >>= 1
+        pattern[position_array] = sequence_index
+
+        # Mark found positions as used
+        position_array += 1
+        while len(position_array):
+            np.subtract.at(fenwick_array, position_array, 1)
+            position_array += position_array & -position_array
+            position_array = position_array[position_array <= fenwick_size]
+
+    return pattern
+
+
+def _get_cached_array(
+    key: tuple[str, tuple[int, ...]],
+    create_array: typing.Callable[[tuple[int, ...]], np.ndarray],
+) -> np.ndarray:
+    global _cached_byte_count
+
+    try:
+        array = _key_to_cached_array[key]
+    except KeyError:
+        pass
+    else:
+        _key_to_cached_array.move_to_end(key)
+        return array
+
+    array = create_array(key[1])
+    # The same array is returned to all callers: nobody should change it.
+    array.setflags(write=False)
+    maximum_size = (
+        zimmermann_generators.configurations.EUCLIDEAN_INTERLOCKING_CACHE_MAXIMUM_SIZE
+    )
+    if array.nbytes <= maximum_size:
+        _key_to_cached_array[key] = array
+        _cached_byte_count += array.nbytes
+        while _cached_byte_count > maximum_size:
+            _, evicted_array = _key_to_cached_array.popitem(last=False)
+            _cached_byte_count -= evicted_array.nbytes
+    return array
+
+
+def _get_cached_euclidean_interlocking_pattern(
+    length_tuple: tuple[int, ...],
+) -> np.ndarray:
+    return _get_cached_array(
+        ("pattern", length_tuple), _get_euclidean_interlocking_pattern
+    )
+
+
+def _get_euclidean_interlocking_position_array(
+    length_tuple: tuple[int, ...],
+) -> np.ndarray:
+    # Position in the result of each item of the concatenated sequences.
+    # A stable sort keeps the order of the items of each sequence.
+    return np.argsort(
+        _get_cached_euclidean_interlocking_pattern(length_tuple), kind="stable"
+    )
+
+
+def _get_cached_euclidean_interlocking_position_array(
+    length_tuple: tuple[int, ...],
+) -> np.ndarray:
+    return _get_cached_array(
+        ("position", length_tuple), _get_euclidean_interlocking_position_array
+    )
+
+
+def get_euclidean_interlocking_pattern(*length: int) -> np.ndarray:
+    """Get the index of the source sequence of each item of an interlocking.
+
+    :param length: The number of items of each sequence.
+    :type length: int
+    :return: A read-only array where each item is the index of the
+        sequence from which the item at the same position of
+        :func:`euclidean_interlocking` is taken. The data type is
+        ``numpy.uint16`` (or ``numpy.uint32`` for more than 65536
+        sequences), so the pattern only needs two bytes for each item.
+
+    Patterns are cached by their lengths, so asking for the same lengths
+    again doesn't calculate anything. The size of the cache is limited
+    by
+    :const:`mutwo.zimmermann_generators.configurations.EUCLIDEAN_INTERLOCKING_CACHE_MAXIMUM_SIZE`:
+    the least recently used patterns are removed first and patterns
+    which are bigger than the limit aren't cached.
+    If a mutable pattern or an ``array.array`` is needed, use
+    ``pattern.copy()`` or ``array.array("H", pattern)``.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> zimmermann_generators.get_euclidean_interlocking_pattern(3, 2)
+    array([0, 1, 0, 0, 1], dtype=uint16)
+    """
+
+    return _get_cached_euclidean_interlocking_pattern(tuple(map(int, length)))
+
+
+def euclidean_interlocking_array(*array_to_interlock: np.ndarray) -> np.ndarray:
+    """Interlock arrays along their first axis.
+
+    :param array_to_interlock: Any array with n elements in its first
+        axis. All arrays need to have the same shape in all other axes.
+    :type array_to_interlock: np.ndarray
+    :return: A new array with the same order as
+        :func:`euclidean_interlocking` would return for the arrays.
+
+    The arrays are interlocked by ``numpy`` indexing without any
+    python loop. The positions are cached by the lengths of the arrays
+    (in the same way as for :func:`get_euclidean_interlocking_pattern`).
+
+    **Example:**
+
+    >>> import numpy as np
+    >>> from mutwo import zimmermann_generators
+    >>> zimmermann_generators.euclidean_interlocking_array(
+    >>>     np.array([0, 0, 0]), np.array([1, 1])
+    >>> )
+    array([0, 1, 0, 0, 1])
+    """
+
+    if not array_to_interlock:
+        return np.array([])
+    array_tuple = tuple(np.asarray(array) for array in array_to_interlock)
+    concatenated_array = np.concatenate(array_tuple)
+    interlocked_array = np.empty_like(concatenated_array)
+    interlocked_array[
+        _get_cached_euclidean_interlocking_position_array(
+            tuple(len(array) for array in array_tuple)
+        )
+    ] = concatenated_array
+    return interlocked_array
+
+
+def iter_euclidean_interlocking(
+    *iterable_to_interlock: typing.Iterable[typing.Any],
+    length_sequence: typing.Optional[typing.Sequence[int]] = None,
+) -> typing.Generator[typing.Any, None, None]:
+    """Interlock iterables and yield one item after the other.
+
+    :param iterable_to_interlock: Any iterable with n elements.
+    :param length_sequence: The number of items of each iterable. If
+        ``None`` the length is found with ``len`` (so the iterables need
+        to be sequences). Default to ``None``.
+    :type length_sequence: typing.Optional[typing.Sequence[int]]
+
+    The items are yielded in the same order as
+    :func:`euclidean_interlocking` returns them. Only the index of the
+    source of each item is kept in memory, items are taken from the
+    iterables when they are yielded.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> interlocking = zimmermann_generators.iter_euclidean_interlocking(
+    >>>     iter("aaa"), iter("bb"), length_sequence=(3, 2)
+    >>> )
+    >>> "".join(interlocking)
+    'abaab'
+    """
+
+    if length_sequence is None:
+        length_sequence = tuple(len(iterable) for iterable in iterable_to_interlock)
+    elif len(length_sequence) != len(iterable_to_interlock):
+        raise ValueError(
+            f"Found {len(length_sequence)} lengths for "
+            f"{len(iterable_to_interlock)} iterables."
+        )
+
+    iterator_list = [iter(iterable) for iterable in iterable_to_interlock]
+    pattern = get_euclidean_interlocking_pattern(*length_sequence)
+    # Convert pattern in small chunks to python integers: a list of
+    # all indices would need much more memory than the pattern itself.
+    for chunk_start in range(0, len(pattern), _CHUNK_SIZE):
+        for index in pattern[chunk_start : chunk_start + _CHUNK_SIZE].tolist():
+            try:
+                yield next(iterator_list[index])
+            except StopIteration:
+                raise ValueError(
+                    f"Iterable {index} has less items than its "
+                    f"length {length_sequence[index]}."
+                )
 
 
 def euclidean_interlocking(
@@ -22,23 +308,4 @@ def euclidean_interlocking(
     (0, 1, 0, 0, 1)
     """
 
-    # Avoid corner case error
-    if not sequence_to_interlock:
-        return tuple([])
-
-    sequence_count_list = [len(sequence) for sequence in sequence_to_interlock]
-    index_list = [0 for _ in range(sequence_count_list[0])]
-
-    for index, sequence_count in enumerate(sequence_count_list[1:]):
-        current_length = len(index_list)
-        index_list_iterator = iter(index_list)
-        current_index = index + 1
-        index_list = [
-            next(index_list_iterator) if distribution else current_index
-            for distribution in common_generators.euclidean(
-                current_length, current_length + sequence_count
-            )
-        ]
-
-    iterator_list = [iter(sequence) for sequence in sequence_to_interlock]
-    return tuple(next(iterator_list[index]) for index in index_list)
+    return tuple(iter_euclidean_interlocking(*sequence_to_interlock))
@@ -0,0 +1,143 @@
+"""Find out where the time of a resolution goes"""
+
+from __future__ import annotations
+
+import typing
+
+__all__ = ("ResolveProfile",)
+
+
+class ResolveProfile(object):
+    """Counters and timers of the resolutions of a grammar.
+
+    :param callback: Function which is called with the profile after
+        each resolution (e.g. to send the counters to a metrics system).
+        The callback isn't pickled with the profile. Default to ``None``.
+    :type callback: typing.Optional[typing.Callable[[ResolveProfile], None]]
+
+    The profile has these attributes:
+
+    - ``generated_node_count``: how many nodes have been tested if they
+      pass the filter and the pruning of the grammar
+    - ``accepted_node_count``: how many of them passed and have been
+      added to the result
+    - ``status_cache_hit_count`` and ``status_cache_miss_count``: how
+      often the validity of a node has been found in the status cache
+      or had to be calculated
+    - ``depth_to_tried_rule_count``: how many rules have been applied to
+      create the nodes of each depth
+    - ``tag_duration``, ``accumulation_duration`` and
+      ``insertion_duration``: seconds spent to create the tags of nodes,
+      to accumulate their pitches (the filter) and to add them to a tree
+
+    A profile is enabled by setting the ``profile`` attribute of a
+    :class:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar`.
+    If a grammar has no profile (the default), nothing is measured
+    and the resolution isn't slowed down. The counters and timers sum
+    up all resolutions until :meth:`reset` is called.
+
+    These methods of the grammar are profiled: ``resolve`` (also with
+    worker processes: their counters are added to the profile of the
+    current process), ``resolve_async``, ``deepen``, ``resolve_compact``,
+    ``resolve_graph``, ``iter_resolve``, ``iter_leaves``, ``sample`` and
+    ``count_derivations`` with filter. The timers only measure the
+    work of the current process. ``resolve_compact`` and
+    ``resolve_graph`` don't create tags or insert nodes into a
+    :class:`treelib.Tree`, so their ``tag_duration`` and
+    ``insertion_duration`` stay 0. ``resolve_graph`` and
+    ``count_derivations`` only test equal derivations of a level
+    once and ``sample`` only tests each derivation once, even if it is
+    part of several samples. The
+    generators ``iter_resolve`` and ``iter_leaves`` call the callback
+    when they are exhausted.
+
+    **Example:**
+
+    >>> from mutwo import zimmermann_generators
+    >>> grammar = zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+    >>>     prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+    >>>     maximum_cent_deviation=550,
+    >>> )
+    >>> grammar.profile = zimmermann_generators.ResolveProfile()
+    >>> tree = grammar.resolve(
+    >>>     zimmermann_generators.JustIntonationPitchNonTerminal("5/4"), limit=3
+    >>> )
+    >>> grammar.profile.generated_node_count, grammar.profile.accepted_node_count
+    (11, 7)
+    >>> grammar.profile.depth_to_tried_rule_count
+    {1: 2, 2: 4, 3: 4}
+    """
+
+    def __init__(
+        self, callback: typing.Optional[typing.Callable[[ResolveProfile], None]] = None
+    ):
+        self.callback = callback
+        self.reset()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()})"
+
+    # The callback isn't pickled: it is only called in the process where
+    # it has been set and it often can't be pickled (e.g. a lambda), but
+    # the profile is pickled together with its grammar when the grammar
+    # is sent to the worker processes of a parallel resolution.
+    def __getstate__(self) -> dict[str, typing.Any]:
+        state = dict(self.__dict__)
+        state["callback"] = None
+        return state
+
+    def reset(self):
+        """Set all counters and timers to 0."""
+
+        self.generated_node_count = 0
+        self.accepted_node_count = 0
+        self.status_cache_hit_count = 0
+        self.status_cache_miss_count = 0
+        self.depth_to_tried_rule_count = {}
+        self.tag_duration = 0.0
+        self.accumulation_duration = 0.0
+        self.insertion_duration = 0.0
+
+    @property
+    def acceptance_ratio(self) -> float:
+        """The share of generated nodes which have been accepted."""
+
+        if not self.generated_node_count:
+            return 0.0
+        return self.accepted_node_count / self.generated_node_count
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        """Get all counters and timers (e.g. to serialize them)."""
+
+        return dict(
+            generated_node_count=self.generated_node_count,
+            accepted_node_count=self.accepted_node_count,
+            status_cache_hit_count=self.status_cache_hit_count,
+            status_cache_miss_count=self.status_cache_miss_count,
+            depth_to_tried_rule_count=dict(self.depth_to_tried_rule_count),
+            tag_duration=self.tag_duration,
+            accumulation_duration=self.accumulation_duration,
+            insertion_duration=self.insertion_duration,
+        )
+
+    def _add_tried_rule_count(self, depth: int, tried_rule_count: int):
+        self.depth_to_tried_rule_count[depth] = (
+            self.depth_to_tried_rule_count.get(depth, 0) + tried_rule_count
+        )
+
+    def _add_profile(self, profile: ResolveProfile, depth_offset: int):
+        # Add the counters and timers of a profile of a subtree whose
+        # root has the depth 'depth_offset'.
+        self.generated_node_count += profile.generated_node_count
+        self.accepted_node_count += profile.accepted_node_count
+        self.status_cache_hit_count += profile.status_cache_hit_count
+        self.status_cache_miss_count += profile.status_cache_miss_count
+        for depth, tried_rule_count in profile.depth_to_tried_rule_count.items():
+            self._add_tried_rule_count(depth + depth_offset, tried_rule_count)
+        self.tag_duration += profile.tag_duration
+        self.accumulation_duration += profile.accumulation_duration
+        self.insertion_duration += profile.insertion_duration
+
+    def _report(self):
+        if self.callback is not None:
+            self.callback(self)
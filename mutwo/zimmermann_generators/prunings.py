@@ -0,0 +1,112 @@
+"""Cut branches of a resolution which can't lead to wanted derivations"""
+
+from __future__ import annotations
+
+import typing
+
+__all__ = ("ResolvePruning",)
+
+
+class ResolvePruning(object):
+    """Constraints which are tested while a grammar is resolved.
+
+    :param maximum_cent_range: The maximum distance in cents between the
+        highest and the lowest accumulated pitch of a derivation. The
+        accumulated pitches start with 1/1. Default to ``None``.
+    :type maximum_cent_range: typing.Optional[float]
+    :param minimum_cent_range: The minimum distance in cents between the
+        highest and the lowest accumulated pitch. Default to ``None``.
+    :type minimum_cent_range: typing.Optional[float]
+    :param maximum_symbol_count: The maximum number of symbols of a
+        derivation. Default to ``None``.
+    :type maximum_symbol_count: typing.Optional[int]
+    :param minimum_harmonicity_sum: The minimum sum of the simplified
+        barlow harmonicity of all symbols of a derivation. Default to
+        ``None``.
+    :type minimum_harmonicity_sum: typing.Optional[float]
+
+    Constraints which are ``None`` aren't tested. A pruning is passed
+    to the ``pruning`` argument of
+    :class:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar`.
+
+    Each expansion inserts new accumulated pitches between the existing
+    ones and adds symbols, therefore the cent range and the number of
+    symbols never shrink. So a node which breaks a maximum constraint is
+    removed with all its descendants. A node which doesn't reach a
+    minimum constraint yet may still reach it after further expansions:
+    it is only removed if even an optimistic estimate of its descendants
+    within the limit of the resolution can't reach the minimum. Nodes of
+    the last level (which won't be expanded anymore) therefore always
+    fulfill all constraints, but inner nodes or leaves which couldn't be
+    expanded further may not reach the minimum constraints. Because the
+    minimum constraints depend on the limit, trees of grammars with
+    minimum constraints can't be resolved further with
+    :meth:`mutwo.zimmermann_generators.PitchBasedContextFreeGrammar.deepen`.
+    """
+
+    def __init__(
+        self,
+        maximum_cent_range: typing.Optional[float] = None,
+        minimum_cent_range: typing.Optional[float] = None,
+        maximum_symbol_count: typing.Optional[int] = None,
+        minimum_harmonicity_sum: typing.Optional[float] = None,
+    ):
+        if (
+            maximum_cent_range is not None
+            and minimum_cent_range is not None
+            and minimum_cent_range > maximum_cent_range
+        ):
+            raise ValueError(
+                f"Minimum cent range '{minimum_cent_range}' is bigger than "
+                f"maximum cent range '{maximum_cent_range}'."
+            )
+        if maximum_symbol_count is not None and maximum_symbol_count < 1:
+            raise ValueError(
+                f"Found illegal maximum symbol count '{maximum_symbol_count}'."
+            )
+        self._maximum_cent_range = maximum_cent_range
+        self._minimum_cent_range = minimum_cent_range
+        self._maximum_symbol_count = maximum_symbol_count
+        self._minimum_harmonicity_sum = minimum_harmonicity_sum
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}("
+            f"maximum_cent_range={self.maximum_cent_range}, "
+            f"minimum_cent_range={self.minimum_cent_range}, "
+            f"maximum_symbol_count={self.maximum_symbol_count}, "
+            f"minimum_harmonicity_sum={self.minimum_harmonicity_sum})"
+        )
+
+    @property
+    def maximum_cent_range(self) -> typing.Optional[float]:
+        """The maximum distance between the highest and the lowest pitch."""
+
+        return self._maximum_cent_range
+
+    @property
+    def minimum_cent_range(self) -> typing.Optional[float]:
+        """The minimum distance between the highest and the lowest pitch."""
+
+        return self._minimum_cent_range
+
+    @property
+    def maximum_symbol_count(self) -> typing.Optional[int]:
+        """The maximum number of symbols of a derivation."""
+
+        return self._maximum_symbol_count
+
+    @property
+    def minimum_harmonicity_sum(self) -> typing.Optional[float]:
+        """The minimum sum of the harmonicity of all symbols of a derivation."""
+
+        return self._minimum_harmonicity_sum
+
+    @property
+    def has_minimum_constraint(self) -> bool:
+        """``True`` if any minimum constraint is set."""
+
+        return (
+            self._minimum_cent_range is not None
+            or self._minimum_harmonicity_sum is not None
+        )
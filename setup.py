@@ -29,7 +29,7 @@ setuptools.setup(
     ],
     setup_requires=[],
     install_requires=[
-        "sympy>=1.10.1, <2.0.0",
+        "numpy>=1.18, <2.00",
         "mutwo.core>=0.62.0, <1.0.0",
         "mutwo.music>=0.18.0, <1.0.0",
         "mutwo.common>=0.9.0, <1.0.0",
@@ -1,10 +1,28 @@
+import asyncio
+import collections
+import concurrent.futures
 import datetime
+import fractions
+import functools
+import importlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import pkgutil
+import random
+import shutil
+import tempfile
 import typing
 import unittest
+import unittest.mock
 
+import numpy as np
 import treelib
 
 from mutwo import common_generators
+from mutwo import core_utilities
+from mutwo import music_parameters
 from mutwo import zimmermann_generators
 
 
@@ -117,6 +135,155 @@ class PitchBasedContextFreeGrammarTests(unittest.TestCase):
             self.assertEqual(expected_rule.left_side, real_rule.left_side)
             self.assertEqual(expected_rule.right_side, real_rule.right_side)
 
+    def test_get_element0_element1_and_non_terminal_tuple(self):
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                minimal_barlow_harmonicity_non_terminal=0.05,
+                minimal_barlow_harmonicity_terminal=0.02,
+                prime_number_to_maximum_exponent_dict={3: 2, 5: 1, 7: 1},
+                maximum_cent_deviation=700,
+                allowed_octave_sequence=(-2, -1, 0, 1),
+            )
+        )
+        non_terminal_tuple = pitch_based_context_free_grammar.non_terminal_tuple
+        element_tuple = (
+            non_terminal_tuple + pitch_based_context_free_grammar.terminal_tuple
+        )
+        # Compare with naive implementation
+        expected_element0_element1_and_non_terminal_list = []
+        for element0, element1 in itertools.combinations(element_tuple, 2):
+            summed = element0 + element1
+            if summed in non_terminal_tuple:
+                expected_element0_element1_and_non_terminal_list.append(
+                    (
+                        element0,
+                        element1,
+                        non_terminal_tuple[non_terminal_tuple.index(summed)],
+                    )
+                )
+        self.assertTrue(expected_element0_element1_and_non_terminal_list)
+        self.assertEqual(
+            zimmermann_generators.PitchBasedContextFreeGrammar._get_element0_element1_and_non_terminal_tuple(
+                element_tuple, non_terminal_tuple
+            ),
+            tuple(expected_element0_element1_and_non_terminal_list),
+        )
+
+    def test_get_element0_element1_and_non_terminal_tuple_with_big_keys(self):
+        # With many primes the keys of the pairs don't fit into 64 bit
+        # integers and python integers are used instead.
+        column_count = 30
+        random_generator = random.Random(100)
+        exponent_list_list = [[1] * column_count, [-1] * column_count] + [
+            [random_generator.choice((-1, 0, 0, 1)) for _ in range(column_count)]
+            for _ in range(30)
+        ]
+        self.assertGreater(5**column_count, 2**62)
+        element_tuple = tuple(
+            zimmermann_generators.JustIntonationPitchTerminal(exponent_list)
+            for exponent_list in exponent_list_list
+        )
+        non_terminal_tuple = tuple(
+            zimmermann_generators.JustIntonationPitchNonTerminal(
+                [
+                    exponent0 + exponent1
+                    for exponent0, exponent1 in zip(
+                        exponent_list_list[index0], exponent_list_list[index1]
+                    )
+                ]
+            )
+            for index0, index1 in ((0, 1), (2, 3), (5, 4), (7, 20), (3, 3))
+        ) + (zimmermann_generators.JustIntonationPitchNonTerminal("11/7"),)
+        expected_element0_element1_and_non_terminal_list = []
+        for element0, element1 in itertools.combinations(element_tuple, 2):
+            summed = element0 + element1
+            for non_terminal in non_terminal_tuple:
+                if non_terminal.exponent_tuple == summed.exponent_tuple:
+                    expected_element0_element1_and_non_terminal_list.append(
+                        (element0, element1, non_terminal)
+                    )
+                    break
+        self.assertEqual(len(expected_element0_element1_and_non_terminal_list), 4)
+        self.assertEqual(
+            zimmermann_generators.PitchBasedContextFreeGrammar._get_element0_element1_and_non_terminal_tuple(
+                element_tuple, non_terminal_tuple
+            ),
+            tuple(expected_element0_element1_and_non_terminal_list),
+        )
+
+    def test_get_terminal_tuple_and_non_terminal_tuple(self):
+        # Compare with naive implementation which creates a pitch
+        # object for each candidate.
+        def get_terminal_tuple_and_non_terminal_tuple(
+            minimal_barlow_harmonicity_non_terminal,
+            minimal_barlow_harmonicity_terminal,
+            prime_number_to_maximum_exponent_dict,
+            allowed_octave_sequence,
+            maximum_cent_deviation,
+            add_unison,
+        ):
+            terminal_list, non_terminal_list = [], []
+            prime_number_tuple = tuple(prime_number_to_maximum_exponent_dict.keys())
+            for n_prime_numbers in range(not add_unison, len(prime_number_tuple) + 1):
+                for combined_prime_number_tuple in itertools.combinations(
+                    prime_number_tuple, n_prime_numbers
+                ):
+                    for exponent_tuple in itertools.product(
+                        *[
+                            zimmermann_generators.PitchBasedContextFreeGrammar._maximum_exponent_to_allowed_exponent_tuple(
+                                prime_number_to_maximum_exponent_dict[prime_number]
+                            )
+                            for prime_number in combined_prime_number_tuple
+                        ]
+                    ):
+                        for octave in allowed_octave_sequence:
+                            ratio = fractions.Fraction(1, 1)
+                            for prime_number, exponent in zip(
+                                combined_prime_number_tuple, exponent_tuple
+                            ):
+                                ratio *= fractions.Fraction(prime_number) ** exponent
+                            just_intonation_pitch = (
+                                music_parameters.JustIntonationPitch(ratio).register(
+                                    octave
+                                )
+                            )
+                            if (
+                                abs(just_intonation_pitch.interval)
+                                <= maximum_cent_deviation
+                            ):
+                                harmonicity = (
+                                    just_intonation_pitch.harmonicity_simplified_barlow
+                                )
+                                if (
+                                    harmonicity
+                                    >= minimal_barlow_harmonicity_non_terminal
+                                ):
+                                    non_terminal_list.append(
+                                        zimmermann_generators.JustIntonationPitchNonTerminal(
+                                            just_intonation_pitch.exponent_tuple
+                                        )
+                                    )
+                                elif harmonicity >= minimal_barlow_harmonicity_terminal:
+                                    terminal_list.append(
+                                        zimmermann_generators.JustIntonationPitchTerminal(
+                                            just_intonation_pitch.exponent_tuple
+                                        )
+                                    )
+            return tuple(non_terminal_list), tuple(terminal_list)
+
+        for argument_tuple in (
+            (0.1, 0.05, {3: 2, 5: 1, 7: 1, 11: 1}, (-1, 0), 500, False),
+            (0.05, 0.02, {3: 2, 5: 1, 7: 1}, (-2, -1, 0, 1), 1200, True),
+            (0.1, 0.05, {}, (-1, 0, 1), 1200, True),
+            (0.1, 0.05, {3: 1, 5: 1}, (-1, 0), 701.9550008653874, False),
+        ):
+            self.assertEqual(
+                zimmermann_generators.PitchBasedContextFreeGrammar._get_terminal_tuple_and_non_terminal_tuple(
+                    *argument_tuple
+                ),
+                get_terminal_tuple_and_non_terminal_tuple(*argument_tuple),
+            )
+
     def test_from_constraints_with_unison(self):
         pitch_based_context_free_grammar = (
             zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
@@ -158,6 +325,166 @@ class PitchBasedContextFreeGrammarTests(unittest.TestCase):
             tuple([]),
         )
 
+    def test_from_constraint_grid(self):
+        for (
+            prime_number_to_maximum_exponent_dict,
+            allowed_octave_sequence_sequence,
+            add_unison,
+        ) in (
+            ({3: 1, 5: 1}, ((-1, 0), (0, -1), (0,), (0, 0)), False),
+            ({3: 1, 5: 1, 7: 1}, ((-1, 0), (-1, 0, 1)), True),
+        ):
+            grammar_dict = zimmermann_generators.PitchBasedContextFreeGrammar.from_constraint_grid(
+                minimal_barlow_harmonicity_non_terminal_sequence=(0.1, 0.04),
+                minimal_barlow_harmonicity_terminal_sequence=(0.05, 0.03),
+                prime_number_to_maximum_exponent_dict=prime_number_to_maximum_exponent_dict,
+                allowed_octave_sequence_sequence=allowed_octave_sequence_sequence,
+                maximum_cent_deviation_sequence=(386.3137138648348, 550, 1200),
+                add_unison=add_unison,
+            )
+            # (0.04, 0.05) isn't a valid combination
+            self.assertEqual(
+                len(grammar_dict), 3 * len(allowed_octave_sequence_sequence) * 3
+            )
+            for (
+                (
+                    minimal_barlow_harmonicity_non_terminal,
+                    minimal_barlow_harmonicity_terminal,
+                    allowed_octave_tuple,
+                    maximum_cent_deviation,
+                ),
+                pitch_based_context_free_grammar,
+            ) in grammar_dict.items():
+                expected_pitch_based_context_free_grammar = zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                    minimal_barlow_harmonicity_non_terminal=minimal_barlow_harmonicity_non_terminal,
+                    minimal_barlow_harmonicity_terminal=minimal_barlow_harmonicity_terminal,
+                    prime_number_to_maximum_exponent_dict=prime_number_to_maximum_exponent_dict,
+                    allowed_octave_sequence=allowed_octave_tuple,
+                    maximum_cent_deviation=maximum_cent_deviation,
+                    add_unison=add_unison,
+                )
+                for attribute_name in (
+                    "context_free_grammar_rule_tuple",
+                    "non_terminal_tuple",
+                    "terminal_tuple",
+                ):
+                    self.assertEqual(
+                        getattr(pitch_based_context_free_grammar, attribute_name),
+                        getattr(
+                            expected_pitch_based_context_free_grammar, attribute_name
+                        ),
+                    )
+
+    def test_parallel_from_constraint_grid(self):
+        constraint_grid_kwargs = dict(
+            minimal_barlow_harmonicity_terminal_sequence=(0.05, 0.03),
+            prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+            maximum_cent_deviation_sequence=(550, 1200),
+        )
+        grammar_dict = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraint_grid(
+                **constraint_grid_kwargs
+            )
+        )
+        parallel_grammar_dict = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraint_grid(
+                worker_count=2, **constraint_grid_kwargs
+            )
+        )
+        self.assertEqual(tuple(grammar_dict), tuple(parallel_grammar_dict))
+        for constraint_tuple, pitch_based_context_free_grammar in grammar_dict.items():
+            self.assertEqual(
+                parallel_grammar_dict[constraint_tuple].context_free_grammar_rule_tuple,
+                pitch_based_context_free_grammar.context_free_grammar_rule_tuple,
+            )
+
+    def test_empty_constraint_grid(self):
+        self.assertEqual(
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraint_grid(
+                minimal_barlow_harmonicity_non_terminal_sequence=(0.05,),
+                minimal_barlow_harmonicity_terminal_sequence=(0.05,),
+            ),
+            {},
+        )
+
+    def test_rule_table(self):
+        pitch_based_context_free_grammar = self.pitch_based_context_free_grammar
+        symbol_tuple = pitch_based_context_free_grammar._symbol_tuple
+        for non_terminal_id, non_terminal in enumerate(
+            pitch_based_context_free_grammar.non_terminal_tuple
+        ):
+            self.assertEqual(symbol_tuple[non_terminal_id], non_terminal)
+            context_free_grammar_rule_tuple = (
+                pitch_based_context_free_grammar.get_context_free_grammar_rule_tuple(
+                    non_terminal
+                )
+            )
+            context_free_grammar_rule_index_tuple = pitch_based_context_free_grammar._divided_context_free_grammar_rule_index_tuple[
+                non_terminal_id
+            ]
+            self.assertEqual(
+                len(context_free_grammar_rule_tuple),
+                len(context_free_grammar_rule_index_tuple),
+            )
+            for context_free_grammar_rule, context_free_grammar_rule_index in zip(
+                context_free_grammar_rule_tuple, context_free_grammar_rule_index_tuple
+            ):
+                right_side = tuple(
+                    symbol_tuple[symbol_id]
+                    for symbol_id in pitch_based_context_free_grammar._rule_right_side_symbol_id_tuple[
+                        context_free_grammar_rule_index
+                    ]
+                )
+                self.assertEqual(right_side, context_free_grammar_rule.right_side)
+                self.assertEqual(
+                    tuple(map(type, right_side)),
+                    tuple(map(type, context_free_grammar_rule.right_side)),
+                )
+
+    def test_resolve_unknown_non_terminal(self):
+        self.assertRaises(
+            ValueError,
+            lambda: self.pitch_based_context_free_grammar.resolve(
+                zimmermann_generators.JustIntonationPitchNonTerminal("7/4")
+            ),
+        )
+        # Unknown terminals are kept as they are
+        tree = self.pitch_based_context_free_grammar.resolve(
+            zimmermann_generators.JustIntonationPitchTerminal("7/4")
+        )
+        self.assertEqual(len(tree), 1)
+
+    def test_is_exponent_tuple_tuple_valid(self):
+        # Compare with naive implementation which accumulates pitch objects
+        def is_valid(data):
+            pitch_accumulation = tuple(
+                core_utilities.accumulate_from_n(
+                    data, music_parameters.JustIntonationPitch("1/1")
+                )
+            )
+            if pitch_accumulation[0] == pitch_accumulation[-1]:
+                pitch_accumulation = pitch_accumulation[1:]
+            return len(core_utilities.uniqify_sequence(pitch_accumulation)) == len(
+                pitch_accumulation
+            )
+
+        symbol_tuple = (
+            self.pitch_based_context_free_grammar.non_terminal_tuple
+            + self.pitch_based_context_free_grammar.terminal_tuple
+            + (zimmermann_generators.JustIntonationPitchTerminal("1/1"),)
+        )
+        is_valid_set = set([])
+        for symbol_count in range(1, 5):
+            for data in itertools.product(symbol_tuple, repeat=symbol_count):
+                is_valid_set.add(is_valid(data))
+                self.assertEqual(
+                    zimmermann_generators.PitchBasedContextFreeGrammar._is_exponent_tuple_tuple_valid(
+                        tuple(pitch.exponent_tuple for pitch in data)
+                    ),
+                    is_valid(data),
+                )
+        self.assertEqual(is_valid_set, {True, False})
+
     def test_resolve(self):
         start = zimmermann_generators.JustIntonationPitchNonTerminal("3/4")
         resolution = self.pitch_based_context_free_grammar.resolve(start, limit=1)
@@ -175,6 +502,521 @@ class PitchBasedContextFreeGrammarTests(unittest.TestCase):
         )
         self._compare_tree(expected_tree, resolution)
 
+    def test_parallel_resolve(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for limit, split_depth in ((0, 1), (1, 1), (3, 1), (3, 2)):
+            resolution = self.pitch_based_context_free_grammar.resolve(
+                start, limit=limit
+            )
+            parallel_resolution = self.pitch_based_context_free_grammar.resolve(
+                start, limit=limit, worker_count=2, split_depth=split_depth
+            )
+            self.assertEqual(
+                [
+                    (node.tag, node.data, resolution.level(node.identifier))
+                    for node in resolution.all_nodes()
+                ],
+                [
+                    (node.tag, node.data, parallel_resolution.level(node.identifier))
+                    for node in parallel_resolution.all_nodes()
+                ],
+            )
+            self._compare_tree(resolution, parallel_resolution)
+
+    def test_deepen(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        expected_resolution = self.pitch_based_context_free_grammar.resolve(
+            start, limit=4
+        )
+        resolution = self.pitch_based_context_free_grammar.resolve(start, limit=1)
+        frontier_node_tuple = self.pitch_based_context_free_grammar.deepen(resolution)
+        self.assertEqual(
+            frontier_node_tuple,
+            self.pitch_based_context_free_grammar.get_frontier_node_tuple(resolution),
+        )
+        self.pitch_based_context_free_grammar.deepen(resolution, 2, frontier_node_tuple)
+        self.assertEqual(
+            [
+                (node.tag, node.data, expected_resolution.level(node.identifier))
+                for node in expected_resolution.all_nodes()
+            ],
+            [
+                (node.tag, node.data, resolution.level(node.identifier))
+                for node in resolution.all_nodes()
+            ],
+        )
+
+        # Only terminals are left => nothing changes anymore
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar(
+                (
+                    common_generators.ContextFreeGrammarRule(
+                        zimmermann_generators.JustIntonationPitchNonTerminal("3/2"),
+                        (
+                            zimmermann_generators.JustIntonationPitchTerminal("5/4"),
+                            zimmermann_generators.JustIntonationPitchTerminal("6/5"),
+                        ),
+                    ),
+                )
+            )
+        )
+        resolution = pitch_based_context_free_grammar.resolve(
+            zimmermann_generators.JustIntonationPitchNonTerminal("3/2"), limit=1
+        )
+        self.assertEqual(
+            pitch_based_context_free_grammar.deepen(resolution, None), tuple([])
+        )
+        self.assertEqual(len(resolution), 2)
+
+    def test_resolve_async(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        expected_tree = self.pitch_based_context_free_grammar.resolve(start, limit=4)
+        tree, is_complete = asyncio.run(
+            self.pitch_based_context_free_grammar.resolve_async(
+                start, limit=4, interval=0
+            )
+        )
+        self.assertTrue(is_complete)
+        self.assertEqual(
+            [node.data for node in tree.all_nodes()],
+            [node.data for node in expected_tree.all_nodes()],
+        )
+
+    def test_resolve_async_with_maximum_node_count(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        expected_tree = self.pitch_based_context_free_grammar.resolve(start, limit=4)
+        for maximum_node_count in (1, 4, len(expected_tree)):
+            tree, is_complete = asyncio.run(
+                self.pitch_based_context_free_grammar.resolve_async(
+                    start, limit=4, maximum_node_count=maximum_node_count
+                )
+            )
+            self.assertEqual(is_complete, maximum_node_count == len(expected_tree))
+            self.assertEqual(
+                [node.data for node in tree.all_nodes()],
+                [node.data for node in expected_tree.all_nodes()][:maximum_node_count],
+            )
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                self.pitch_based_context_free_grammar.resolve_async(
+                    start, maximum_node_count=0
+                )
+            )
+
+    def test_resolve_async_with_deadline(self):
+        async def resolve_async():
+            # The deadline is already reached: only the root is added
+            return await self.pitch_based_context_free_grammar.resolve_async(
+                zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+                deadline=asyncio.get_running_loop().time(),
+            )
+
+        tree, is_complete = asyncio.run(resolve_async())
+        self.assertFalse(is_complete)
+        self.assertEqual(len(tree), 1)
+
+    def test_resolve_async_cancel(self):
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={3: 1, 5: 1, 7: 1},
+                maximum_cent_deviation=700,
+                minimal_barlow_harmonicity_terminal=0.04,
+            )
+        )
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        step_count_list = [0]
+
+        async def count_step():
+            while True:
+                step_count_list[0] += 1
+                await asyncio.sleep(0)
+
+        async def resolve_async():
+            step_task = asyncio.create_task(count_step())
+            resolve_task = asyncio.create_task(
+                pitch_based_context_free_grammar.resolve_async(
+                    start, limit=None, interval=0
+                )
+            )
+            # The event loop isn't blocked by the resolution
+            while step_count_list[0] < 100:
+                await asyncio.sleep(0)
+            resolve_task.cancel()
+            step_task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await resolve_task
+
+        asyncio.run(resolve_async())
+        # The status cache is still consistent
+        self.assertEqual(
+            [
+                node.data
+                for node in pitch_based_context_free_grammar.resolve(
+                    start, limit=4
+                ).all_nodes()
+            ],
+            [
+                node.data
+                for node in zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                    prime_number_to_maximum_exponent_dict={3: 1, 5: 1, 7: 1},
+                    maximum_cent_deviation=700,
+                    minimal_barlow_harmonicity_terminal=0.04,
+                )
+                .resolve(start, limit=4)
+                .all_nodes()
+            ],
+        )
+
+    def test_lazy_tag(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        resolution = self.pitch_based_context_free_grammar.resolve(start, limit=2)
+        root = resolution.get_node(resolution.root)
+        self.assertEqual(root._tag, None)
+        self.assertEqual(root.tag, "(5/4)")
+        for node in resolution.all_nodes():
+            self.assertEqual(
+                node.tag, self.pitch_based_context_free_grammar._data_to_tag(node.data)
+            )
+        copied_resolution = pickle.loads(pickle.dumps(resolution))
+        self.assertEqual(
+            [node.tag for node in copied_resolution.all_nodes()],
+            [node.tag for node in resolution.all_nodes()],
+        )
+
+    def test_overridden_resolution_hooks(self):
+        class ShortGrammar(zimmermann_generators.PitchBasedContextFreeGrammar):
+            def _add_node(self, tree, data, parent=None):
+                if len(data) <= 3:
+                    return super()._add_node(tree, data, parent)
+
+        class ReversedGrammar(zimmermann_generators.PitchBasedContextFreeGrammar):
+            def _resolve_content(self, content):
+                return super()._resolve_content(content)[::-1]
+
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        resolution = self.pitch_based_context_free_grammar.resolve(start, limit=3)
+        for grammar_class, is_expected in (
+            (ShortGrammar, lambda node: len(node.data) <= 3),
+            (ReversedGrammar, lambda node: True),
+        ):
+            pitch_based_context_free_grammar = grammar_class(
+                self.pitch_based_context_free_grammar.context_free_grammar_rule_tuple
+            )
+            for worker_count in (None, 2):
+                hook_resolution = pitch_based_context_free_grammar.resolve(
+                    start, limit=3, worker_count=worker_count
+                )
+                self.assertEqual(
+                    sorted(node.tag for node in hook_resolution.all_nodes()),
+                    sorted(
+                        node.tag for node in resolution.all_nodes() if is_expected(node)
+                    ),
+                )
+        # Children are added in the order of '_resolve_content'
+        self.assertEqual(
+            [node.tag for node in hook_resolution.children(hook_resolution.root)],
+            [node.tag for node in resolution.children(resolution.root)][::-1],
+        )
+
+    def test_overridden_tag(self):
+        class TaggedGrammar(zimmermann_generators.PitchBasedContextFreeGrammar):
+            def _data_to_tag(self, data):
+                return str(len(data))
+
+        pitch_based_context_free_grammar = TaggedGrammar.from_constraints(
+            prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+            maximum_cent_deviation=550,
+        )
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for profile in (None, zimmermann_generators.ResolveProfile()):
+            pitch_based_context_free_grammar.profile = profile
+            resolution = pitch_based_context_free_grammar.resolve(start, limit=2)
+            self.assertEqual(
+                [node.tag for node in resolution.all_nodes()],
+                [str(len(node.data)) for node in resolution.all_nodes()],
+            )
+
+    def test_ratio_string_cache(self):
+        extended_chomsky = importlib.import_module(
+            f"{zimmermann_generators.__name__}.extended_chomsky"
+        )
+        self.assertEqual(
+            extended_chomsky._exponent_tuple_to_ratio_string.cache_info().maxsize,
+            zimmermann_generators.configurations.RATIO_STRING_CACHE_SIZE,
+        )
+
+    def test_no_tag(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        self.pitch_based_context_free_grammar.add_tag = False
+        resolution = self.pitch_based_context_free_grammar.resolve(start, limit=2)
+        for node in resolution.all_nodes():
+            self.assertEqual(node.tag, node.identifier)
+
+    def test_pickle(self):
+        pitch_based_context_free_grammar = pickle.loads(
+            pickle.dumps(self.pitch_based_context_free_grammar)
+        )
+        self.assertEqual(
+            pitch_based_context_free_grammar.context_free_grammar_rule_tuple,
+            self.pitch_based_context_free_grammar.context_free_grammar_rule_tuple,
+        )
+
+    def test_iter_resolve(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for limit in (0, 1, 3):
+            resolution = self.pitch_based_context_free_grammar.resolve(
+                start, limit=limit
+            )
+            expected_derivation_list = sorted(
+                tuple(
+                    resolution[identifier].data
+                    for identifier in resolution.rsearch(node.identifier)
+                )[::-1]
+                for node in resolution.all_nodes()
+            )
+            self.assertEqual(
+                sorted(
+                    self.pitch_based_context_free_grammar.iter_resolve(start, limit)
+                ),
+                expected_derivation_list,
+            )
+
+    def test_iter_leaves(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for limit in (0, 1, 3):
+            resolution = self.pitch_based_context_free_grammar.resolve(
+                start, limit=limit
+            )
+            self.assertEqual(
+                sorted(self.pitch_based_context_free_grammar.iter_leaves(start, limit)),
+                sorted(leaf.data for leaf in resolution.leaves()),
+            )
+
+    def test_sample(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for limit in (0, 1, 3, 5):
+            expected_derivation_list = [
+                derivation
+                for derivation in self.pitch_based_context_free_grammar.iter_resolve(
+                    start, limit
+                )
+                if len(derivation) == limit + 1
+            ]
+            for is_uniform in (False, True):
+                derivation_tuple = self.pitch_based_context_free_grammar.sample(
+                    start, limit, count=20, seed=10, is_uniform=is_uniform
+                )
+                self.assertEqual(len(derivation_tuple), 20)
+                for derivation in derivation_tuple:
+                    self.assertIn(derivation, expected_derivation_list)
+                # The same seed picks the same derivations
+                self.assertEqual(
+                    self.pitch_based_context_free_grammar.sample(
+                        start, limit, count=20, seed=10, is_uniform=is_uniform
+                    ),
+                    derivation_tuple,
+                )
+
+    def test_sample_without_derivation(self):
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={
+                    3: 1,
+                },
+                maximum_cent_deviation=500,
+                add_unison=True,
+            )
+        )
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("1/1")
+        # All derivations end after one step
+        for is_uniform in (False, True):
+            self.assertEqual(
+                pitch_based_context_free_grammar.sample(
+                    start, 2, count=3, is_uniform=is_uniform
+                ),
+                tuple([]),
+            )
+            for derivation in pitch_based_context_free_grammar.sample(
+                start, count=3, is_uniform=is_uniform
+            ):
+                self.assertIn(
+                    derivation[-1],
+                    tuple(pitch_based_context_free_grammar.iter_leaves(start)),
+                )
+
+    def test_sample_uniform(self):
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={3: 1, 5: 1, 7: 1},
+                maximum_cent_deviation=700,
+                minimal_barlow_harmonicity_terminal=0.04,
+            )
+        )
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        limit, count = 3, 4000
+        derivation_list = [
+            derivation
+            for derivation in pitch_based_context_free_grammar.iter_resolve(
+                start, limit
+            )
+            if len(derivation) == limit + 1
+        ]
+        # Pitches aren't hashable, so derivations are counted by their tags
+        derivation_tag_to_count = collections.Counter(
+            tuple(map(pitch_based_context_free_grammar._data_to_tag, derivation))
+            for derivation in pitch_based_context_free_grammar.sample(
+                start, limit, count=count, seed=0, is_uniform=True
+            )
+        )
+        for derivation in derivation_list:
+            self.assertAlmostEqual(
+                derivation_tag_to_count[
+                    tuple(
+                        map(pitch_based_context_free_grammar._data_to_tag, derivation)
+                    )
+                ]
+                / count,
+                1 / len(derivation_list),
+                delta=0.02,
+            )
+
+    def test_count_derivations(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for limit in (0, 1, 3, 5):
+            resolution = self.pitch_based_context_free_grammar.resolve(
+                start, limit=limit
+            )
+            self.assertEqual(
+                self.pitch_based_context_free_grammar.count_derivations(start, limit),
+                (len(resolution), len(resolution.leaves()), True),
+            )
+
+    def test_count_derivations_with_maximum_node_count(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        node_count = len(self.pitch_based_context_free_grammar.resolve(start, limit=5))
+        self.assertTrue(
+            self.pitch_based_context_free_grammar.count_derivations(
+                start, 5, maximum_node_count=node_count
+            )[2]
+        )
+        (
+            counted_node_count,
+            _,
+            is_exact,
+        ) = self.pitch_based_context_free_grammar.count_derivations(
+            start, 5, maximum_node_count=node_count - 1
+        )
+        self.assertFalse(is_exact)
+        self.assertGreater(counted_node_count, node_count - 1)
+        self.assertLessEqual(counted_node_count, node_count)
+        self.assertRaises(
+            ValueError,
+            lambda: self.pitch_based_context_free_grammar.count_derivations(
+                start, 5, maximum_node_count=0
+            ),
+        )
+
+    def test_count_derivations_without_filter(self):
+        def count_derivations(data, limit: int) -> tuple[int, int]:
+            child_data_tuple = (
+                self.pitch_based_context_free_grammar._resolve_content(data)
+                if limit
+                else tuple([])
+            )
+            if not child_data_tuple:
+                return 1, 1
+            node_count, leaf_count = 1, 0
+            for child_data in child_data_tuple:
+                child_node_count, child_leaf_count = count_derivations(
+                    child_data, limit - 1
+                )
+                node_count += child_node_count
+                leaf_count += child_leaf_count
+            return node_count, leaf_count
+
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        for limit in (0, 1, 3, 5):
+            node_count, leaf_count, is_exact = (
+                self.pitch_based_context_free_grammar.count_derivations(
+                    start, limit, apply_filter=False
+                )
+            )
+            self.assertTrue(is_exact)
+            self.assertEqual(
+                (node_count, leaf_count), count_derivations((start,), limit)
+            )
+            # The filter only removes nodes
+            self.assertGreaterEqual(
+                node_count,
+                self.pitch_based_context_free_grammar.count_derivations(start, limit)[
+                    0
+                ],
+            )
+        self.assertRaises(
+            ValueError,
+            self.pitch_based_context_free_grammar.count_derivations,
+            start,
+            apply_filter=False,
+        )
+
+    def test_parse(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        derivation_list = list(
+            self.pitch_based_context_free_grammar.iter_resolve(start, limit=4)
+        )
+        for derivation in derivation_list:
+            parsed_derivation_tuple = tuple(
+                self.pitch_based_context_free_grammar.parse(start, derivation[-1])
+            )
+            self.assertTrue(parsed_derivation_tuple)
+            for parsed_derivation in parsed_derivation_tuple:
+                self.assertIn(parsed_derivation, derivation_list)
+                self.assertEqual(parsed_derivation[-1], derivation[-1])
+
+    def test_is_derivable(self):
+        start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        self.assertTrue(
+            self.pitch_based_context_free_grammar.is_derivable(start, (start,))
+        )
+        self.assertTrue(
+            self.pitch_based_context_free_grammar.is_derivable(
+                start,
+                (
+                    zimmermann_generators.JustIntonationPitchTerminal("15/16"),
+                    zimmermann_generators.JustIntonationPitchTerminal("15/16"),
+                    zimmermann_generators.JustIntonationPitchNonTerminal("4/3"),
+                    zimmermann_generators.JustIntonationPitchTerminal("16/15"),
+                ),
+            )
+        )
+        # Wrong order
+        self.assertFalse(
+            self.pitch_based_context_free_grammar.is_derivable(
+                start,
+                (
+                    zimmermann_generators.JustIntonationPitchTerminal("15/16"),
+                    zimmermann_generators.JustIntonationPitchNonTerminal("4/3"),
+                    zimmermann_generators.JustIntonationPitchTerminal("16/15"),
+                    zimmermann_generators.JustIntonationPitchTerminal("15/16"),
+                ),
+            )
+        )
+        # Derivable by the rules, but with pitch repetitions
+        sequence = (
+            zimmermann_generators.JustIntonationPitchTerminal("15/16"),
+            zimmermann_generators.JustIntonationPitchTerminal("16/15"),
+            zimmermann_generators.JustIntonationPitchNonTerminal("5/4"),
+        )
+        self.assertFalse(self.pitch_based_context_free_grammar._is_valid(sequence))
+        self.assertFalse(
+            self.pitch_based_context_free_grammar.is_derivable(start, sequence)
+        )
+        self.assertEqual(
+            tuple(self.pitch_based_context_free_grammar.parse(start, sequence)),
+            tuple([]),
+        )
+        self.assertFalse(self.pitch_based_context_free_grammar.is_derivable(start, ()))
+
     def test_resolve_no_movement(self):
         pitch_based_context_free_grammar = (
             zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
@@ -202,6 +1044,691 @@ class PitchBasedContextFreeGrammarTests(unittest.TestCase):
         self._compare_tree(expected_tree, resolution)
 
 
+class GrammarCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_from_constraints(self):
+        keyword_argument_dict = dict(
+            prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+            maximum_cent_deviation=550,
+            cache_directory=self.directory,
+        )
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                **keyword_argument_dict
+            )
+        )
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        cached_pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                **keyword_argument_dict
+            )
+        )
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        for rule, cached_rule in zip(
+            pitch_based_context_free_grammar.context_free_grammar_rule_tuple,
+            cached_pitch_based_context_free_grammar.context_free_grammar_rule_tuple,
+        ):
+            self.assertEqual(rule.left_side, cached_rule.left_side)
+            self.assertEqual(rule.right_side, cached_rule.right_side)
+            self.assertEqual(
+                tuple(map(type, rule.right_side)),
+                tuple(map(type, cached_rule.right_side)),
+            )
+        self.assertEqual(
+            len(pitch_based_context_free_grammar.context_free_grammar_rule_tuple),
+            len(
+                cached_pitch_based_context_free_grammar.context_free_grammar_rule_tuple
+            ),
+        )
+
+        # Other constraints => other grammar
+        zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+            **dict(keyword_argument_dict, maximum_cent_deviation=600)
+        )
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_numpy_constraint(self):
+        zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+            prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+            allowed_octave_sequence=(-1, 0),
+            maximum_cent_deviation=550,
+            cache_directory=self.directory,
+        )
+        zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+            prime_number_to_maximum_exponent_dict={
+                np.int64(3): np.int64(1),
+                np.int64(5): np.int64(1),
+            },
+            allowed_octave_sequence=np.array([-1, 0]),
+            maximum_cent_deviation=np.float64(550),
+            cache_directory=self.directory,
+        )
+        # Equal constraints => equal key
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_file_mode(self):
+        umask = os.umask(0o022)
+        try:
+            grammar_cache = zimmermann_generators.GrammarCache(self.directory)
+            key = grammar_cache.get_key(1)
+            grammar_cache.save(
+                key,
+                (zimmermann_generators.JustIntonationPitchNonTerminal("3/2"),),
+                tuple([]),
+                tuple([]),
+            )
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(grammar_cache._get_path(key)).st_mode & 0o777, 0o644)
+        # No temporary file is left
+        self.assertEqual(os.listdir(self.directory), [f"{key}.npz"])
+
+    def test_load_missing(self):
+        grammar_cache = zimmermann_generators.GrammarCache(self.directory)
+        self.assertEqual(grammar_cache.load(grammar_cache.get_key(1, 2, 3)), None)
+
+    def test_eviction(self):
+        grammar_cache = zimmermann_generators.GrammarCache(
+            self.directory, maximum_size=0
+        )
+        grammar_cache.save(
+            grammar_cache.get_key(1),
+            (zimmermann_generators.JustIntonationPitchNonTerminal("3/2"),),
+            tuple([]),
+            tuple([]),
+        )
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_clear(self):
+        grammar_cache = zimmermann_generators.GrammarCache(self.directory)
+        key = grammar_cache.get_key(1)
+        grammar_cache.save(
+            key,
+            (zimmermann_generators.JustIntonationPitchNonTerminal("3/2"),),
+            (zimmermann_generators.JustIntonationPitchTerminal("5/4"),),
+            tuple([]),
+        )
+        self.assertEqual(
+            grammar_cache.load(key),
+            (
+                (zimmermann_generators.JustIntonationPitchNonTerminal("3/2"),),
+                (zimmermann_generators.JustIntonationPitchTerminal("5/4"),),
+                tuple([]),
+            ),
+        )
+        grammar_cache.clear()
+        self.assertEqual(grammar_cache.load(key), None)
+
+
+class StatusCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.keyword_argument_dict = dict(
+            prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+            maximum_cent_deviation=550,
+        )
+        self.start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+
+    def test_counter(self):
+        status_cache = zimmermann_generators.StatusCache()
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                status_cache=status_cache, **self.keyword_argument_dict
+            )
+        )
+        self.assertEqual(pitch_based_context_free_grammar.status_cache, status_cache)
+        pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        miss_count = status_cache.miss_count
+        self.assertEqual(len(status_cache), miss_count)
+        pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        self.assertEqual(status_cache.miss_count, miss_count)
+        self.assertGreaterEqual(status_cache.hit_count, miss_count)
+        self.assertEqual(status_cache.eviction_count, 0)
+
+    def test_eviction(self):
+        status_cache = zimmermann_generators.StatusCache(maximum_entry_count=3)
+        for key in range(5):
+            status_cache.set(key, True)
+        self.assertEqual(len(status_cache), 3)
+        self.assertEqual(status_cache.eviction_count, 2)
+        self.assertEqual(status_cache.get(0), None)
+        # Mark '2' as recently used => '3' is evicted
+        self.assertEqual(status_cache.get(2), True)
+        status_cache.set(5, False)
+        self.assertEqual(status_cache.get(3), None)
+        self.assertEqual(status_cache.get(2), True)
+        self.assertEqual(status_cache.get(5), False)
+
+    def test_bounded_resolve(self):
+        status_cache = zimmermann_generators.StatusCache(maximum_entry_count=2)
+        pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                status_cache=status_cache, **self.keyword_argument_dict
+            )
+        )
+        resolution = pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        expected_resolution = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                **self.keyword_argument_dict
+            ).resolve(self.start, limit=3)
+        )
+        self.assertEqual(
+            [node.data for node in resolution.all_nodes()],
+            [node.data for node in expected_resolution.all_nodes()],
+        )
+        self.assertEqual(len(status_cache), 2)
+        self.assertGreater(status_cache.eviction_count, 0)
+
+    def test_clear(self):
+        status_cache = zimmermann_generators.StatusCache()
+        status_cache.set(1, True)
+        status_cache.get(1)
+        status_cache.clear()
+        self.assertEqual(len(status_cache), 0)
+        self.assertEqual(status_cache.hit_count, 0)
+        self.assertEqual(status_cache.get(1), None)
+
+    def test_share(self):
+        status_cache = zimmermann_generators.StatusCache()
+        for _ in range(2):
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                status_cache=status_cache, **self.keyword_argument_dict
+            ).resolve(self.start, limit=2)
+        self.assertGreater(status_cache.hit_count, 0)
+        self.assertRaises(
+            ValueError,
+            lambda: zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                status_cache=status_cache,
+                **dict(self.keyword_argument_dict, maximum_cent_deviation=1200),
+            ),
+        )
+
+
+class ResolveProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+                maximum_cent_deviation=550,
+            )
+        )
+        self.start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+
+    def test_counter(self):
+        profile_list = []
+        profile = zimmermann_generators.ResolveProfile(callback=profile_list.append)
+        self.pitch_based_context_free_grammar.profile = profile
+        tree = self.pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        self.assertEqual(profile_list, [profile])
+        self.assertEqual(profile.accepted_node_count, len(tree))
+        self.assertEqual(profile.generated_node_count, 11)
+        self.assertEqual(profile.depth_to_tried_rule_count, {1: 2, 2: 4, 3: 4})
+        self.assertEqual(profile.status_cache_miss_count, 11)
+        self.assertEqual(profile.status_cache_hit_count, 0)
+        self.assertEqual(profile.tag_duration, 0)
+        tree.show(stdout=False)
+        self.assertGreater(profile.tag_duration, 0)
+        self.assertGreater(profile.accumulation_duration, 0)
+        self.assertGreater(profile.insertion_duration, 0)
+
+        # Counters sum up all resolutions
+        self.pitch_based_context_free_grammar.deepen(tree)
+        self.assertEqual(len(profile_list), 2)
+        self.assertEqual(profile.accepted_node_count, len(tree))
+        self.assertIn(4, profile.depth_to_tried_rule_count)
+        self.pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        self.assertEqual(profile.status_cache_hit_count, 11)
+
+        profile.reset()
+        self.assertEqual(profile.to_dict()["generated_node_count"], 0)
+        self.assertEqual(profile.acceptance_ratio, 0)
+
+    def test_resolution_method(self):
+        grammar = self.pitch_based_context_free_grammar
+        grammar.profile = profile = zimmermann_generators.ResolveProfile()
+        grammar.resolve(self.start, limit=3)
+        expected_counter_tuple = (
+            profile.generated_node_count,
+            profile.accepted_node_count,
+            profile.depth_to_tried_rule_count,
+        )
+        for resolve in (
+            lambda: grammar.resolve(self.start, limit=3, worker_count=2),
+            lambda: grammar.resolve_compact(self.start, limit=3),
+            lambda: tuple(grammar.iter_resolve(self.start, limit=3)),
+        ):
+            profile_list = []
+            grammar.profile = profile = zimmermann_generators.ResolveProfile(
+                callback=profile_list.append
+            )
+            resolve()
+            self.assertEqual(profile_list, [profile])
+            self.assertEqual(
+                (
+                    profile.generated_node_count,
+                    profile.accepted_node_count,
+                    profile.depth_to_tried_rule_count,
+                ),
+                expected_counter_tuple,
+            )
+
+        # Equal derivations of a level are only tested once
+        profile.reset()
+        derivation_graph = grammar.resolve_graph(self.start, limit=3)
+        self.assertEqual(profile.accepted_node_count, derivation_graph.edge_count + 1)
+
+    def test_spawn_worker(self):
+        # The callback can't be pickled, but it isn't sent to the workers
+        profile_list = []
+        profile = zimmermann_generators.ResolveProfile(
+            callback=lambda profile: profile_list.append(profile)
+        )
+        self.pitch_based_context_free_grammar.profile = profile
+        with unittest.mock.patch.object(
+            concurrent.futures,
+            "ProcessPoolExecutor",
+            functools.partial(
+                concurrent.futures.ProcessPoolExecutor,
+                mp_context=multiprocessing.get_context("spawn"),
+            ),
+        ):
+            tree = self.pitch_based_context_free_grammar.resolve(
+                self.start, limit=3, worker_count=2
+            )
+        self.assertEqual(profile_list, [profile])
+        self.assertEqual(profile.accepted_node_count, len(tree))
+        self.assertEqual(profile.generated_node_count, 11)
+        self.assertEqual(pickle.loads(pickle.dumps(profile)).callback, None)
+
+    def test_no_profile(self):
+        self.assertEqual(self.pitch_based_context_free_grammar.profile, None)
+        profile = zimmermann_generators.ResolveProfile()
+        tree = self.pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        self.pitch_based_context_free_grammar.profile = profile
+        self.assertEqual(
+            self.pitch_based_context_free_grammar.resolve(self.start, limit=3).to_dict(
+                with_data=True
+            ),
+            tree.to_dict(with_data=True),
+        )
+
+
+class ResolvePruningTest(unittest.TestCase):
+    def setUp(self):
+        self.pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={3: 1, 5: 1, 7: 1},
+                maximum_cent_deviation=700,
+                minimal_barlow_harmonicity_terminal=0.04,
+            )
+        )
+        self.start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        self.limit = 4
+
+    @staticmethod
+    def get_cent_range(data) -> float:
+        cent = lowest = highest = 0
+        for just_intonation_pitch in data:
+            cent += just_intonation_pitch.interval
+            lowest, highest = min(lowest, cent), max(highest, cent)
+        return highest - lowest
+
+    @staticmethod
+    def get_harmonicity_sum(data) -> float:
+        return sum(
+            just_intonation_pitch.harmonicity_simplified_barlow
+            for just_intonation_pitch in data
+        )
+
+    def get_last_level_data_list(self, tree, is_valid=lambda data: True) -> list:
+        return sorted(
+            tuple(
+                just_intonation_pitch.exponent_tuple
+                for just_intonation_pitch in node.data
+            )
+            for node in tree.all_nodes()
+            if tree.level(node.identifier) == self.limit and is_valid(node.data)
+        )
+
+    def test_maximum_constraints(self):
+        self.pitch_based_context_free_grammar.pruning = (
+            zimmermann_generators.ResolvePruning(
+                maximum_cent_range=400, maximum_symbol_count=4
+            )
+        )
+        tree = self.pitch_based_context_free_grammar.resolve(
+            self.start, limit=self.limit
+        )
+        self.assertGreater(len(tree), 1)
+        for node in tree.all_nodes():
+            self.assertLessEqual(self.get_cent_range(node.data), 400)
+            self.assertLessEqual(len(node.data), 4)
+
+    def test_minimum_constraints(self):
+        tree = self.pitch_based_context_free_grammar.resolve(
+            self.start, limit=self.limit
+        )
+        for pruning, is_valid in (
+            (
+                zimmermann_generators.ResolvePruning(minimum_cent_range=500),
+                lambda data: self.get_cent_range(data) >= 500,
+            ),
+            (
+                zimmermann_generators.ResolvePruning(minimum_harmonicity_sum=0.336),
+                lambda data: self.get_harmonicity_sum(data) >= 0.336,
+            ),
+        ):
+            self.pitch_based_context_free_grammar.pruning = pruning
+            pruned_tree = self.pitch_based_context_free_grammar.resolve(
+                self.start, limit=self.limit
+            )
+            # Branches are cut ...
+            self.assertLess(len(pruned_tree), len(tree))
+            # ... but the last level is the same as a filtered
+            # resolution without pruning.
+            self.assertTrue(self.get_last_level_data_list(pruned_tree))
+            self.assertEqual(
+                self.get_last_level_data_list(pruned_tree),
+                self.get_last_level_data_list(tree, is_valid),
+            )
+            # All resolution methods cut the same branches
+            self.assertEqual(
+                len(
+                    self.pitch_based_context_free_grammar.resolve_compact(
+                        self.start, limit=self.limit
+                    )
+                ),
+                len(pruned_tree),
+            )
+            self.assertEqual(
+                len(
+                    tuple(
+                        self.pitch_based_context_free_grammar.iter_resolve(
+                            self.start, limit=self.limit
+                        )
+                    )
+                ),
+                len(pruned_tree),
+            )
+
+    def test_deepen_with_pruning(self):
+        self.pitch_based_context_free_grammar.pruning = (
+            zimmermann_generators.ResolvePruning(
+                maximum_cent_range=400, maximum_symbol_count=4
+            )
+        )
+        tree = self.pitch_based_context_free_grammar.resolve(
+            self.start, limit=self.limit
+        )
+        deepened_tree = self.pitch_based_context_free_grammar.resolve(
+            self.start, limit=1
+        )
+        for _ in range(self.limit - 1):
+            self.pitch_based_context_free_grammar.deepen(deepened_tree)
+        self.assertEqual(
+            deepened_tree.to_dict(with_data=True), tree.to_dict(with_data=True)
+        )
+
+        # Minimum constraints depend on the limit
+        for pruning in (
+            zimmermann_generators.ResolvePruning(minimum_cent_range=500),
+            zimmermann_generators.ResolvePruning(minimum_harmonicity_sum=0.336),
+        ):
+            self.pitch_based_context_free_grammar.pruning = pruning
+            self.assertRaises(
+                ValueError,
+                lambda: self.pitch_based_context_free_grammar.deepen(deepened_tree),
+            )
+
+    def test_root_is_never_pruned(self):
+        self.pitch_based_context_free_grammar.pruning = (
+            zimmermann_generators.ResolvePruning(maximum_cent_range=0)
+        )
+        tree = self.pitch_based_context_free_grammar.resolve(
+            self.start, limit=self.limit
+        )
+        self.assertEqual(len(tree), 1)
+
+    def test_invalid_pruning(self):
+        self.assertRaises(
+            ValueError,
+            zimmermann_generators.ResolvePruning,
+            maximum_cent_range=100,
+            minimum_cent_range=200,
+        )
+        self.assertRaises(
+            ValueError, zimmermann_generators.ResolvePruning, maximum_symbol_count=0
+        )
+
+
+class CompactDerivationTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={3: 1, 5: 1},
+                maximum_cent_deviation=550,
+            )
+        )
+        self.start = zimmermann_generators.JustIntonationPitchNonTerminal("5/4")
+        self.resolution = self.pitch_based_context_free_grammar.resolve(
+            self.start, limit=4
+        )
+        self.compact_derivation_tree = (
+            self.pitch_based_context_free_grammar.resolve_compact(self.start, limit=4)
+        )
+
+    def test_to_tree(self):
+        tree = self.compact_derivation_tree.to_tree()
+        self.assertEqual(
+            [
+                (node.tag, node.data, self.resolution.level(node.identifier))
+                for node in self.resolution.all_nodes()
+            ],
+            [
+                (node.tag, node.data, tree.level(node.identifier))
+                for node in tree.all_nodes()
+            ],
+        )
+
+    def test_get_data(self):
+        self.assertEqual(len(self.compact_derivation_tree), len(self.resolution))
+        self.assertEqual(
+            [
+                self.compact_derivation_tree.get_data(node_index)
+                for node_index in self.compact_derivation_tree
+            ],
+            [node.data for node in self.resolution.all_nodes()],
+        )
+        self.assertEqual(
+            list(self.compact_derivation_tree.iter_data()),
+            [node.data for node in self.resolution.all_nodes()],
+        )
+
+    def test_leaf_index_tuple(self):
+        self.assertEqual(
+            [
+                self.compact_derivation_tree.get_data(node_index)
+                for node_index in self.compact_derivation_tree.leaf_index_tuple
+            ],
+            [node.data for node in self.resolution.leaves()],
+        )
+
+    def test_depth_and_path(self):
+        self.assertEqual(self.compact_derivation_tree.depth(), 4)
+        self.assertEqual(self.compact_derivation_tree.depth(0), 0)
+        leaf_index = self.compact_derivation_tree.leaf_index_tuple[0]
+        path = self.compact_derivation_tree.get_path(leaf_index)
+        self.assertEqual(len(path), 5)
+        self.assertEqual(path[0], 0)
+        self.assertEqual(path[-1], leaf_index)
+        for parent_index, node_index in zip(path, path[1:]):
+            self.assertEqual(
+                self.compact_derivation_tree.get_parent_index(node_index),
+                parent_index,
+            )
+            self.assertIn(
+                node_index,
+                self.compact_derivation_tree.get_children_index_range(parent_index),
+            )
+        self.assertEqual(self.compact_derivation_tree.get_parent_index(0), None)
+        self.assertRaises(
+            IndexError,
+            lambda: self.compact_derivation_tree.get_path(
+                len(self.compact_derivation_tree)
+            ),
+        )
+
+    def test_add_node(self):
+        self.assertRaises(
+            ValueError, lambda: self.compact_derivation_tree.add_node(0, 0, 0)
+        )
+
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "tree.cdt")
+        self.compact_derivation_tree.save(path)
+        for use_mmap in (True, False):
+            loaded_tree = zimmermann_generators.CompactDerivationTree.load(
+                path, use_mmap=use_mmap
+            )
+            self.assertTrue(loaded_tree.is_read_only)
+            self.assertEqual(len(loaded_tree), len(self.compact_derivation_tree))
+            self.assertEqual(
+                list(loaded_tree.iter_data()),
+                list(self.compact_derivation_tree.iter_data()),
+            )
+            self.assertEqual(
+                loaded_tree.leaf_index_tuple,
+                self.compact_derivation_tree.leaf_index_tuple,
+            )
+            leaf_index = loaded_tree.leaf_index_tuple[-1]
+            self.assertEqual(
+                loaded_tree.get_path(leaf_index),
+                self.compact_derivation_tree.get_path(leaf_index),
+            )
+            self.assertEqual(
+                loaded_tree.get_children_index_range(1),
+                self.compact_derivation_tree.get_children_index_range(1),
+            )
+            self.assertEqual(loaded_tree.depth(), 4)
+            self.assertEqual(
+                loaded_tree.to_tree().to_dict(with_data=True),
+                self.compact_derivation_tree.to_tree().to_dict(with_data=True),
+            )
+            self.assertRaises(ValueError, lambda: loaded_tree.add_node(0, 0, 0))
+
+        # Loaded trees can be saved again
+        path2 = os.path.join(directory, "tree2.cdt")
+        loaded_tree.save(path2)
+        with open(path, "rb") as file, open(path2, "rb") as file2:
+            self.assertEqual(file.read(), file2.read())
+
+    def test_save_file_mode(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "tree.cdt")
+        umask = os.umask(0o022)
+        try:
+            self.compact_derivation_tree.save(path)
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+        # No temporary file is left
+        self.assertEqual(os.listdir(directory), ["tree.cdt"])
+
+    def test_load_invalid_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "tree.cdt")
+        with open(path, "wb") as file:
+            file.write(b"no tree" * 10)
+        self.assertRaises(
+            ValueError, lambda: zimmermann_generators.CompactDerivationTree.load(path)
+        )
+
+
+class DerivationGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.pitch_based_context_free_grammar = (
+            zimmermann_generators.PitchBasedContextFreeGrammar.from_constraints(
+                prime_number_to_maximum_exponent_dict={3: 1, 5: 1, 7: 1},
+                maximum_cent_deviation=1200,
+            )
+        )
+        self.start = zimmermann_generators.JustIntonationPitchNonTerminal("2/3")
+        self.derivation_graph = self.pitch_based_context_free_grammar.resolve_graph(
+            self.start, limit=3
+        )
+
+    def test_share_derivations(self):
+        resolution = self.pitch_based_context_free_grammar.resolve(self.start, limit=3)
+        self.assertLess(len(self.derivation_graph), len(resolution))
+        self.assertGreater(self.derivation_graph.edge_count, 0)
+        self.assertEqual(self.derivation_graph.depth(), 3)
+        self.assertEqual(
+            self.derivation_graph.count_derivations() + (True,),
+            self.pitch_based_context_free_grammar.count_derivations(
+                self.start, limit=3
+            ),
+        )
+
+    def test_iter_derivations(self):
+        self.assertEqual(
+            list(self.derivation_graph.iter_derivations()),
+            list(
+                self.pitch_based_context_free_grammar.iter_resolve(self.start, limit=3)
+            ),
+        )
+
+    def test_to_compact_derivation_tree(self):
+        compact_derivation_tree = self.pitch_based_context_free_grammar.resolve_compact(
+            self.start, limit=3
+        )
+        converted_tree = self.derivation_graph.to_compact_derivation_tree()
+        self.assertEqual(len(converted_tree), len(compact_derivation_tree))
+        self.assertEqual(
+            list(converted_tree.iter_data()),
+            list(compact_derivation_tree.iter_data()),
+        )
+        self.assertEqual(
+            [
+                converted_tree.get_parent_index(node_index)
+                for node_index in converted_tree
+            ],
+            [
+                compact_derivation_tree.get_parent_index(node_index)
+                for node_index in compact_derivation_tree
+            ],
+        )
+
+    def test_resolve_graph_with_pruning(self):
+        self.pitch_based_context_free_grammar.pruning = (
+            zimmermann_generators.ResolvePruning(maximum_cent_range=1200)
+        )
+        derivation_graph = self.pitch_based_context_free_grammar.resolve_graph(
+            self.start, limit=3
+        )
+        self.assertEqual(
+            list(derivation_graph.iter_derivations()),
+            list(
+                self.pitch_based_context_free_grammar.iter_resolve(self.start, limit=3)
+            ),
+        )
+
+    def test_add_edge(self):
+        # Children need to be on the next level
+        self.assertRaises(
+            ValueError, lambda: self.derivation_graph.add_edge(0, 0, 0, 0)
+        )
+        # Edges need to be added in breadth-first order
+        self.assertRaises(ValueError, lambda: self.derivation_graph.add_vertex(0, 0, 0))
+
+
 class EuclideanInterlockingTest(unittest.TestCase):
     def test_euclidean_interlocking(self):
         sequence0, sequence1 = [0, 0, 0], [1, 1]
@@ -228,6 +1755,198 @@ class EuclideanInterlockingTest(unittest.TestCase):
             (1, 2, 3),
         )
 
+    def test_euclidean_interlocking_with_leading_empty_element(self):
+        self.assertEqual(
+            zimmermann_generators.euclidean_interlocking([], [], [1, 2]),
+            (1, 2),
+        )
+        self.assertEqual(zimmermann_generators.euclidean_interlocking([], []), ())
+
+    def test_euclidean_interlocking_order(self):
+        # Compare with naive implementation which inserts the sequences
+        # one after the other.
+        def euclidean_interlocking(*sequence_to_interlock):
+            index_list = [0] * len(sequence_to_interlock[0])
+            for index, sequence in enumerate(sequence_to_interlock[1:]):
+                index_list_iterator = iter(index_list)
+                index_list = [
+                    next(index_list_iterator) if distribution else index + 1
+                    for distribution in common_generators.euclidean(
+                        len(index_list), len(index_list) + len(sequence)
+                    )
+                ]
+            iterator_list = [iter(sequence) for sequence in sequence_to_interlock]
+            return tuple(next(iterator_list[index]) for index in index_list)
+
+        for length_tuple in (
+            (5, 3),
+            (3, 5),
+            (7, 7, 7),
+            (1, 20, 3, 9),
+            (30, 1, 1, 2, 17, 0, 4),
+            (13, 8, 5, 3, 2, 1, 1),
+            (2, 40, 40, 3),
+        ):
+            sequence_tuple = tuple(
+                tuple((index, item) for item in range(length))
+                for index, length in enumerate(length_tuple)
+            )
+            self.assertEqual(
+                zimmermann_generators.euclidean_interlocking(*sequence_tuple),
+                euclidean_interlocking(*sequence_tuple),
+            )
+
+    def test_iter_euclidean_interlocking(self):
+        self.assertEqual(
+            tuple(
+                zimmermann_generators.iter_euclidean_interlocking(
+                    iter("aaa"),
+                    (character for character in "bb"),
+                    length_sequence=(3, 2),
+                )
+            ),
+            tuple("abaab"),
+        )
+        self.assertEqual(
+            tuple(zimmermann_generators.iter_euclidean_interlocking([0, 0, 0], [1, 1])),
+            (0, 1, 0, 0, 1),
+        )
+
+    def test_iter_euclidean_interlocking_with_wrong_length(self):
+        self.assertRaises(
+            ValueError,
+            lambda: tuple(
+                zimmermann_generators.iter_euclidean_interlocking(
+                    iter("aa"), iter("bb"), length_sequence=(3, 2)
+                )
+            ),
+        )
+        self.assertRaises(
+            ValueError,
+            lambda: tuple(
+                zimmermann_generators.iter_euclidean_interlocking(
+                    iter("aa"), length_sequence=(2, 2)
+                )
+            ),
+        )
+
+    def test_get_euclidean_interlocking_pattern(self):
+        pattern = zimmermann_generators.get_euclidean_interlocking_pattern(3, 2)
+        self.assertEqual(pattern.tolist(), [0, 1, 0, 0, 1])
+        self.assertEqual(pattern.dtype, np.uint16)
+        self.assertFalse(pattern.flags.writeable)
+        # Patterns are cached
+        self.assertIs(
+            zimmermann_generators.get_euclidean_interlocking_pattern(3, 2), pattern
+        )
+        self.assertEqual(
+            zimmermann_generators.get_euclidean_interlocking_pattern(3, 0, 2).tolist(),
+            [0, 2, 0, 0, 2],
+        )
+
+    def test_euclidean_interlocking_array(self):
+        length_tuple = (13, 8, 5, 3, 2, 1, 1)
+        sequence_tuple = tuple(
+            tuple(range(index * 100, index * 100 + length))
+            for index, length in enumerate(length_tuple)
+        )
+        self.assertEqual(
+            zimmermann_generators.euclidean_interlocking_array(
+                *(np.array(sequence) for sequence in sequence_tuple)
+            ).tolist(),
+            list(zimmermann_generators.euclidean_interlocking(*sequence_tuple)),
+        )
+
+    def test_euclidean_interlocking_array_with_multiple_dimensions(self):
+        array0 = np.arange(6).reshape(3, 2)
+        array1 = -np.arange(1, 5).reshape(2, 2)
+        self.assertEqual(
+            zimmermann_generators.euclidean_interlocking_array(array0, array1).tolist(),
+            [[0, 1], [-1, -2], [2, 3], [4, 5], [-3, -4]],
+        )
+
+    def test_pattern_cache(self):
+        pattern = zimmermann_generators.get_euclidean_interlocking_pattern(5, 3)
+        self.assertIs(
+            zimmermann_generators.get_euclidean_interlocking_pattern(5, 3), pattern
+        )
+        self.assertFalse(pattern.flags.writeable)
+
+        interlockings = importlib.import_module(
+            f"{zimmermann_generators.__name__}.interlockings"
+        )
+        maximum_size = (
+            zimmermann_generators.configurations.EUCLIDEAN_INTERLOCKING_CACHE_MAXIMUM_SIZE
+        )
+        self.addCleanup(
+            setattr,
+            zimmermann_generators.configurations,
+            "EUCLIDEAN_INTERLOCKING_CACHE_MAXIMUM_SIZE",
+            maximum_size,
+        )
+        zimmermann_generators.configurations.EUCLIDEAN_INTERLOCKING_CACHE_MAXIMUM_SIZE = (
+            1000
+        )
+        # Patterns which are bigger than the cache aren't kept
+        long_pattern = zimmermann_generators.get_euclidean_interlocking_pattern(
+            1000, 1000
+        )
+        self.assertIsNot(
+            zimmermann_generators.get_euclidean_interlocking_pattern(1000, 1000),
+            long_pattern,
+        )
+        for length in range(1, 50):
+            zimmermann_generators.euclidean_interlocking_array(
+                np.arange(length), np.arange(3)
+            )
+            self.assertLessEqual(interlockings._cached_byte_count, 1000)
+            self.assertEqual(
+                interlockings._cached_byte_count,
+                sum(
+                    array.nbytes
+                    for array in interlockings._key_to_cached_array.values()
+                ),
+            )
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_all(self):
+        # All submodules (besides configurations and constants) need
+        # to be part of the lazy import table.
+        submodule_list = [
+            importlib.import_module(f"{zimmermann_generators.__name__}.{name}")
+            for _, name, _ in pkgutil.iter_modules(zimmermann_generators.__path__)
+            if name not in ("configurations", "constants")
+        ]
+        self.assertEqual(
+            set(zimmermann_generators.__all__),
+            set(core_utilities.get_all(*submodule_list)),
+        )
+        for name in zimmermann_generators.__all__:
+            self.assertTrue(hasattr(zimmermann_generators, name))
+            self.assertIn(name, dir(zimmermann_generators))
+
+    def test_submodule_table(self):
+        # Each submodule of the lazy import table provides exactly
+        # the objects of its '__all__'.
+        self.assertEqual(
+            zimmermann_generators._SUBMODULE_NAME_TO_OBJECT_NAME_TUPLE,
+            {
+                name: tuple(
+                    importlib.import_module(
+                        f"{zimmermann_generators.__name__}.{name}"
+                    ).__all__
+                )
+                for _, name, _ in pkgutil.iter_modules(zimmermann_generators.__path__)
+                if name not in ("configurations", "constants")
+            },
+        )
+
+    def test_unknown_attribute(self):
+        self.assertRaises(
+            AttributeError, lambda: zimmermann_generators.NotExistingObject
+        )
+
 
 class TitleTest(unittest.TestCase):
     def test_golden_number(self):